@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Small script to time pycasso's quantizing against PIL's built in quantize for each display mode
+
+import argparse
+import time
+
+from PIL import Image
+
+from piblo.constants import ConfigConst, ImageConst, QuantizeConst
+from piblo.image_functions import ImageFunctions
+
+
+def time_call(func, repeat):
+    # Best of 'repeat' runs, so one slow run from other processes doesn't skew the result
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        taken = time.perf_counter() - start
+        if best is None or taken < best:
+            best = taken
+    return best
+
+
+def pil_quantize(img, palette, dither):
+    palette_img = Image.new("P", (1, 1))
+    flat = [value for colour in palette for value in colour]
+    palette_img.putpalette(flat + flat[:3] * (256 - len(palette)))
+    return img.quantize(palette=palette_img, dither=dither).convert(ImageConst.CONVERT_MODE.value)
+
+
+parser = argparse.ArgumentParser(description="Time quantizing an image to each display palette")
+parser.add_argument("path",
+                    nargs="?",
+                    help="Path to image to quantize. Default: a generated test image")
+parser.add_argument("--width",
+                    dest="width",
+                    type=int,
+                    default=ConfigConst.TEST_EPD_WIDTH.value,
+                    help=f"Width to resize image to. Default: {ConfigConst.TEST_EPD_WIDTH.value}")
+parser.add_argument("--height",
+                    dest="height",
+                    type=int,
+                    default=ConfigConst.TEST_EPD_HEIGHT.value,
+                    help=f"Height to resize image to. Default: {ConfigConst.TEST_EPD_HEIGHT.value}")
+parser.add_argument("--repeat",
+                    dest="repeat",
+                    type=int,
+                    default=5,
+                    help="Number of times to run each method, best time is shown")
+args = parser.parse_args()
+
+if args.path is None:
+    image = Image.radial_gradient("L").convert(ImageConst.CONVERT_MODE.value)
+    image = Image.merge(ImageConst.CONVERT_MODE.value,
+                        (image.getchannel(0), image.rotate(90).getchannel(1), image.rotate(180).getchannel(2)))
+else:
+    image = Image.open(args.path).convert(ImageConst.CONVERT_MODE.value)
+image = image.resize((args.width, args.height))
+
+# Build lookup tables first, they are built once per process and kept
+for palette in QuantizeConst.PALETTES.value.values():
+    ImageFunctions.get_palette_lut(palette)
+
+methods = {
+    "nearest": lambda p: ImageFunctions.quantize(image, p, QuantizeConst.NEAREST.value),
+    "ordered": lambda p: ImageFunctions.quantize(image, p, QuantizeConst.ORDERED.value),
+    "diffusion": lambda p: ImageFunctions.quantize(image, p, QuantizeConst.DIFFUSION.value),
+    "pil none": lambda p: pil_quantize(image, p, Image.Dither.NONE),
+    "pil floyd": lambda p: pil_quantize(image, p, Image.Dither.FLOYDSTEINBERG)
+}
+
+print(f"{args.width}x{args.height} image, best of {args.repeat}, times in milliseconds")
+print(f"{'mode':<10}" + "".join(f"{name:>12}" for name in methods))
+for mode, palette in QuantizeConst.PALETTES.value.items():
+    times = [time_call(lambda: method(palette), args.repeat) * 1000 for method in methods.values()]
+    print(f"{mode:<10}" + "".join(f"{taken:>12.1f}" for taken in times))
@@ -14,13 +14,33 @@ logging.basicConfig(level=ConfigConst.LOGGING_LEVEL.value,
                     format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
 instance = Pycasso()
-if instance.config.use_pijuice:
+if instance.args.buildcache:
+    logging.info("Building external image cache")
+    instance.build_external_cache()
+    if not instance.args.daemon and instance.args.prefetch == 0:
+        exit()
+
+if instance.args.prefetch > 0:
+    logging.info(f"Prefetching up to {instance.args.prefetch} frame(s)")
+    instance.prefetch(instance.args.prefetch)
+    if not instance.args.daemon:
+        exit()
+
+if instance.args.daemon:
+    logging.info("Starting program as a daemon")
+    instance.run_daemon()
+    exit()
+elif instance.config.use_pijuice:
     from piblo.pijuice_handler import PiJuiceHandler
 
     logging.info("Starting program using PiJuice")
     pijuice_instance = PiJuiceHandler()
     pijuice_instance.run()
     exit()
+elif instance.args.statusonly:
+    logging.info("Refreshing status icons without using PiJuice")
+    instance.run_status()
+    exit()
 else:
     logging.info("Starting program without using PiJuice")
     instance.run()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Small script to summarise the run trace file written by pycasso
+
+import argparse
+
+from piblo.config_wrapper import Configs
+from piblo.constants import ConfigConst, TraceConst
+from piblo.run_trace import RunTrace
+
+
+def format_values(values, scale=1.0, decimals=2):
+    if values is None:
+        return "-"
+    return "/".join(f"{value * scale:.{decimals}f}" for value in values)
+
+
+def get_config_trace_file():
+    # Only reads the config, read_config() would also create missing files
+    config = Configs(config_path=ConfigConst.CONFIG_PATH.value)
+    if config.does_config_file_exist():
+        config.config.read(config.config_path)
+        config.load_config(config.config)
+    return config.trace_file
+
+
+parser = argparse.ArgumentParser(description="Summarise percentiles of each phase of pycasso runs from a trace file")
+parser.add_argument("path",
+                    nargs="?",
+                    default=None,
+                    help=f"Path to trace file. Default: 'trace_file' from '{ConfigConst.CONFIG_PATH.value}'")
+parser.add_argument("--last",
+                    dest="last",
+                    type=int,
+                    default=0,
+                    help="Only summarise the last N runs")
+args = parser.parse_args()
+
+if args.path is None:
+    args.path = get_config_trace_file()
+    if args.path == "":
+        print(f"No trace file given and 'trace_file' is not set in '{ConfigConst.CONFIG_PATH.value}'")
+        exit()
+
+traces = RunTrace.read_traces(args.path)
+if args.last > 0:
+    traces = traces[-args.last:]
+
+if len(traces) == 0:
+    print(f"No runs found in '{args.path}'")
+    exit()
+
+summary = RunTrace.summarise(traces)
+percentiles = "/".join(f"p{p}" for p in TraceConst.PERCENTILES.value)
+
+print(f"{len(traces)} run(s) from '{args.path}', showing {percentiles}")
+# Peak memory is for the whole run, phases show how much they raised it
+print(f"{'phase':<20}{'count':>7}  {'wall (s)':<24}{'cpu (s)':<24}{'network (KB)':<27}{'run peak rss (MB)':<24}"
+      f"{'peak rise (MB)':<24}")
+for name, phase in summary.items():
+    print(f"{name:<20}{phase[TraceConst.COUNT.value]:>7}  "
+          f"{format_values(phase[TraceConst.WALL.value]):<24}"
+          f"{format_values(phase[TraceConst.CPU.value]):<24}"
+          f"{format_values(phase[TraceConst.BYTES.value], 1 / 1024, 1):<27}"
+          f"{format_values(phase[TraceConst.PEAK_RSS.value], 1 / 1024, 1):<24}"
+          f"{format_values(phase[TraceConst.PEAK_RSS_RISE.value], 1 / 1024, 1):<24}")
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Keeps text fetched by prompt blocks between runs, so a block is usually a local read instead of a web request
+
+import json
+import logging
+import os
+import threading
+import time
+
+from piblo.constants import BlockCacheConst
+
+
+class BlockCache:
+    """
+    A class used to keep text fetched by prompt blocks, saved to a file between runs.
+
+    Text is kept for 'ttl' minutes. Once older it is still returned straight away, and fetched again in a background
+    thread, so a block only waits on the web when nothing has been fetched yet. Blocks that should give different text
+    each time, like quotes, keep a pool of 'pool_size' texts instead, taking one each time and fetching more in the
+    background when half the pool is used or it is older than 'ttl'. Pools are topped up one text at a time, 'throttle'
+    seconds apart so the web service isn't flooded, and saved after each text so a run that closes early keeps them.
+
+    Attributes
+    ----------
+    path:string
+        file path of JSON file to save fetched text to
+
+    ttl:float
+        minutes fetched text is fresh for
+
+    pool_size:int
+        number of texts to keep in each pool
+
+    throttle:float
+        seconds to wait between fetches when topping up a pool
+
+    Methods
+    -------
+    load()
+        Loads fetched text from file, if it exists.
+
+    save()
+        Saves fetched text to file. Returns True if saved.
+
+    is_fresh(key, now)
+        Returns True if text under 'key' was fetched less than 'ttl' minutes before time 'now' (default current time).
+
+    get(key, fetch, now)
+        Returns text under 'key', calling 'fetch' for it if there is none. Stale text is returned as it is and fetched
+        again in the background. Text from 'fetch' that is empty is not kept.
+
+    take(key, fetch, now)
+        Removes and returns a text from the pool under 'key', calling 'fetch' for it if the pool is empty. The pool is
+        filled back up to 'pool_size' in the background once half of it or more is used, or when it is stale.
+
+    fill(key, fetch)
+        Calls 'fetch' until the pool under 'key' holds 'pool_size' fresh texts, waiting 'throttle' seconds between
+        calls. Stops at the first empty text.
+
+    refresh(key, task)
+        Runs 'task' in a background thread and saves afterwards, unless a refresh for 'key' is already running.
+
+    wait(timeout)
+        Waits up to 'timeout' seconds (default no limit) for background refreshes to finish. Returns True if they all
+        finished.
+    """
+
+    def __init__(self, path, ttl=BlockCacheConst.TTL.value, pool_size=BlockCacheConst.POOL_SIZE.value,
+                 throttle=BlockCacheConst.THROTTLE.value):
+        self.path = path
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self.throttle = throttle
+        self.entries = {}
+        self.refreshing = {}
+        self.lock = threading.Lock()
+        self.load()
+        return
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self.entries
+
+        try:
+            with open(self.path, "r") as file:
+                self.entries = json.load(file)
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read block cache from '{self.path}'. Starting fresh.")
+            self.entries = {}
+
+        return self.entries
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}{BlockCacheConst.TEMP_SUFFIX.value}"
+            with self.lock:
+                with open(temp_path, "w") as file:
+                    json.dump(self.entries, file, indent=1)
+                os.replace(temp_path, self.path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to save block cache to '{self.path}'")
+            return False
+
+        return True
+
+    def is_fresh(self, key, now=None):
+        if now is None:
+            now = time.time()
+
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        return now - entry.get(BlockCacheConst.TIME.value, 0) < self.ttl * 60
+
+    def get(self, key, fetch, now=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            text = None if entry is None else entry.get(BlockCacheConst.TEXT.value)
+
+        if not text:
+            text = fetch()
+            if text:
+                with self.lock:
+                    self.entries[key] = {BlockCacheConst.TEXT.value: text, BlockCacheConst.TIME.value: time.time()}
+                self.save()
+            return text
+
+        if not self.is_fresh(key, now):
+            logging.info(f"Cached text for block \"{key}\" is stale, fetching it again in the background")
+            self.refresh(key, lambda: self.update(key, fetch))
+        else:
+            logging.info(f"Using cached text for block \"{key}\"")
+        return text
+
+    def update(self, key, fetch):
+        text = fetch()
+        # Stale text is better than nothing when the fetch fails
+        if text:
+            with self.lock:
+                self.entries[key] = {BlockCacheConst.TEXT.value: text, BlockCacheConst.TIME.value: time.time()}
+        return
+
+    def take(self, key, fetch, now=None):
+        with self.lock:
+            pool = self.entries.get(key, {}).get(BlockCacheConst.POOL.value, [])
+            text = pool.pop() if len(pool) > 0 else None
+            remaining = len(pool)
+
+        if text is None:
+            text = fetch()
+        else:
+            logging.info(f"Using cached text for block \"{key}\", {remaining} left")
+
+        # Topping up after every use would fetch on every run, so wait until half the pool is gone
+        if remaining <= self.pool_size // 2 or not self.is_fresh(key, now):
+            self.refresh(key, lambda: self.fill(key, fetch))
+        return text
+
+    def fill(self, key, fetch):
+        with self.lock:
+            entry = self.entries.get(key, {})
+            fresh = self.is_fresh(key)
+            needed = self.pool_size - len(entry.get(BlockCacheConst.POOL.value, [])) if fresh else self.pool_size
+
+        for i in range(needed):
+            if i > 0:
+                time.sleep(self.throttle)
+            text = fetch()
+            if not text:
+                # Most likely offline or rate limited, keep what was fetched and try again next time
+                break
+
+            with self.lock:
+                pool = self.entries.get(key, {}).get(BlockCacheConst.POOL.value, [])
+                # Newest texts are taken first, anything over the pool size is the oldest
+                pool = (pool + [text])[-self.pool_size:]
+                self.entries[key] = {BlockCacheConst.POOL.value: pool, BlockCacheConst.TIME.value: time.time()}
+            self.save()
+            logging.info(f"Fetched text {i + 1} of {needed} for block \"{key}\"")
+        return
+
+    def refresh(self, key, task):
+        def run():
+            try:
+                task()
+            except BaseException as e:
+                logging.error(e)
+            self.save()
+            with self.lock:
+                self.refreshing.pop(key, None)
+            return
+
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            thread = threading.Thread(target=run, daemon=True)
+            self.refreshing[key] = thread
+        thread.start()
+        return True
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            threads = list(self.refreshing.values())
+
+        for thread in threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return not any(thread.is_alive() for thread in threads)
@@ -2,10 +2,13 @@
 # -*- coding:utf-8 -*-
 
 import configparser
+import json
 import logging
 import os
 
-from piblo.constants import ConfigConst, ProvidersConst, AutomaticConst, StabilityConst, LLMConst
+from piblo.constants import ConfigConst, ProvidersConst, AutomaticConst, StabilityConst, LLMConst, FrameQueueConst, \
+    HealthConst, DiskCacheConst, RefreshConst, FrameStoreConst, CatalogConst, \
+    LineIndexConst, BlockCacheConst, FeedCacheConst
 from piblo.file_operations import FileOperations
 
 
@@ -66,6 +69,7 @@ class Configs:
         self.prompts_example = self.file.get_full_path(ConfigConst.FILE_PROMPTS_EG.value)
         self.resize_external = ConfigConst.FILE_RESIZE_EXTERNAL.value
         self.file_name_max_length = ConfigConst.FILE_NAME_MAX_LENGTH.value
+        self.cache_location = self.file.get_full_path(ConfigConst.FILE_CACHE_LOCATION.value)
 
         # Text Settings
         self.add_text = ConfigConst.TEXT_ADD_TEXT.value
@@ -77,6 +81,8 @@ class Configs:
         self.block_brackets = ConfigConst.TEXT_BLOCK_BRACKETS.value
         self.block_seperator = ConfigConst.TEXT_BLOCK_SEPERATOR.value
         self.subject_brackets = ConfigConst.TEXT_SUBJECT_BRACKETS.value
+        self.block_workers = ConfigConst.TEXT_BLOCK_WORKERS.value
+        self.block_timeout = ConfigConst.TEXT_BLOCK_TIMEOUT.value
         self.preamble_regex = ConfigConst.TEXT_PREAMBLE_REGEX.value
         self.artist_regex = ConfigConst.TEXT_ARTIST_REGEX.value
         self.remove_text = ConfigConst.TEXT_REMOVE_TEXT_LIST.value
@@ -118,6 +124,13 @@ class Configs:
 
         # Display Settings
         self.display_type = ConfigConst.DISPLAY_TYPE.value
+        self.palette_filter = None
+        self.quantize_mode = ConfigConst.QUANTIZE_MODE.value
+        self.partial_refresh = ConfigConst.REFRESH_PARTIAL.value
+        self.partial_max = ConfigConst.REFRESH_PARTIAL_MAX.value
+        self.full_refresh_every = ConfigConst.REFRESH_FULL_EVERY.value
+        self.save_base_frame = ConfigConst.REFRESH_SAVE_BASE.value
+        self.frame_store_size = ConfigConst.REFRESH_STORE_SIZE.value
 
         # Provider Settings
         self.external_amount = ProvidersConst.EXTERNAL_AMOUNT.value
@@ -131,8 +144,14 @@ class Configs:
         self.automatic_host = AutomaticConst.DEFAULT_HOST.value
         self.automatic_port = AutomaticConst.DEFAULT_PORT.value
         self.provider_fallback = ProvidersConst.PROVIDER_FALLBACK.value
+        self.race_providers = ProvidersConst.RACE_PROVIDERS.value
+        self.hedge_delay = ProvidersConst.HEDGE_DELAY.value
+        self.race_spend_cap = ProvidersConst.RACE_SPEND_CAP.value
+        self.circuit_failures = ProvidersConst.CIRCUIT_FAILURES.value
+        self.circuit_cool_down = ProvidersConst.CIRCUIT_COOL_DOWN.value
         self.stable_host = StabilityConst.DEFAULT_HOST.value
         self.aspect_ratio = StabilityConst.ASPECT_RATIO.value
+        self.stability_format = StabilityConst.OUTPUT_FORMAT.value
         self.llm_model = LLMConst.MODEL.value
         self.llm_temperature = LLMConst.TEMPERATURE.value
         self.llm_max_tokens = LLMConst.MAX_TOKENS.value
@@ -141,6 +160,7 @@ class Configs:
         # Logging Settings
         self.log_file = ConfigConst.LOGGING_FILE.value
         self.log_level = ConfigConst.LOGGING_LEVEL.value
+        self.trace_file = ConfigConst.LOGGING_TRACE_FILE.value
 
         # Generation Settings
         self.image_rotate = ConfigConst.GENERATION_ROTATE.value
@@ -162,6 +182,41 @@ class Configs:
         self.mastodon_client_cred_path = ConfigConst.MASTODON_CLIENT_CRED_PATH.value
         self.mastodon_user_cred_path = ConfigConst.MASTODON_USER_CRED_PATH.value
 
+        # Network Settings
+        self.connect_timeout = ConfigConst.NETWORK_CONNECT_TIMEOUT.value
+        self.read_timeout = ConfigConst.NETWORK_READ_TIMEOUT.value
+        self.network_retries = ConfigConst.NETWORK_RETRIES.value
+        self.retry_backoff = ConfigConst.NETWORK_BACKOFF.value
+        self.retry_backoff_max = ConfigConst.NETWORK_BACKOFF_MAX.value
+
+        # Daemon Settings
+        self.daemon_interval = ConfigConst.DAEMON_INTERVAL.value
+        self.daemon_schedule = ConfigConst.DAEMON_SCHEDULE.value
+
+        # Queue Settings
+        self.queue_size = ConfigConst.QUEUE_SIZE.value
+        self.fill_queue_in_daemon = ConfigConst.QUEUE_FILL_IN_DAEMON.value
+        self.queue_location = os.path.join(self.cache_location, FrameQueueConst.FOLDER.value)
+
+        # Cache Settings
+        self.response_cache_size = ConfigConst.CACHE_RESPONSE_SIZE.value
+        self.response_cache_location = os.path.join(self.cache_location, DiskCacheConst.RESPONSE_FOLDER.value)
+        self.external_cache_size = ConfigConst.CACHE_EXTERNAL_SIZE.value
+        self.external_cache_location = os.path.join(self.cache_location, DiskCacheConst.EXTERNAL_FOLDER.value)
+        self.use_catalog = ConfigConst.CACHE_USE_CATALOG.value
+        self.catalog_file = os.path.join(self.cache_location, CatalogConst.FILE.value)
+        self.use_line_index = ConfigConst.CACHE_LINE_INDEX.value
+        self.line_index_location = os.path.join(self.cache_location, LineIndexConst.FOLDER.value)
+        self.block_cache_ttl = ConfigConst.CACHE_BLOCK_TTL.value
+        self.block_pool_size = ConfigConst.CACHE_BLOCK_POOL.value
+        self.block_cache_file = os.path.join(self.cache_location, BlockCacheConst.FILE.value)
+        self.use_feed_cache = ConfigConst.CACHE_USE_FEED_CACHE.value
+        self.feed_cache_location = os.path.join(self.cache_location, FeedCacheConst.FOLDER.value)
+        self.health_file = os.path.join(self.cache_location, HealthConst.FILE.value)
+        self.last_frame_file = os.path.join(self.cache_location, RefreshConst.FILE.value)
+        self.base_frame_file = os.path.join(self.cache_location, RefreshConst.BASE_FILE.value)
+        self.frame_store_location = os.path.join(self.cache_location, FrameStoreConst.FOLDER.value)
+
         # Debug Settings
         self.test_epd_width = ConfigConst.TEST_EPD_WIDTH.value
         self.test_epd_height = ConfigConst.TEST_EPD_HEIGHT.value
@@ -212,6 +267,8 @@ class Configs:
                                                  fallback=ConfigConst.FILE_RESIZE_EXTERNAL.value)
         self.file_name_max_length = config.getint("File", "file_name_max_length",
                                                       fallback=ConfigConst.FILE_NAME_MAX_LENGTH.value)
+        self.cache_location = config.get("File", "cache_location", fallback=ConfigConst.FILE_CACHE_LOCATION.value)
+        self.cache_location = self.read_string(self.cache_location)
 
         # Text Settings
         self.add_text = config.getboolean("Text", "add_text", fallback=ConfigConst.TEXT_ADD_TEXT.value)
@@ -232,6 +289,8 @@ class Configs:
         self.block_seperator = self.read_string(self.block_seperator)
         self.subject_brackets = config.get("Text", "subject_brackets", fallback=ConfigConst.TEXT_SUBJECT_BRACKETS.value)
         self.subject_brackets= self.read_string(self.subject_brackets)
+        self.block_workers = config.getint("Text", "block_workers", fallback=ConfigConst.TEXT_BLOCK_WORKERS.value)
+        self.block_timeout = config.getfloat("Text", "block_timeout", fallback=ConfigConst.TEXT_BLOCK_TIMEOUT.value)
         self.preamble_regex = config.get("Text", "preamble_regex",
                                          fallback=ConfigConst.TEXT_PREAMBLE_REGEX.value)
         self.preamble_regex = self.read_string(self.preamble_regex)
@@ -291,6 +350,29 @@ class Configs:
         # Display (rest of EPD config is just passed straight into displayfactory
         self.display_type = config.get("EPD", "type", fallback=ConfigConst.DISPLAY_TYPE.value)
         self.display_type = self.read_string(self.display_type)
+        self.palette_filter = config.get("EPD", "palette_filter", fallback=None)
+        if self.palette_filter is not None:
+            try:
+                self.palette_filter = json.loads(self.palette_filter)
+            except ValueError as e:
+                logging.warning(e)
+                logging.warning(f"Unable to read palette_filter '{self.palette_filter}'")
+                self.palette_filter = None
+
+        # Quantize
+        self.quantize_mode = config.get("Quantize", "mode", fallback=ConfigConst.QUANTIZE_MODE.value)
+        self.quantize_mode = self.read_string(self.quantize_mode)
+
+        # Refresh
+        self.partial_refresh = config.getboolean("Refresh", "partial_refresh",
+                                                 fallback=ConfigConst.REFRESH_PARTIAL.value)
+        self.partial_max = config.getint("Refresh", "partial_max", fallback=ConfigConst.REFRESH_PARTIAL_MAX.value)
+        self.full_refresh_every = config.getint("Refresh", "full_refresh_every",
+                                                fallback=ConfigConst.REFRESH_FULL_EVERY.value)
+        self.save_base_frame = config.getboolean("Refresh", "save_base_frame",
+                                                 fallback=ConfigConst.REFRESH_SAVE_BASE.value)
+        self.frame_store_size = config.getint("Refresh", "frame_store_size",
+                                              fallback=ConfigConst.REFRESH_STORE_SIZE.value)
 
         # Provider
         self.external_amount = config.getint("Providers", "external_amount",
@@ -317,10 +399,22 @@ class Configs:
                                             fallback=AutomaticConst.DEFAULT_PORT.value)
         self.provider_fallback = config.getboolean("Providers", "provider_fallback",
                                                    fallback=ProvidersConst.PROVIDER_FALLBACK.value)
+        self.race_providers = config.getboolean("Providers", "race_providers",
+                                                fallback=ProvidersConst.RACE_PROVIDERS.value)
+        self.hedge_delay = config.getfloat("Providers", "hedge_delay", fallback=ProvidersConst.HEDGE_DELAY.value)
+        self.race_spend_cap = config.getint("Providers", "race_spend_cap",
+                                            fallback=ProvidersConst.RACE_SPEND_CAP.value)
+        self.circuit_failures = config.getint("Providers", "circuit_failures",
+                                              fallback=ProvidersConst.CIRCUIT_FAILURES.value)
+        self.circuit_cool_down = config.getfloat("Providers", "circuit_cool_down",
+                                                 fallback=ProvidersConst.CIRCUIT_COOL_DOWN.value)
         self.stable_host = config.get("Providers", "stable_host", fallback=StabilityConst.DEFAULT_HOST.value)
         self.stable_host = self.read_string(self.stable_host)
         self.aspect_ratio = config.get("Providers", "aspect_ratio", fallback=StabilityConst.ASPECT_RATIO.value)
         self.aspect_ratio = self.read_string(self.aspect_ratio )
+        self.stability_format = config.get("Providers", "stability_format",
+                                           fallback=StabilityConst.OUTPUT_FORMAT.value)
+        self.stability_format = self.read_string(self.stability_format)
         self.llm_model = config.get("Providers", "llm_model", fallback=LLMConst.MODEL.value)
         self.llm_model = self.read_string(self.llm_model)
         self.llm_temperature = config.getfloat("Providers", "llm_temperature", fallback=LLMConst.TEMPERATURE.value)
@@ -332,6 +426,8 @@ class Configs:
         self.log_file = config.get("Logging", "log_file", fallback=ConfigConst.LOGGING_FILE.value)
         self.log_file = self.read_string(self.log_file)
         self.log_level = config.getint("Logging", "log_level", fallback=ConfigConst.LOGGING_LEVEL.value)
+        self.trace_file = config.get("Logging", "trace_file", fallback=ConfigConst.LOGGING_TRACE_FILE.value)
+        self.trace_file = self.read_string(self.trace_file)
 
         # Generation Settings
         self.image_rotate = config.getint("Generation", "image_rotate", fallback=ConfigConst.GENERATION_ROTATE.value)
@@ -366,6 +462,37 @@ class Configs:
                                                   fallback=ConfigConst.MASTODON_USER_CRED_PATH.value)
         self.mastodon_user_cred_path = self.read_string(self.mastodon_user_cred_path)
 
+        # Network Settings
+        self.connect_timeout = config.getfloat("Network", "connect_timeout",
+                                               fallback=ConfigConst.NETWORK_CONNECT_TIMEOUT.value)
+        self.read_timeout = config.getfloat("Network", "read_timeout", fallback=ConfigConst.NETWORK_READ_TIMEOUT.value)
+        self.network_retries = config.getint("Network", "retries", fallback=ConfigConst.NETWORK_RETRIES.value)
+        self.retry_backoff = config.getfloat("Network", "backoff", fallback=ConfigConst.NETWORK_BACKOFF.value)
+        self.retry_backoff_max = config.getfloat("Network", "backoff_max",
+                                                 fallback=ConfigConst.NETWORK_BACKOFF_MAX.value)
+
+        # Daemon Settings
+        self.daemon_interval = config.getint("Daemon", "interval", fallback=ConfigConst.DAEMON_INTERVAL.value)
+        self.daemon_schedule = config.get("Daemon", "schedule", fallback=ConfigConst.DAEMON_SCHEDULE.value)
+        self.daemon_schedule = self.read_string(self.daemon_schedule)
+
+        # Queue Settings
+        self.queue_size = config.getint("Queue", "queue_size", fallback=ConfigConst.QUEUE_SIZE.value)
+        self.fill_queue_in_daemon = config.getboolean("Queue", "fill_queue_in_daemon",
+                                                      fallback=ConfigConst.QUEUE_FILL_IN_DAEMON.value)
+
+        # Cache Settings
+        self.response_cache_size = config.getint("Cache", "response_cache_size",
+                                                 fallback=ConfigConst.CACHE_RESPONSE_SIZE.value)
+        self.external_cache_size = config.getint("Cache", "external_cache_size",
+                                                 fallback=ConfigConst.CACHE_EXTERNAL_SIZE.value)
+        self.use_catalog = config.getboolean("Cache", "use_catalog", fallback=ConfigConst.CACHE_USE_CATALOG.value)
+        self.use_line_index = config.getboolean("Cache", "use_line_index", fallback=ConfigConst.CACHE_LINE_INDEX.value)
+        self.block_cache_ttl = config.getfloat("Cache", "block_cache_ttl", fallback=ConfigConst.CACHE_BLOCK_TTL.value)
+        self.block_pool_size = config.getint("Cache", "block_pool_size", fallback=ConfigConst.CACHE_BLOCK_POOL.value)
+        self.use_feed_cache = config.getboolean("Cache", "use_feed_cache",
+                                                fallback=ConfigConst.CACHE_USE_FEED_CACHE.value)
+
         # Debug Settings
         self.test_epd_width = config.getint("Debug", "test_epd_width", fallback=ConfigConst.TEST_EPD_WIDTH.value)
         self.test_epd_height = config.getint("Debug", "test_epd_height", fallback=ConfigConst.TEST_EPD_HEIGHT.value)
@@ -378,6 +505,20 @@ class Configs:
         # Set full paths for other paths
         self.external_image_location = self.file.get_full_path(self.external_image_location)
         self.generated_image_location = self.file.get_full_path(self.generated_image_location)
+        self.cache_location = self.file.get_full_path(self.cache_location)
+        self.queue_location = os.path.join(self.cache_location, FrameQueueConst.FOLDER.value)
+        self.health_file = os.path.join(self.cache_location, HealthConst.FILE.value)
+        self.last_frame_file = os.path.join(self.cache_location, RefreshConst.FILE.value)
+        self.base_frame_file = os.path.join(self.cache_location, RefreshConst.BASE_FILE.value)
+        self.frame_store_location = os.path.join(self.cache_location, FrameStoreConst.FOLDER.value)
+        self.response_cache_location = os.path.join(self.cache_location, DiskCacheConst.RESPONSE_FOLDER.value)
+        self.external_cache_location = os.path.join(self.cache_location, DiskCacheConst.EXTERNAL_FOLDER.value)
+        self.catalog_file = os.path.join(self.cache_location, CatalogConst.FILE.value)
+        self.line_index_location = os.path.join(self.cache_location, LineIndexConst.FOLDER.value)
+        self.block_cache_file = os.path.join(self.cache_location, BlockCacheConst.FILE.value)
+        self.feed_cache_location = os.path.join(self.cache_location, FeedCacheConst.FOLDER.value)
+        if self.trace_file != "":
+            self.trace_file = self.file.get_full_path(self.trace_file)
         self.font_file = self.file.get_full_path(self.font_file)
         self.override_path = self.file.get_full_path(self.override_path)
         self.credential_path = self.file.get_full_path(self.credential_path)
@@ -407,6 +548,6 @@ class Configs:
 
     @staticmethod
     def read_string(s):
-        if s[0] == "\"" and s[len(s) - 1] == "\"":
+        if len(s) > 1 and s[0] == "\"" and s[len(s) - 1] == "\"":
             s = s[1:-1]
         return s
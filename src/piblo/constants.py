@@ -28,6 +28,7 @@ class ConfigConst(Enum):
     FILE_PROMPTS_EG = "examples/prompts/prompts-example.txt"
     FILE_RESIZE_EXTERNAL = True
     FILE_NAME_MAX_LENGTH = 100
+    FILE_CACHE_LOCATION = "cache"
 
     # Text Settings
     TEXT_ADD_TEXT = False
@@ -40,6 +41,8 @@ class ConfigConst(Enum):
     TEXT_BLOCK_BRACKETS = "<>"
     TEXT_BLOCK_SEPERATOR = ";"
     TEXT_SUBJECT_BRACKETS = "{}"
+    TEXT_BLOCK_WORKERS = 4
+    TEXT_BLOCK_TIMEOUT = 30
     TEXT_PREAMBLE_REGEX = ".*- "
     TEXT_ARTIST_REGEX = " by "
     TEXT_REMOVE_TEXT = "\"()\"\n\"[]\"\n\"{}\""
@@ -87,6 +90,7 @@ class ConfigConst(Enum):
     # Logging Settings
     LOGGING_FILE = "pycasso.log"
     LOGGING_LEVEL = logging.DEBUG
+    LOGGING_TRACE_FILE = ""
 
     # Generation Settings
     GENERATION_ROTATE = 0
@@ -108,6 +112,40 @@ class ConfigConst(Enum):
     WAIT_TO_RUN = 30
     CHARGE_DISPLAY = 15
 
+    # Daemon Settings
+    DAEMON_INTERVAL = 60
+    DAEMON_SCHEDULE = ""
+
+    # Network Settings
+    NETWORK_CONNECT_TIMEOUT = 5.0
+    NETWORK_READ_TIMEOUT = 90.0
+    NETWORK_RETRIES = 2
+    NETWORK_BACKOFF = 1.0
+    NETWORK_BACKOFF_MAX = 30.0
+
+    # Queue Settings
+    QUEUE_SIZE = 5
+    QUEUE_FILL_IN_DAEMON = False
+
+    # Quantize Settings
+    QUANTIZE_MODE = "none"
+
+    # Refresh Settings
+    REFRESH_PARTIAL = False
+    REFRESH_PARTIAL_MAX = 25
+    REFRESH_FULL_EVERY = 10
+    REFRESH_SAVE_BASE = True
+    REFRESH_STORE_SIZE = 5
+
+    # Cache Settings
+    CACHE_RESPONSE_SIZE = 100
+    CACHE_EXTERNAL_SIZE = 50
+    CACHE_USE_CATALOG = True
+    CACHE_LINE_INDEX = False
+    CACHE_BLOCK_TTL = 0
+    CACHE_BLOCK_POOL = 5
+    CACHE_USE_FEED_CACHE = True
+
     # Debug Settings
     TEST_EPD_WIDTH = 500
     TEST_EPD_HEIGHT = 300
@@ -131,6 +169,17 @@ class ProvidersConst(Enum):
 
     PROVIDER_FALLBACK = True
 
+    RACE_PROVIDERS = False
+    HEDGE_DELAY = 15.0
+    RACE_SPEND_CAP = 1
+
+    CIRCUIT_FAILURES = 3
+    CIRCUIT_COOL_DOWN = 60
+    # Providers that cost money per image, and providers that load from files without a prompt
+    PAID = [2, 3]
+    FILE_MODES = [0, 1]
+    GENERATORS = [2, 3, 5]
+
     USE_KEYCHAIN = False
     CREDENTIAL_PATH = ".creds"
     CREDENTIAL_PATH_EG = "examples/.creds-example"
@@ -150,7 +199,19 @@ class StabilityConst(Enum):
     HOST = "STABILITY_HOST"
     DEFAULT_HOST = "https://api.stability.ai/v2beta/stable-image/generate/core"
     MULTIPLE = 64
-    ASPECT_RATIO = "16:9"
+    AUTO = "auto"
+    ASPECT_RATIO = "auto"
+    # Aspect ratios accepted by the API, as width:height
+    ASPECT_RATIOS = ["21:9", "16:9", "3:2", "5:4", "1:1", "4:5", "2:3", "9:16", "9:21"]
+    OUTPUT_FORMAT = "auto"
+    LOSSLESS_FORMAT = "png"
+    # API format name and PIL feature needed to decode it, in order of preference
+    LOSSY_FORMATS = {
+        "webp": "webp",
+        "jpeg": "jpg"
+    }
+    # Display modes with so few colours that lossy compression artefacts are dithered away
+    LOSSY_MODES = ["bw", "gray4"]
 
 
 class AutomaticConst(Enum):
@@ -168,6 +229,228 @@ class DalleConst(Enum):
     }
 
 
+class HttpConst(Enum):
+    CONNECT_TIMEOUT = 5.0
+    READ_TIMEOUT = 90.0
+    RETRIES = 2
+    BACKOFF = 1.0
+    BACKOFF_MAX = 30.0
+    POOL_CONNECTIONS = 4
+    POOL_MAXSIZE = 8
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+    # Methods safe to send twice. Others are only retried when the connection was never made.
+    RETRY_METHODS = ["GET", "HEAD"]
+    RETRY_AFTER = "Retry-After"
+    # Bytes read from the network at a time when streaming image downloads
+    CHUNK_SIZE = 64 * 1024
+
+
+class HealthConst(Enum):
+    FILE = "provider_health.json"
+    TEMP_SUFFIX = ".tmp"
+    FAILURE_LIMIT = 3
+    COOL_DOWN = 60
+    # Weight given to the newest latency in the moving average
+    LATENCY_ALPHA = 0.3
+
+    FAILURES = "failures"
+    LATENCY = "latency"
+    OPENED = "opened"
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class SchedulerConst(Enum):
+    DEFAULT_INTERVAL = 60
+    MINUTE_RANGE = (0, 59)
+    HOUR_RANGE = (0, 23)
+    DAY_RANGE = (1, 31)
+    MONTH_RANGE = (1, 12)
+    WEEKDAY_RANGE = (0, 6)
+    SEARCH_DAYS = 366 * 4
+
+
+class DiskCacheConst(Enum):
+    MAX_BYTES = 100 * 1024 * 1024
+    MEGABYTE = 1024 * 1024
+    EXTENSION = "png"
+    TEMP_SUFFIX = ".tmp"
+    RESPONSE_FOLDER = "responses"
+    EXTERNAL_FOLDER = "external"
+    ICON_FOLDER = "icons"
+    ICON_MAX_BYTES = 1024 * 1024
+
+
+class BlockCacheConst(Enum):
+    FILE = "block_cache.json"
+    TEMP_SUFFIX = ".tmp"
+    TTL = 60
+    POOL_SIZE = 5
+    # Seconds between fetches when topping up a pool. zenquotes allows 5 requests in 30 seconds.
+    THROTTLE = 8
+
+    TEXT = "text"
+    POOL = "pool"
+    TIME = "time"
+
+
+class FeedCacheConst(Enum):
+    FOLDER = "feeds"
+    EXTENSION = "json"
+    TEMP_SUFFIX = ".tmp"
+    WEB_SCHEMES = ("http://", "https://")
+    NOT_MODIFIED = 304
+
+    ETAG_HEADER = "ETag"
+    MODIFIED_HEADER = "Last-Modified"
+    IF_NONE_MATCH = "If-None-Match"
+    IF_MODIFIED_SINCE = "If-Modified-Since"
+
+    ETAG = "etag"
+    MODIFIED = "modified"
+    ENTRIES = "entries"
+    # RSS names feedparser stores under another name
+    TAG_ALIASES = {"description": "summary", "guid": "id", "pubDate": "published", "date": "updated"}
+
+
+class LineIndexConst(Enum):
+    FOLDER = "line_index"
+    EXTENSION = "npy"
+    TEMP_SUFFIX = ".tmp"
+    ENCODING = "utf-8"
+
+
+class CatalogConst(Enum):
+    FILE = "catalog.db"
+    TIMEOUT = 10.0
+
+    # Columns returned for each image
+    PATH = "path"
+    TITLE = "title"
+    ARTIST = "artist"
+    PROMPT = "prompt"
+    WIDTH = "width"
+    HEIGHT = "height"
+    SHOWN = "shown"
+    LAST_SHOWN = "last_shown"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS folders (
+            location TEXT NOT NULL,
+            source INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            settings TEXT NOT NULL,
+            PRIMARY KEY (location, source)
+        );
+        CREATE TABLE IF NOT EXISTS images (
+            path TEXT PRIMARY KEY,
+            folder TEXT NOT NULL,
+            source INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            title TEXT,
+            artist TEXT,
+            prompt TEXT,
+            shown INTEGER NOT NULL DEFAULT 0,
+            last_shown REAL
+        );
+        CREATE INDEX IF NOT EXISTS images_folder ON images (folder, source);
+    """
+    # Keeps display history when a changed file is read again
+    UPSERT = """
+        INSERT INTO images (path, folder, source, size, mtime, width, height, title, artist, prompt)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (path) DO UPDATE SET folder = excluded.folder, source = excluded.source, size = excluded.size,
+            mtime = excluded.mtime, width = excluded.width, height = excluded.height, title = excluded.title,
+            artist = excluded.artist, prompt = excluded.prompt
+    """
+
+
+class FrameQueueConst(Enum):
+    FOLDER = "queue"
+    SIZE = 5
+    EXTENSION = "png"
+    FORMAT = "PNG"
+    TEMP_SUFFIX = ".tmp"
+
+    # Metadata stored with each frame, alongside PropertiesConst title, artist and prompt
+    PROVIDER = "provider"
+    FULL_TEXT = "full_text"
+    CROP_LEFT = "crop_left"
+    CROP_RIGHT = "crop_right"
+
+
+class FrameStoreConst(Enum):
+    FOLDER = "frames"
+    SIZE = 5
+    EXTENSION = "npy"
+    TEMP_SUFFIX = ".tmp"
+
+
+class RefreshConst(Enum):
+    FILE = "last_frame.png"
+    # Last image before icons and text were added, with the same metadata as a queued frame
+    BASE_FILE = "base_frame.png"
+    FORMAT = "PNG"
+    TEMP_SUFFIX = ".tmp"
+    # Panels write whole bytes of pixels, so partial refresh boxes are widened to multiples of this
+    ALIGN = 8
+    # Method a display driver must offer to refresh only part of the panel, called with the full frame and a box.
+    # omni-epd has no such method, so drivers without it always get a full refresh.
+    PARTIAL_METHOD = "display_partial"
+
+    # Metadata stored with the last frame
+    PARTIAL_COUNT = "partial_count"
+
+    # Kinds of refresh
+    FULL = "full"
+    PARTIAL = "partial"
+    SKIP = "skip"
+
+
+class TraceConst(Enum):
+    NET_DEV_PATH = "/proc/net/dev"
+    LOOPBACK = "lo"
+    PERCENTILES = [50, 90, 99]
+    # Trace file is moved aside once it grows past this many kilobytes, keeping one old file
+    MAX_SIZE = 512
+    OLD_SUFFIX = ".old"
+
+    # Keys used in each trace line
+    STARTED = "started"
+    NAME = "name"
+    WALL = "wall"
+    CPU = "cpu"
+    BYTES = "bytes"
+    PEAK_RSS = "peak_rss"
+    # Peak memory is only known for the whole process, so phases record how much they raised it
+    PEAK_RSS_RISE = "peak_rss_rise"
+    PHASES = "phases"
+    TOTAL = "total"
+    COUNT = "count"
+
+    # Phases of a run
+    LOAD_CONFIG = "load_config"
+    REFRESH_CONFIG = "refresh_config"
+    LOAD_DISPLAY = "load_display"
+    LOAD_QUEUED_FRAME = "load_queued_frame"
+    LOAD_BASE_FRAME = "load_base_frame"
+    LOAD_STORED_FRAME = "load_stored_frame"
+    STORE_FRAME = "store_frame"
+    SAVE_BASE_FRAME = "save_base_frame"
+    FETCH_IMAGE = "fetch_image"
+    SAVE_IMAGE = "save_image"
+    CROP_IMAGE = "crop_image"
+    DRAW_ICONS = "draw_icons"
+    ADD_TEXT = "add_text"
+    QUANTIZE = "quantize"
+    DISPLAY = "display"
+    POST_IMAGE = "post_image"
+
+
 class PiJuiceConst(Enum):
     STATUS_ROOT = "data"
     STATUS_POWER = "powerInput"
@@ -231,12 +514,28 @@ class UnitTestConst(Enum):
     PROMPT_BLOCK_FOLDER = "test_prompt_block_content"
     PROMPT_BLOCK_FILE = "test_block.txt"
     PROMPT_BLOCK_FILE_PARSE_BRACKETS = "test_block_parse_brackets.txt"
+    QUEUE_FOLDER = "test_queue"
+    TRACE_FILE = "test_trace.jsonl"
+    HEALTH_FILE = "test_health.json"
+    CACHE_FOLDER = "test_cache"
+    LAST_FRAME_FILE = "test_last_frame.png"
+    BASE_FRAME_FILE = "test_base_frame.png"
+    STORE_FOLDER = "test_frames"
+    CATALOG_FILE = "test_catalog.db"
+    LINE_INDEX_FOLDER = "test_line_index"
+    BLOCK_CACHE_FILE = "test_block_cache.json"
+    FEED_FOLDER = "test_feeds"
+    IMPORT_TIME_BUDGET = 3.0
+    LAZY_MODULES = ["openai", "webuiapi", "keyring", "mastodon", "feedparser", "requests", "omni_epd"]
 
 
 class ImageConst(Enum):
     CONVERT_MODE = "RGB"
     DRAW_MODE = "RGBA"
     SUPPORTED_MODES = ["RGB", "RGBA"]
+    # Most fonts and text widths kept between refreshes, least recently used are dropped first
+    FONT_CACHE_SIZE = 64
+    TEXT_LENGTH_CACHE_SIZE = 4096
 
 
 class EPDConst(Enum):
@@ -249,6 +548,27 @@ class EPDConst(Enum):
     FOUR_GRAY = "gray4"
 
 
+class QuantizeConst(Enum):
+    NONE = "none"
+    NEAREST = "nearest"
+    ORDERED = "ordered"
+    DIFFUSION = "diffusion"
+
+    # Colours each display mode can show. Other modes need palette_filter set in [EPD]
+    PALETTES = {
+        "bw": [[0, 0, 0], [255, 255, 255]],
+        "gray4": [[0, 0, 0], [85, 85, 85], [170, 170, 170], [255, 255, 255]],
+        "red": [[0, 0, 0], [255, 255, 255], [255, 0, 0]],
+        "yellow": [[0, 0, 0], [255, 255, 255], [255, 255, 0]],
+        "4color": [[0, 0, 0], [255, 255, 255], [255, 0, 0], [255, 255, 0]]
+    }
+
+    # Bits kept per channel when looking up the nearest palette colour
+    LUT_BITS = 5
+    # Ordered dithering uses a 2 ^ BAYER_ORDER square threshold map
+    BAYER_ORDER = 3
+
+
 class IconConst(Enum):
     LOC_TOP_LEFT = "nw"
     LOC_TOP_RIGHT = "ne"
@@ -320,6 +640,7 @@ class BlockConst(Enum):
 class BlockInfoConst(Enum):
     ZENQUOTE_URL = "https://zenquotes.io/api/random"
     DADJOKE_URL = "https://icanhazdadjoke.com/"
+    READ_TIMEOUT = 10
 
 
 class LLMConst(Enum):
@@ -335,3 +656,11 @@ class Regex(Enum):
     FILE_REGEX = r'[\\/*?:\"\'<>|]'
     APOSTROPHE = '\''
     APOSTROPHE_REGEX = r'[‘’]'
+
+
+class TemplateConst(Enum):
+    BRACKETS = ["()"]
+    SEPARATOR = '|'
+    WEIGHT = ':'
+    LOOP_LIMIT = 100
+    CACHE_SIZE = 256
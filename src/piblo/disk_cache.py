@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Size limited cache of images on disk, looked up by a hash of whatever produced them
+
+import glob
+import hashlib
+import json
+import logging
+import os
+
+from PIL import Image
+
+from piblo.constants import DiskCacheConst
+
+
+class DiskCache:
+    """
+    A class used to keep images on disk under a key made from the settings that produced them, removing the least
+    recently used images once the cache is larger than 'max_bytes'.
+
+    Attributes
+    ----------
+    location:string
+        folder to keep cached images in
+
+    max_bytes:int
+        largest total size in bytes of cached images. 0 disables the cache.
+
+    extension:string
+        file extension and format to save images with
+
+    Methods
+    -------
+    get_key(*parts)
+        Returns a sha256 hex string made from all 'parts', which can be any values that can be written as JSON.
+
+    get_path(key)
+        Returns file path of the image stored under 'key'.
+
+    get(key)
+        Returns PIL image stored under 'key', or None if it is not cached. Marks the image as recently used.
+
+    put(key, image)
+        Stores PIL image 'image' under 'key', then removes least recently used images until under 'max_bytes'.
+        Returns True if stored.
+
+    get_size()
+        Returns total size in bytes of all cached images.
+
+    evict()
+        Removes least recently used images until the cache is under 'max_bytes'. Returns number of images removed.
+    """
+
+    def __init__(self, location, max_bytes=DiskCacheConst.MAX_BYTES.value, extension=DiskCacheConst.EXTENSION.value):
+        self.location = location
+        self.max_bytes = max_bytes
+        self.extension = extension
+        return
+
+    @staticmethod
+    def get_key(*parts):
+        text = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.location, f"{key}.{self.extension}")
+
+    def get_files(self):
+        return glob.glob(os.path.join(self.location, f"*.{self.extension}"))
+
+    def get(self, key):
+        if self.max_bytes <= 0:
+            return None
+
+        path = self.get_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            image = Image.open(path)
+            image.load()
+            # Modified time is used as last used time for eviction
+            os.utime(path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read cached image '{path}'. Removing it.")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        logging.info(f"Loaded cached image {path}")
+        return image
+
+    def put(self, key, image):
+        if self.max_bytes <= 0 or image is None:
+            return False
+
+        path = self.get_path(key)
+        temp_path = f"{path}{DiskCacheConst.TEMP_SUFFIX.value}"
+        try:
+            os.makedirs(self.location, exist_ok=True)
+            image.save(temp_path, format=Image.registered_extensions()[f".{self.extension}"])
+            os.replace(temp_path, path)
+        except (IOError, OSError, KeyError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to cache image to '{path}'")
+            return False
+
+        self.evict()
+        return True
+
+    def get_size(self):
+        total = 0
+        for path in self.get_files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def evict(self):
+        entries = []
+        total = 0
+        for path in self.get_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        # Oldest first
+        entries.sort()
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError as e:
+                logging.warning(e)
+
+        if removed > 0:
+            logging.info(f"Removed {removed} image(s) from cache '{self.location}'")
+        return removed
@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Keeps parsed RSS feeds with their validators, so an unchanged feed is neither downloaded nor parsed again
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from piblo.constants import FeedCacheConst, BlockInfoConst
+from piblo.http_pool import HttpPool
+from piblo.lazy_module import LazyModule
+
+# Network libraries are only loaded once a feed is read
+feedparser = LazyModule("feedparser")
+requests = LazyModule("requests")
+
+
+class FeedCache:
+    """
+    A class used to keep the entries of RSS feeds, along with the ETag and Last-Modified headers the feed was sent with.
+
+    Web feeds are requested with those headers, so a feed that hasn't changed is answered with a 304 and no body, and
+    its entries are served from the cache without parsing. Only the text fields of each entry are kept. Feeds that are
+    local files are parsed again only when the file changes. If a feed can't be reached, its cached entries are used.
+
+    Attributes
+    ----------
+    location:string
+        folder to save feeds in. None keeps them in memory only.
+
+    feeds:dict
+        feeds in memory, keyed by url or path
+
+    Methods
+    -------
+    get_path(url)
+        Returns file path the feed from 'url' is saved to.
+
+    load(url)
+        Returns dictionary of the cached feed from 'url', or None if it is not cached.
+
+    save(url, feed)
+        Keeps dictionary 'feed' as the feed from 'url', saving it to file if 'location' is set. Returns True if saved.
+
+    get_entries(url)
+        Returns list of dictionaries of text fields for each entry in the feed at 'url', newest first as given by the
+        feed, or None if the feed can't be read.
+
+    get_file_entries(path)
+        Returns list of dictionaries of text fields for each entry in the feed file at 'path', or None if it can't be
+        read.
+
+    get_text_entries(entries)
+        Returns list of dictionaries of only the string fields of each feedparser entry in 'entries'.
+
+    get_text(entry, tag)
+        Returns text of 'tag' in cached 'entry', also looking under the name feedparser uses for it, or None.
+    """
+
+    def __init__(self, location=None):
+        self.location = location
+        self.feeds = {}
+        self.lock = threading.Lock()
+        return
+
+    def get_path(self, url):
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.location, f"{name}.{FeedCacheConst.EXTENSION.value}")
+
+    def load(self, url):
+        with self.lock:
+            feed = self.feeds.get(url)
+        if feed is not None or self.location is None:
+            return feed
+
+        path = self.get_path(url)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r") as file:
+                feed = json.load(file)
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read cached feed '{path}'")
+            return None
+
+        with self.lock:
+            self.feeds[url] = feed
+        return feed
+
+    def save(self, url, feed):
+        with self.lock:
+            self.feeds[url] = feed
+        if self.location is None:
+            return False
+
+        path = self.get_path(url)
+        temp_path = f"{path}{FeedCacheConst.TEMP_SUFFIX.value}"
+        try:
+            os.makedirs(self.location, exist_ok=True)
+            with open(temp_path, "w") as file:
+                json.dump(feed, file)
+            os.replace(temp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to save feed to '{path}'")
+            return False
+
+        return True
+
+    def get_entries(self, url):
+        if not url.startswith(FeedCacheConst.WEB_SCHEMES.value):
+            return self.get_file_entries(url)
+
+        feed = self.load(url)
+        headers = {}
+        if feed is not None:
+            if feed.get(FeedCacheConst.ETAG.value):
+                headers[FeedCacheConst.IF_NONE_MATCH.value] = feed[FeedCacheConst.ETAG.value]
+            if feed.get(FeedCacheConst.MODIFIED.value):
+                headers[FeedCacheConst.IF_MODIFIED_SINCE.value] = feed[FeedCacheConst.MODIFIED.value]
+
+        try:
+            response = HttpPool.get(url, headers=headers, read_timeout=BlockInfoConst.READ_TIMEOUT.value)
+            if response.status_code == FeedCacheConst.NOT_MODIFIED.value and feed is not None:
+                logging.info(f"Feed \"{url}\" not modified, using cached entries")
+                return feed[FeedCacheConst.ENTRIES.value]
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Unable to fetch feed \"{url}\": {e}")
+            if feed is not None:
+                logging.info(f"Using cached entries for feed \"{url}\"")
+                return feed[FeedCacheConst.ENTRIES.value]
+            return None
+
+        entries = FeedCache.get_text_entries(feedparser.parse(response.content).entries)
+        self.save(url, {
+            FeedCacheConst.ETAG.value: response.headers.get(FeedCacheConst.ETAG_HEADER.value),
+            FeedCacheConst.MODIFIED.value: response.headers.get(FeedCacheConst.MODIFIED_HEADER.value),
+            FeedCacheConst.ENTRIES.value: entries
+        })
+        logging.info(f"Fetched {len(entries)} entries from feed \"{url}\"")
+        return entries
+
+    def get_file_entries(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logging.warning(e)
+            return None
+
+        # Files have no validators, their modified time and size stand in for them
+        key = [stat.st_mtime_ns, stat.st_size]
+        with self.lock:
+            feed = self.feeds.get(path)
+        if feed is not None and feed[FeedCacheConst.MODIFIED.value] == key:
+            return feed[FeedCacheConst.ENTRIES.value]
+
+        entries = FeedCache.get_text_entries(feedparser.parse(path).entries)
+        with self.lock:
+            self.feeds[path] = {FeedCacheConst.MODIFIED.value: key, FeedCacheConst.ENTRIES.value: entries}
+        return entries
+
+    @staticmethod
+    def get_text_entries(entries):
+        return [{tag: value for tag, value in entry.items() if isinstance(value, str)} for entry in entries]
+
+    @staticmethod
+    def get_text(entry, tag):
+        text = entry.get(tag)
+        if text is None and tag in FeedCacheConst.TAG_ALIASES.value:
+            text = entry.get(FeedCacheConst.TAG_ALIASES.value[tag])
+        return text
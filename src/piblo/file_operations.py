@@ -8,6 +8,8 @@ import random
 import re
 import shutil
 from piblo.constants import Regex
+from piblo.line_index import LineIndex
+from piblo.prompt_template import PromptTemplate
 
 
 class FileOperations:
@@ -42,7 +44,7 @@ class FileOperations:
         returns the first line from a text file located at 'path'
 
     get_random_line(path)
-        returns a random line from file located at 'path'
+        returns a random line by weight from file located at 'path', read through its line index
 
     backup_file(primary_path, backup_path)
         if 'primary_path' does not exist, copies file at 'backup_path' to 'primary_path'.
@@ -52,7 +54,7 @@ class FileOperations:
         Returns full file system path of path relative to config_wrapper.py file.
 
     parse_text(text)
-        String parsing method that pulls out text with random options in it
+        String parsing method that pulls out text with random options in it, choosing each by its weight
 
     parse_weighted_lines(weighted_lines)
         Takes a list of strings 'weighted_lines' and parses leading integers in the string before a ':' character.
@@ -144,25 +146,11 @@ class FileOperations:
 
     @staticmethod
     def get_first_line(path):
-        lines = FileOperations.get_lines(path)
-        lines = FileOperations.parse_weighted_lines(lines)
-        size = len(lines)
-        if size == 0:
-            logging.warning(f"No lines to parse found in file {path}")
-            return
-        return lines[0]
+        return LineIndex.get_first_line(path)
 
     @staticmethod
     def get_random_line(path):
-        lines = FileOperations.get_lines(path)
-        lines = FileOperations.parse_weighted_lines(lines)
-        size = len(lines)
-        if size == 0:
-            logging.warning(f"No lines to parse found in file {path}")
-            return
-        random.seed()
-        r = random.randint(0, size - 1)
-        return lines[r]
+        return LineIndex.get_random_line(path)
 
     @staticmethod
     def backup_file(primary_path, backup_path):
@@ -213,51 +201,23 @@ class FileOperations:
             # Get random item
             bracket = bracket.replace(bracket_one, '').replace(bracket_two, '')
             random.seed()
-            options = FileOperations.parse_weighted_lines(bracket.split('|'))
-            option = random.choice(options)
+            # Picked by weight without repeating each option 'weight' times
+            option = PromptTemplate.choose_option(bracket.split('|'))
             # Substitute brackets
             text = re.sub(regex, option, text, 1)
         return text
 
     @staticmethod
     def parse_text_nested(text="", bracket_one="(", bracket_two=")", loop_limit=100):
-        if not FileOperations.check_brackets(text):
-            logging.warning(f"Mismatching brackets in \"{text}\"")
-            return text
-
-        # Get everything inside brackets
-        regex = fr"(\{bracket_one}[^\{bracket_one}\{bracket_two}]*\{bracket_two})"
-        match = re.search(regex, text)
-
-        while match is not None and loop_limit > 0:
-            bracket = match.group()
-            bracket = bracket.replace(bracket_one, '').replace(bracket_two, '')
-
-            # Get random from split
-            random.seed()
-            options = FileOperations.parse_weighted_lines(bracket.split('|'))
-            option = random.choice(options)
-
-            # Substitute brackets
-            text = re.sub(regex, option, text, 1)
-            match = re.search(regex, text)
-
-            # Use loop_limit to stop this going forever due to error. Should not happen
-            loop_limit -= 1
-
-        return text
+        return PromptTemplate.expand_choices(text, [bracket_one + bracket_two], loop_limit)
 
     @staticmethod
     def parse_weighted_lines(weighted_lines):
         lines = []
         # Find any colons at the start of the line, use preceding text if it's an integer
         for line in weighted_lines:
-            amount = 1
-            split = line.split(':', maxsplit=1)
             # If there is a valid colon, split it on the first one, add it that many times to list
-            if len(split) > 1 and split[0].isdigit():
-                amount = int(split[0])
-                line = split[1]
+            amount, line = PromptTemplate.split_weight(line)
             for i in range(amount):
                 lines.append(line)
         return lines
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# On-disk queue of frames prepared ahead of time so a run can go straight to the display
+
+import glob
+import logging
+import os
+import time
+
+from PIL import Image, PngImagePlugin
+
+from piblo.constants import FrameQueueConst, ImageConst
+
+
+class FrameQueue:
+    """
+    A class used to store display-ready frames on disk, oldest first, so providers can be called ahead of time.
+
+    Attributes
+    ----------
+    location:string
+        folder the queued frames are stored in
+
+    max_size:int
+        maximum number of frames kept in the queue
+
+    Methods
+    -------
+    get_frames()
+        Returns paths of all queued frames, oldest first.
+
+    size()
+        Returns the number of frames in the queue.
+
+    is_full()
+        Returns True if the queue holds 'max_size' frames or more.
+
+    push(image, info)
+        Adds PIL image 'image' to the end of the queue with dictionary of strings 'info' stored as metadata.
+        Returns True on success, False if the queue is full or the frame could not be saved.
+
+    pop(width, height)
+        Removes the oldest frame from the queue. Frames that are not 'width' x 'height' (when provided) are
+        discarded. Returns tuple of PIL image and info dictionary, or (None, None) if the queue is empty.
+    """
+
+    def __init__(self, location, max_size=FrameQueueConst.SIZE.value):
+        self.location = location
+        self.max_size = max_size
+        return
+
+    def get_frames(self):
+        frames = glob.glob(os.path.join(self.location, f"*.{FrameQueueConst.EXTENSION.value}"))
+        # Names are zero padded timestamps, so sorting puts the oldest first
+        frames.sort()
+        return frames
+
+    def size(self):
+        return len(self.get_frames())
+
+    def is_full(self):
+        return self.size() >= self.max_size
+
+    def push(self, image, info=None):
+        if self.is_full():
+            logging.info(f"Frame queue at '{self.location}' is full")
+            return False
+
+        if info is None:
+            info = {}
+
+        try:
+            os.makedirs(self.location, exist_ok=True)
+            metadata = PngImagePlugin.PngInfo()
+            for key, value in info.items():
+                metadata.add_text(key, "" if value is None else str(value))
+
+            name = f"{time.time_ns():020d}.{FrameQueueConst.EXTENSION.value}"
+            path = os.path.join(self.location, name)
+            temp_path = f"{path}{FrameQueueConst.TEMP_SUFFIX.value}"
+
+            # Write then rename so a frame is never read half written
+            image.save(temp_path, format=FrameQueueConst.FORMAT.value, pnginfo=metadata)
+            os.replace(temp_path, path)
+            logging.info(f"Queued frame {path}")
+
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to add frame to queue at '{self.location}'")
+            return False
+
+        return True
+
+    def pop(self, width=None, height=None):
+        for path in self.get_frames():
+            image = None
+            info = None
+            try:
+                with Image.open(path) as frame:
+                    frame.load()
+                    info = dict(frame.text)
+                    image = frame.convert(ImageConst.CONVERT_MODE.value)
+            except (IOError, OSError) as e:
+                logging.warning(e)
+                logging.warning(f"Unable to read queued frame '{path}'. Discarding.")
+
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(e)
+
+            if image is None:
+                continue
+
+            if width is not None and height is not None and image.size != (width, height):
+                logging.info(f"Queued frame '{path}' is {image.size}, not {(width, height)}. Discarding.")
+                continue
+
+            logging.info(f"Loaded queued frame {path}")
+            return image, info
+
+        return None, None
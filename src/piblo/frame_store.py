@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# On-disk store of recently shown frames as raw pixels, so one can be shown again without decoding anything
+
+import glob
+import logging
+import os
+import random
+import time
+
+import numpy
+from PIL import Image
+
+from piblo.constants import FrameStoreConst, ImageConst
+
+
+class FrameStore:
+    """
+    A class used to keep the last 'max_size' frames shown on the display as raw pixel arrays. Frames are memory mapped
+    when loaded, so showing one again costs a copy rather than an image decode.
+
+    Attributes
+    ----------
+    location:string
+        folder the stored frames are kept in
+
+    max_size:int
+        maximum number of frames kept. 0 disables the store.
+
+    Methods
+    -------
+    get_frames()
+        Returns paths of all stored frames, oldest first.
+
+    push(image)
+        Stores PIL image 'image' as the newest frame, removing the oldest frames over 'max_size'.
+        Returns True if stored.
+
+    load(path, width, height)
+        Returns PIL image of the frame stored at 'path', or None if it can't be read or is not 'width' x 'height'
+        (when provided).
+
+    get_random(width, height)
+        Returns PIL image of a random stored frame that is 'width' x 'height', other than the newest if there is a
+        choice. Returns None if there is no such frame.
+    """
+
+    def __init__(self, location, max_size=FrameStoreConst.SIZE.value):
+        self.location = location
+        self.max_size = max_size
+        return
+
+    def get_frames(self):
+        frames = glob.glob(os.path.join(self.location, f"*.{FrameStoreConst.EXTENSION.value}"))
+        # Names are zero padded timestamps, so sorting puts the oldest first
+        frames.sort()
+        return frames
+
+    def push(self, image):
+        if self.max_size <= 0 or image is None:
+            return False
+
+        name = f"{time.time_ns():020d}.{FrameStoreConst.EXTENSION.value}"
+        path = os.path.join(self.location, name)
+        temp_path = f"{path}{FrameStoreConst.TEMP_SUFFIX.value}"
+        try:
+            os.makedirs(self.location, exist_ok=True)
+            # Write through a file object, numpy.save adds its own extension to file names
+            with open(temp_path, "wb") as file:
+                numpy.save(file, numpy.asarray(image.convert(ImageConst.CONVERT_MODE.value)))
+            os.replace(temp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to store frame in '{self.location}'")
+            return False
+
+        for old_path in self.get_frames()[:-self.max_size]:
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                logging.warning(e)
+
+        return True
+
+    def load(self, path, width=None, height=None):
+        try:
+            pixels = numpy.load(path, mmap_mode="r")
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read stored frame '{path}'. Removing it.")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        if width is not None and height is not None and pixels.shape[:2] != (height, width):
+            logging.info(f"Stored frame '{path}' is {pixels.shape[1]}x{pixels.shape[0]}, not {width}x{height}")
+            return None
+
+        return Image.fromarray(pixels)
+
+    def get_random(self, width=None, height=None):
+        if self.max_size <= 0:
+            return None
+
+        # The newest frame is most likely still on the display
+        frames = self.get_frames()
+        if len(frames) > 1:
+            frames = frames[:-1]
+        random.shuffle(frames)
+
+        for path in frames:
+            image = self.load(path, width, height)
+            if image is not None:
+                logging.info(f"Loaded stored frame {path}")
+                return image
+
+        return None
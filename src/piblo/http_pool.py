@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Shared HTTP session so every network caller reuses connections and has timeouts and retries
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from piblo.constants import HttpConst
+from piblo.lazy_module import LazyModule
+
+requests = LazyModule("requests")
+
+
+class HttpPool:
+    """
+    A class used to share one pooled requests session across all of pycasso's HTTP calls.
+
+    Connections are kept alive between calls. Every call has a connect and read timeout, and failed connections or
+    retryable statuses (eg 429 or 503) are retried with exponential backoff and full jitter, honouring 'Retry-After'.
+    Read timeouts are not retried, as the server may still be working on the request. Methods that aren't safe to
+    send twice, like the POST that pays for a generation, are only retried when the connection times out before the
+    request is sent.
+
+    Attributes
+    ----------
+    connect_timeout:float
+        seconds to wait to establish a connection, including the TLS handshake
+
+    read_timeout:float
+        seconds to wait between bytes from the server
+
+    retries:int
+        number of times to retry a failed call
+
+    backoff:float
+        base seconds to wait before retrying, doubled each attempt
+
+    backoff_max:float
+        longest wait between retries in seconds. Calls with a 'Retry-After' longer than this are not retried.
+
+    Methods
+    -------
+    configure(connect_timeout, read_timeout, retries, backoff, backoff_max)
+        Sets timeouts and retry settings for all later calls.
+
+    get_session()
+        Returns the shared requests session, creating it on first use.
+
+    close()
+        Closes the shared session and its connections.
+
+    request(method, url, connect_timeout, read_timeout, retries, **kwargs)
+        Sends a request with the shared session, retrying on failure. Only methods in HttpConst.RETRY_METHODS are
+        retried on retryable statuses and connection errors, others only on connect timeouts. Timeouts and retries
+        default to the configured values. Other keyword arguments are passed to requests.
+        Returns requests response object.
+
+    get(url, **kwargs)
+        Sends a GET request. See request().
+
+    post(url, **kwargs)
+        Sends a POST request. See request().
+
+    get_backoff(attempt, backoff, backoff_max)
+        Returns a random wait in seconds between 0 and 'backoff' * 2 ^ 'attempt', limited to 'backoff_max'.
+
+    get_retry_after(response)
+        Returns the seconds to wait from the 'Retry-After' header of 'response', or None if not set.
+    """
+
+    connect_timeout = HttpConst.CONNECT_TIMEOUT.value
+    read_timeout = HttpConst.READ_TIMEOUT.value
+    retries = HttpConst.RETRIES.value
+    backoff = HttpConst.BACKOFF.value
+    backoff_max = HttpConst.BACKOFF_MAX.value
+
+    session = None
+    lock = threading.Lock()
+
+    @staticmethod
+    def configure(connect_timeout=HttpConst.CONNECT_TIMEOUT.value, read_timeout=HttpConst.READ_TIMEOUT.value,
+                  retries=HttpConst.RETRIES.value, backoff=HttpConst.BACKOFF.value,
+                  backoff_max=HttpConst.BACKOFF_MAX.value):
+        HttpPool.connect_timeout = connect_timeout
+        HttpPool.read_timeout = read_timeout
+        HttpPool.retries = max(retries, 0)
+        HttpPool.backoff = backoff
+        HttpPool.backoff_max = backoff_max
+        return
+
+    @staticmethod
+    def get_session():
+        with HttpPool.lock:
+            if HttpPool.session is None:
+                session = requests.Session()
+                # Retries are handled in request() so backoff and Retry-After work the same for every caller
+                adapter = requests.adapters.HTTPAdapter(pool_connections=HttpConst.POOL_CONNECTIONS.value,
+                                                        pool_maxsize=HttpConst.POOL_MAXSIZE.value, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                HttpPool.session = session
+        return HttpPool.session
+
+    @staticmethod
+    def close():
+        with HttpPool.lock:
+            if HttpPool.session is not None:
+                HttpPool.session.close()
+                HttpPool.session = None
+        return
+
+    @staticmethod
+    def request(method, url, connect_timeout=None, read_timeout=None, retries=None, **kwargs):
+        if connect_timeout is None:
+            connect_timeout = HttpPool.connect_timeout
+        if read_timeout is None:
+            read_timeout = HttpPool.read_timeout
+        if retries is None:
+            retries = HttpPool.retries
+
+        session = HttpPool.get_session()
+        idempotent = method.upper() in HttpConst.RETRY_METHODS.value
+        attempt = 0
+        while True:
+            try:
+                response = session.request(method, url, timeout=(connect_timeout, read_timeout), **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # Includes connect timeouts, read timeouts are not retried. Any other connection error may have
+                # happened after the request was sent.
+                if attempt >= retries or not (idempotent or isinstance(e, requests.exceptions.ConnectTimeout)):
+                    raise
+                wait = HttpPool.get_backoff(attempt)
+                logging.warning(f"Connection to {url} failed: {e}. Retrying in {wait:.1f} seconds.")
+                time.sleep(wait)
+                attempt += 1
+                continue
+
+            if response.status_code not in HttpConst.RETRY_STATUSES.value or attempt >= retries or not idempotent:
+                return response
+
+            wait = HttpPool.get_retry_after(response)
+            if wait is None:
+                wait = HttpPool.get_backoff(attempt)
+            elif wait > HttpPool.backoff_max:
+                logging.warning(f"{url} asked to retry after {wait:.0f} seconds, longer than {HttpPool.backoff_max} "
+                                f"seconds. Not retrying.")
+                return response
+
+            logging.warning(f"{url} returned {response.status_code}. Retrying in {wait:.1f} seconds.")
+            response.close()
+            time.sleep(wait)
+            attempt += 1
+
+    @staticmethod
+    def get(url, **kwargs):
+        return HttpPool.request("GET", url, **kwargs)
+
+    @staticmethod
+    def post(url, **kwargs):
+        return HttpPool.request("POST", url, **kwargs)
+
+    @staticmethod
+    def get_backoff(attempt, backoff=None, backoff_max=None):
+        if backoff is None:
+            backoff = HttpPool.backoff
+        if backoff_max is None:
+            backoff_max = HttpPool.backoff_max
+        # Full jitter spreads out retries from many clients hitting the same outage
+        return random.uniform(0, min(backoff_max, backoff * (2 ** attempt)))
+
+    @staticmethod
+    def get_retry_after(response):
+        value = response.headers.get(HttpConst.RETRY_AFTER.value)
+        if value is None:
+            return None
+
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+
+        # Retry-After can also be a HTTP date
+        try:
+            when = parsedate_to_datetime(value)
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            return max((when - datetime.now(timezone.utc)).total_seconds(), 0)
+        except (TypeError, ValueError):
+            logging.warning(f"Unable to read Retry-After '{value}'")
+            return None
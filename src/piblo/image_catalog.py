@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# SQLite catalog of image folders, so picking an image and reading its text doesn't have to list or open files
+
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from piblo.constants import CatalogConst
+
+
+class ImageCatalog:
+    """
+    A class used to keep a SQLite catalog of the images in folders pycasso shows images from, with their size, modified
+    time, dimensions, title, artist, prompt and how often they have been shown.
+
+    A folder is only read again when its modified time or the settings used to read its files change, and then only
+    new and changed files are read. A connection is opened for each call, so the catalog can be used from several
+    threads at once.
+
+    Attributes
+    ----------
+    path:string
+        file path of SQLite database
+
+    Methods
+    -------
+    connect()
+        Returns a new connection to the database, creating tables if needed.
+
+    update(location, source, extension, reader, settings)
+        Brings the catalog of images with 'extension' in folder 'location' for provider type 'source' up to date.
+        'reader' is called with the path of each new or changed file and returns tuple of width, height, title, artist
+        and prompt. 'settings' is any string that, when changed, means every file has to be read again.
+        Returns number of files read, or None if the catalog could not be updated.
+
+    get_random(location, source)
+        Returns dictionary of a random catalogued image in 'location' for 'source', or None if there are none.
+
+    get_image(path)
+        Returns dictionary of the catalogued image at 'path', or None if it is not catalogued.
+
+    record_shown(path, now)
+        Records that the image at 'path' was shown at time 'now' (default current time).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        return
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=CatalogConst.TIMEOUT.value)
+        connection.row_factory = sqlite3.Row
+        connection.executescript(CatalogConst.SCHEMA.value)
+        return connection
+
+    def update(self, location, source, extension, reader, settings=""):
+        try:
+            folder_mtime = os.stat(location).st_mtime_ns
+        except OSError as e:
+            logging.warning(e)
+            return None
+
+        settings = f"{extension}\n{settings}"
+        try:
+            with closing(self.connect()) as connection, connection:
+                folder = connection.execute("SELECT mtime, settings FROM folders WHERE location = ? AND source = ?",
+                                            (location, source)).fetchone()
+                if folder is not None and tuple(folder) == (folder_mtime, settings):
+                    return 0
+
+                # Settings changed, so nothing already read can be kept
+                known = {}
+                if folder is not None and folder["settings"] == settings:
+                    rows = connection.execute("SELECT path, size, mtime FROM images WHERE folder = ? AND source = ?",
+                                              (location, source))
+                    known = {row["path"]: (row["size"], row["mtime"]) for row in rows}
+
+                read = 0
+                found = set()
+                with os.scandir(location) as entries:
+                    for entry in entries:
+                        # Same files a glob of '*.extension' finds
+                        if entry.name.startswith(".") or not entry.name.endswith(f".{extension}") or \
+                                not entry.is_file():
+                            continue
+
+                        stat = entry.stat()
+                        found.add(entry.path)
+                        if known.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                            continue
+
+                        try:
+                            width, height, title, artist, prompt = reader(entry.path)
+                        except (IOError, OSError, ValueError) as e:
+                            logging.warning(e)
+                            logging.warning(f"Unable to read image '{entry.path}' for catalog. Skipping it.")
+                            continue
+
+                        connection.execute(CatalogConst.UPSERT.value,
+                                           (entry.path, location, source, stat.st_size, stat.st_mtime_ns, width,
+                                            height, title, artist, prompt))
+                        read += 1
+
+                removed = connection.execute("SELECT path FROM images WHERE folder = ? AND source = ?",
+                                             (location, source)).fetchall()
+                removed = [(row["path"],) for row in removed if row["path"] not in found]
+                connection.executemany("DELETE FROM images WHERE path = ?", removed)
+                connection.execute("INSERT OR REPLACE INTO folders (location, source, mtime, settings) "
+                                   "VALUES (?, ?, ?, ?)", (location, source, folder_mtime, settings))
+        except sqlite3.Error as e:
+            logging.warning(e)
+            logging.warning(f"Unable to update image catalog '{self.path}'")
+            return None
+
+        if read > 0 or len(removed) > 0:
+            logging.info(f"Catalog of '{location}' updated, {read} image(s) read, {len(removed)} removed")
+        return read
+
+    def get_random(self, location, source):
+        try:
+            with closing(self.connect()) as connection:
+                row = connection.execute("SELECT * FROM images WHERE folder = ? AND source = ? "
+                                         "ORDER BY RANDOM() LIMIT 1", (location, source)).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read image catalog '{self.path}'")
+            return None
+
+        if row is None:
+            return None
+        return dict(row)
+
+    def get_image(self, path):
+        try:
+            with closing(self.connect()) as connection:
+                row = connection.execute("SELECT * FROM images WHERE path = ?", (path,)).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read image catalog '{self.path}'")
+            return None
+
+        if row is None:
+            return None
+        return dict(row)
+
+    def record_shown(self, path, now=None):
+        if now is None:
+            now = time.time()
+
+        try:
+            with closing(self.connect()) as connection, connection:
+                connection.execute("UPDATE images SET shown = shown + 1, last_shown = ? WHERE path = ?", (now, path))
+        except sqlite3.Error as e:
+            logging.warning(e)
+            logging.warning(f"Unable to record image shown in catalog '{self.path}'")
+        return
@@ -1,13 +1,16 @@
 #!/usr/bin/python3
 # -*- coding:utf-8 -*-
+import io
 import logging
 import math
 import os
+from collections import OrderedDict
 
 import numpy
-from PIL import Image, ImageColor, ImageStat
+from PIL import Image, ImageColor, ImageFile, ImageFont, ImageStat
 
-from piblo.constants import DisplayShapeConst, ConfigConst, IconConst, ImageConst
+from piblo.constants import DisplayShapeConst, ConfigConst, IconConst, ImageConst, QuantizeConst
+from piblo.disk_cache import DiskCache
 
 
 class ImageFunctions:
@@ -57,8 +60,83 @@ class ImageFunctions:
         'icon_width' sets line width for icon
         'icon opacity' sets opacity for icon
         returns draw object
+
+    get_font(font_file, size)
+        Returns truetype font object from 'font_file' at 'size'. The last ImageConst.FONT_CACHE_SIZE fonts used are
+        cached.
+
+    get_text_length(font, text)
+        Returns width in pixels of 'text' in 'font'. The last ImageConst.TEXT_LENGTH_CACHE_SIZE widths used are
+        cached.
+
+    wrap_text(text, font, width, max_chars)
+        Splits 'text' into lines no wider than 'width' pixels in 'font', and no longer than 'max_chars' characters if
+        set. Returns list of lines.
+
+    fit_text(text, font_file, width, max_lines, max_size, min_size, wrap, max_chars)
+        Finds the largest font size between 'min_size' and 'max_size' where 'text' fits in 'width' pixels and
+        'max_lines' lines, wrapping if 'wrap' is set. Returns font size and list of lines.
+
+    load_icon(path)
+        Returns an RGBA copy of the icon at 'path'. Icons are decoded once and cached for the life of the process.
+
+    get_icon(path, color, opacity, size, cache)
+        Returns the icon at 'path' coloured 'color', at 'opacity' and resized to 'size', ready to paste. Prepared icons
+        are kept for the life of the process, and in DiskCache 'cache' between runs if provided. Do not modify the
+        returned image.
+
+    draw_icons(image_base, icons, icon_path, icon_color, icon_location, icon_padding, icon_size, icon_gap,
+               icon_opacity, cache)
+        Pastes each icon file in list of (file name, weight) 'icons' onto 'image_base' in a row from 'icon_location',
+        lowest weight first. Returns PIL Image object.
+
+    get_reduce_factor(size, width, height)
+        Returns the largest whole factor an image of 'size' can be shrunk by while still covering 'width', 'height'.
+
+    reduce_image(img, width, height)
+        Shrinks image 'img' by a whole factor while it still covers 'width', 'height'. Returns PIL Image object.
+
+    open_image(path, width, height)
+        Opens image at 'path', decoding it at the smallest scale that still covers 'width', 'height' if set. JPEG images
+        are decoded straight to a fraction of their size. Returns PIL Image object.
+
+    crop_frame(img, box)
+        Crops image 'img' to 'box' straight into a new frame in a mode that can be drawn on, in one copy. Areas outside
+        'img' are black. Returns PIL Image object.
+
+    rotate_frame(img, rotate)
+        Rotates image 'img' clockwise by 'rotate' degrees, expanding to fit. Multiples of 90 are transposed rather than
+        resampled, and 0 returns 'img' itself. Returns PIL Image object.
+
+    get_changed_box(old, new, align)
+        Returns box (left, top, right, bottom) around every pixel that differs between images 'old' and 'new', widened
+        to multiples of 'align' pixels across. Returns None if they are the same, or the whole of 'new' if they are
+        different sizes.
+
+    get_palette_lut(palette)
+        Returns a lookup table of the nearest colour index in 'palette' for every colour, reduced to LUT_BITS per
+        channel. Tables are built once and cached for the life of the process.
+
+    get_bayer_matrix(order)
+        Returns a 2 ^ 'order' square ordered dithering threshold map with values between 0 and 1.
+
+    quantize(img, palette, mode)
+        Reduces image 'img' to the colours in 'palette', a list of [r, g, b]. 'mode' is 'nearest', 'ordered' or
+        'diffusion' (Floyd-Steinberg). Returns RGB PIL Image object.
+
+    decode_stream(chunks, width, height)
+        Decodes an image from iterable of bytes 'chunks' as they arrive, so the whole download is never held in memory.
+        Reduces the image to near 'width', 'height' if set. JPEG images can't be decoded as they arrive, their bytes
+        are kept and decoded straight to a fraction of their size at the end instead. Returns PIL Image object.
     """
 
+    # Resources kept warm between refreshes when pycasso runs as a long-lived process
+    fonts = OrderedDict()
+    text_lengths = OrderedDict()
+    icons = {}
+    icon_atlas = {}
+    palette_luts = {}
+
     @staticmethod
     def max_area(area_list):
         # initialise
@@ -169,6 +247,265 @@ class ImageFunctions:
                            outline=(255, 255, 255, icon_opacity))
         return draw
 
+    @staticmethod
+    def get_font(font_file, size):
+        key = (font_file, size)
+        font = ImageFunctions.fonts.get(key)
+        if font is not None:
+            ImageFunctions.fonts.move_to_end(key)
+            return font
+
+        font = ImageFont.truetype(font_file, size)
+        ImageFunctions.fonts[key] = font
+        # Every size tried while fitting text is a new font, so only keep the recently used ones
+        if len(ImageFunctions.fonts) > ImageConst.FONT_CACHE_SIZE.value:
+            ImageFunctions.fonts.popitem(last=False)
+        return font
+
+    @staticmethod
+    def get_text_length(font, text):
+        key = (font, text)
+        length = ImageFunctions.text_lengths.get(key)
+        if length is not None:
+            ImageFunctions.text_lengths.move_to_end(key)
+            return length
+
+        length = font.getlength(text)
+        ImageFunctions.text_lengths[key] = length
+        # Each new title adds words, so a long running daemon would otherwise grow this forever
+        if len(ImageFunctions.text_lengths) > ImageConst.TEXT_LENGTH_CACHE_SIZE.value:
+            ImageFunctions.text_lengths.popitem(last=False)
+        return length
+
+    @staticmethod
+    def wrap_text(text, font, width, max_chars=0):
+        # Words are measured separately so their widths can be reused between sizes and runs
+        space = ImageFunctions.get_text_length(font, " ")
+        lines = []
+        line = ""
+        line_width = 0
+        for word in text.split():
+            word_width = ImageFunctions.get_text_length(font, word)
+            too_wide = line_width + space + word_width > width
+            too_long = 0 < max_chars < len(line) + 1 + len(word)
+            if line == "":
+                line = word
+                line_width = word_width
+            elif too_wide or too_long:
+                lines.append(line)
+                line = word
+                line_width = word_width
+            else:
+                line = f"{line} {word}"
+                line_width += space + word_width
+        if line != "":
+            lines.append(line)
+        return lines
+
+    @staticmethod
+    def fit_text(text, font_file, width, max_lines=1, max_size=ConfigConst.TEXT_TITLE_SIZE.value,
+                 min_size=ConfigConst.TEXT_TITLE_MIN_SIZE.value, wrap=True, max_chars=0):
+        best_size = min_size
+        best_lines = None
+        low = min_size
+        high = max_size
+        # Smaller text never takes more lines or width, so search for the largest size that fits
+        while low <= high:
+            size = (low + high) // 2
+            font = ImageFunctions.get_font(font_file, size)
+            if wrap:
+                lines = ImageFunctions.wrap_text(text, font, width, max_chars)
+            else:
+                lines = [text]
+            widest = max((ImageFunctions.get_text_length(font, line) for line in lines), default=0)
+            if len(lines) <= max_lines and widest <= width:
+                best_size = size
+                best_lines = lines
+                low = size + 1
+            else:
+                high = size - 1
+
+        if best_lines is None:
+            # Nothing fits, use the smallest size allowed
+            font = ImageFunctions.get_font(font_file, min_size)
+            best_lines = ImageFunctions.wrap_text(text, font, width, max_chars) if wrap else [text]
+        return best_size, best_lines
+
+    @staticmethod
+    def load_icon(path):
+        icon = ImageFunctions.icons.get(path)
+        if icon is None:
+            icon = Image.open(path).convert(ImageConst.DRAW_MODE.value)
+            ImageFunctions.icons[path] = icon
+        # Return a copy as colouring and alpha changes modify the image
+        return icon.copy()
+
+    @staticmethod
+    def get_icon(path, color, opacity, size, cache=None):
+        key = (path, color, opacity, size)
+        icon = ImageFunctions.icon_atlas.get(key)
+        if icon is not None:
+            return icon
+
+        disk_key = None
+        if cache is not None:
+            disk_key = DiskCache.get_key(os.path.abspath(path), os.path.getmtime(path), color, opacity, size)
+            icon = cache.get(disk_key)
+
+        if icon is None:
+            icon = ImageFunctions.load_icon(path)
+            icon = ImageFunctions.color_icon(icon, color)
+            ImageFunctions.set_image_alpha(icon, opacity)
+            icon = icon.resize((size, size), resample=0)
+            if cache is not None:
+                cache.put(disk_key, icon)
+
+        ImageFunctions.icon_atlas[key] = icon
+        return icon
+
+    @staticmethod
+    def get_reduce_factor(size, width, height):
+        if width <= 0 or height <= 0:
+            return 1
+        img_width, img_height = size
+        return max(min(img_width // width, img_height // height), 1)
+
+    @staticmethod
+    def reduce_image(img, width, height):
+        factor = ImageFunctions.get_reduce_factor(img.size, width, height)
+        if factor > 1:
+            logging.info(f"Reducing {img.width}x{img.height} image by {factor} for {width}x{height} display")
+            img = img.reduce(factor)
+        return img
+
+    @staticmethod
+    def open_image(path, width=0, height=0):
+        img = Image.open(path)
+        if width <= 0 or height <= 0:
+            return img
+
+        # Draft only works before the image is loaded and only for JPEG, reduce covers everything else
+        img.draft(None, (width, height))
+        return ImageFunctions.reduce_image(img, width, height)
+
+    @staticmethod
+    def crop_frame(img, box):
+        if img.mode not in ImageConst.SUPPORTED_MODES.value:
+            return img.crop(box).convert(ImageConst.CONVERT_MODE.value)
+
+        # Same rounding as Image.crop
+        left, top, right, bottom = (int(round(value)) for value in box)
+        frame = Image.new(img.mode, (right - left, bottom - top))
+        frame.paste(img, (-left, -top))
+        return frame
+
+    @staticmethod
+    def rotate_frame(img, rotate):
+        rotate = rotate % 360
+        if rotate == 0:
+            return img
+
+        transposes = {
+            90: Image.Transpose.ROTATE_270,
+            180: Image.Transpose.ROTATE_180,
+            270: Image.Transpose.ROTATE_90
+        }
+        if rotate in transposes:
+            return img.transpose(transposes[rotate])
+        return img.rotate(-rotate, expand=1)
+
+    @staticmethod
+    def get_changed_box(old, new, align=1):
+        if old.size != new.size:
+            return 0, 0, new.width, new.height
+
+        if old.mode != new.mode:
+            old = old.convert(new.mode)
+
+        old_pixels = numpy.asarray(old)
+        new_pixels = numpy.asarray(new)
+        changed = old_pixels != new_pixels
+        if changed.ndim == 3:
+            changed = changed.any(axis=2)
+
+        rows = numpy.flatnonzero(changed.any(axis=1))
+        if len(rows) == 0:
+            return None
+        columns = numpy.flatnonzero(changed.any(axis=0))
+
+        left = int(columns[0]) // align * align
+        right = min(ImageFunctions.ceiling_multiple(int(columns[-1]) + 1, align), new.width)
+        return left, int(rows[0]), right, int(rows[-1]) + 1
+
+    @staticmethod
+    def get_palette_lut(palette):
+        key = tuple(tuple(colour) for colour in palette)
+        lut = ImageFunctions.palette_luts.get(key)
+        if lut is None:
+            bits = QuantizeConst.LUT_BITS.value
+            levels = 1 << bits
+            # Centre of each reduced level, for every combination of channels
+            values = (numpy.arange(levels) << (8 - bits)) + (1 << (7 - bits))
+            red, green, blue = numpy.meshgrid(values, values, values, indexing="ij")
+            colours = numpy.stack((red, green, blue), axis=-1).reshape(-1, 1, 3)
+            distance = ((colours - numpy.array(palette).reshape(1, -1, 3)) ** 2).sum(axis=2)
+            lut = distance.argmin(axis=1).astype(numpy.uint8)
+            ImageFunctions.palette_luts[key] = lut
+        return lut
+
+    @staticmethod
+    def get_bayer_matrix(order=QuantizeConst.BAYER_ORDER.value):
+        matrix = numpy.zeros((1, 1))
+        for i in range(order):
+            matrix = numpy.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+        return (matrix + 0.5) / matrix.size
+
+    @staticmethod
+    def quantize(img, palette, mode=QuantizeConst.NEAREST.value):
+        img = img.convert(ImageConst.CONVERT_MODE.value)
+        colours = numpy.array(palette, dtype=numpy.uint8)
+
+        if mode == QuantizeConst.DIFFUSION.value:
+            # Error diffusion is serial pixel to pixel, so leave it to PIL's C implementation
+            palette_img = Image.new("P", (1, 1))
+            flat = colours.flatten().tolist()
+            palette_img.putpalette(flat + flat[:3] * (256 - len(palette)))
+            img = img.quantize(palette=palette_img, dither=Image.Dither.FLOYDSTEINBERG)
+            return img.convert(ImageConst.CONVERT_MODE.value)
+
+        data = numpy.asarray(img, dtype=numpy.int16)
+        if mode == QuantizeConst.ORDERED.value:
+            # Push each pixel up or down by a threshold sized to the gap between palette colours
+            bayer = ImageFunctions.get_bayer_matrix()
+            size = bayer.shape[0]
+            tiles = (-(-img.height // size), -(-img.width // size))
+            threshold = numpy.tile(bayer, tiles)[:img.height, :img.width, numpy.newaxis]
+            spread = 255 / max(len(palette) - 1, 1)
+            data = numpy.clip(data + (threshold - 0.5) * spread, 0, 255).astype(numpy.int16)
+
+        shift = 8 - QuantizeConst.LUT_BITS.value
+        bits = QuantizeConst.LUT_BITS.value
+        index = ((data[..., 0] >> shift) << (2 * bits)) | ((data[..., 1] >> shift) << bits) | (data[..., 2] >> shift)
+        lut = ImageFunctions.get_palette_lut(palette)
+        return Image.fromarray(colours[lut[index]], ImageConst.CONVERT_MODE.value)
+
+    @staticmethod
+    def decode_stream(chunks, width=0, height=0):
+        # Each chunk is decoded as it arrives and then dropped
+        parser = ImageFile.Parser()
+        for chunk in chunks:
+            if chunk:
+                parser.feed(chunk)
+
+        # Without a decoder the parser has only kept the encoded bytes, so they can be opened with draft like a file
+        if parser.image is not None and parser.decoder is None and parser.data is not None:
+            img = ImageFunctions.open_image(io.BytesIO(parser.data), width, height)
+            img.load()
+            return img
+
+        img = parser.close()
+        return ImageFunctions.reduce_image(img, width, height)
+
     @staticmethod
     def color_icon(img, rgb):
         # From https://stackoverflow.com/questions/3752476/python-pil-replace-a-single-rgba-color
@@ -211,7 +548,7 @@ class ImageFunctions:
     def draw_icons(image_base, icons, icon_path=ConfigConst.ICON_PATH.value, icon_color=ConfigConst.ICON_COLOR.value,
                    icon_location=ConfigConst.ICON_CORNER.value, icon_padding=ConfigConst.ICON_PADDING.value,
                    icon_size=ConfigConst.ICON_SIZE.value, icon_gap=ConfigConst.ICON_GAP.value,
-                   icon_opacity=ConfigConst.ICON_OPACITY.value):
+                   icon_opacity=ConfigConst.ICON_OPACITY.value, cache=None):
         if len(icons) == 0:
             # Don't bother doing all the rest if the list is empty
             return image_base
@@ -251,12 +588,7 @@ class ImageFunctions:
         for icon in icons:
             path = os.path.join(icon_path, icon[0])
             if os.path.exists(path):
-                img = Image.open(path)
-                img = img.convert(ImageConst.DRAW_MODE.value)
-                img = ImageFunctions.color_icon(img, color)
-                ImageFunctions.set_image_alpha(img, icon_opacity)
-                tup = (icon_size, icon_size)
-                img.resize(tup, resample=0)
+                img = ImageFunctions.get_icon(path, color, icon_opacity, icon_size, cache)
                 image_base.paste(img, (x, y), img)
 
                 hop = icon_gap + img.width
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Lazy import wrapper so heavy dependencies are only loaded when they are used
+
+import importlib
+import logging
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    A module placeholder that imports the real module the first time one of its attributes is accessed.
+
+    Attributes
+    ----------
+    name:string
+        full name of the module to import, eg 'openai' or 'omni_epd.displayfactory'
+
+    Methods
+    -------
+    load()
+        Imports the wrapped module if it has not already been imported. Returns the real module object.
+
+    is_loaded(name)
+        Returns True if module 'name' has already been imported into this process.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+        return
+
+    def load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            logging.debug(f"Loading module '{self.__name__}' on first use")
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, item):
+        # Only called when normal attribute lookup fails, so anything from the real module ends up here
+        return getattr(self.load(), item)
+
+    def __dir__(self):
+        return dir(self.load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<LazyModule '{self.__name__}' ({state})>"
+
+    @staticmethod
+    def is_loaded(name):
+        return name in sys.modules
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Index of line offsets and weights for prompt files, so picking a random line doesn't read the whole file
+
+import hashlib
+import logging
+import mmap
+import os
+import random
+
+import numpy
+
+from piblo.constants import LineIndexConst
+from piblo.prompt_template import PromptTemplate
+
+
+class LineIndex:
+    """
+    A class used to pick weighted lines from text files without reading every line. Each file has an index of the byte
+    offset and running total weight of every line with a weight, built once and rebuilt when the file's modified time
+    or size changes. Picking a line is then a binary search of the index and a read of that one line.
+
+    Indexes are kept in memory, and also saved in 'location' when it is set, where they are memory mapped when loaded
+    so large files don't need large indexes in memory.
+
+    Attributes
+    ----------
+    location:string
+        folder indexes are saved in. None keeps them in memory only.
+
+    indexes:dict
+        indexes in memory, keyed by file path
+
+    Methods
+    -------
+    configure(location)
+        Sets folder indexes are saved in, or None to keep them in memory only.
+
+    get_index(path)
+        Returns index of the file at 'path' as an array of the file's modified time and size, followed by the offset
+        and running total weight of each line. Raises OSError if the file can't be read.
+
+    build(path)
+        Reads every line of the file at 'path' and returns its index.
+
+    read_line(path, offset)
+        Returns text of the line starting at byte 'offset' in the file at 'path', without its weight.
+
+    get_first_line(path)
+        Returns the first line with a weight in the file at 'path', or None if there is none.
+
+    get_random_line(path)
+        Returns a random line from the file at 'path' by weight, or None if there is none.
+    """
+
+    location = None
+    indexes = {}
+
+    @staticmethod
+    def configure(location=None):
+        LineIndex.location = location
+        LineIndex.indexes = {}
+        return
+
+    @staticmethod
+    def get_saved_path(path):
+        name = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+        return os.path.join(LineIndex.location, f"{name}.{LineIndexConst.EXTENSION.value}")
+
+    @staticmethod
+    def get_index(path):
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        index = LineIndex.indexes.get(path)
+        if index is not None and tuple(index[0]) == key:
+            return index
+
+        index = None
+        if LineIndex.location is not None:
+            index = LineIndex.load(path, key)
+        if index is None:
+            index = LineIndex.build(path)
+            index[0] = key
+            if LineIndex.location is not None:
+                # Mapping the saved copy keeps only the parts used in memory
+                index = LineIndex.save(path, index)
+
+        LineIndex.indexes[path] = index
+        return index
+
+    @staticmethod
+    def build(path):
+        offsets = []
+        weights = []
+        offset = 0
+        total = 0
+        with open(path, "rb") as file:
+            for line in file:
+                weight, text = PromptTemplate.split_weight(line.decode(LineIndexConst.ENCODING.value).strip())
+                if weight > 0:
+                    total += weight
+                    offsets.append(offset)
+                    weights.append(total)
+                offset += len(line)
+
+        index = numpy.zeros((len(offsets) + 1, 2), dtype=numpy.int64)
+        index[1:, 0] = offsets
+        index[1:, 1] = weights
+        logging.info(f"Indexed {len(offsets)} line(s) in {path}")
+        return index
+
+    @staticmethod
+    def load(path, key):
+        saved_path = LineIndex.get_saved_path(path)
+        if not os.path.exists(saved_path):
+            return None
+
+        try:
+            index = numpy.load(saved_path, mmap_mode="r")
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read line index '{saved_path}'. Rebuilding it.")
+            return None
+
+        if index.ndim != 2 or index.shape[0] < 1 or index.shape[1] != 2 or tuple(index[0]) != key:
+            return None
+        return index
+
+    @staticmethod
+    def save(path, index):
+        saved_path = LineIndex.get_saved_path(path)
+        temp_path = f"{saved_path}{LineIndexConst.TEMP_SUFFIX.value}"
+        try:
+            os.makedirs(LineIndex.location, exist_ok=True)
+            # Write through a file object, numpy.save adds its own extension to file names
+            with open(temp_path, "wb") as file:
+                numpy.save(file, index)
+            os.replace(temp_path, saved_path)
+            return numpy.load(saved_path, mmap_mode="r")
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to save line index to '{saved_path}'")
+            return index
+
+    @staticmethod
+    def read_line(path, offset):
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as lines:
+            end = lines.find(b"\n", offset)
+            if end < 0:
+                end = len(lines)
+            line = lines[offset:end].decode(LineIndexConst.ENCODING.value).strip()
+        return PromptTemplate.split_weight(line)[1]
+
+    @staticmethod
+    def get_first_line(path):
+        index = LineIndex.get_index(path)
+        if len(index) < 2:
+            logging.warning(f"No lines to parse found in file {path}")
+            return None
+        return LineIndex.read_line(path, int(index[1, 0]))
+
+    @staticmethod
+    def get_random_line(path):
+        index = LineIndex.get_index(path)
+        if len(index) < 2:
+            logging.warning(f"No lines to parse found in file {path}")
+            return None
+
+        # Running totals are sorted, so the line holding a random point in the total weight is a binary search away
+        point = random.randrange(int(index[-1, 1]))
+        row = int(numpy.searchsorted(index[1:, 1], point, side="right")) + 1
+        return LineIndex.read_line(path, int(index[row, 0]))
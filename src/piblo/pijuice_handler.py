@@ -113,7 +113,10 @@ class PiJuiceHandler:
             logging.error("Cannot create pijuice object. Running pycasso once with error display and exiting process.")
             # run pycasso with error symbol, then exit
             instance.add_exception_icon()
-            instance.run()
+            if instance.args.statusonly:
+                instance.run_status()
+            else:
+                instance.run()
 
             if shutdown_ex:
                 logging.info(f"Shutting down if possible. Waiting {sleep_time} seconds before sending signal")
@@ -125,7 +128,10 @@ class PiJuiceHandler:
         logging.info(f"Battery level is \'{charge_level}\'")
 
         try:
-            instance.run()
+            if instance.args.statusonly:
+                instance.run_status()
+            else:
+                instance.run()
 
             if power_status == PiJuiceConst.NOT_PRESENT.value:
                 # shutdown if we've configured pycasso to do so
@@ -4,8 +4,11 @@
 import io
 import logging
 
-from mastodon import Mastodon
 from piblo.constants import ProvidersConst, PosterConst, ConfigConst
+from piblo.lazy_module import LazyModule
+
+# Only load mastodon when posting is actually enabled
+mastodon = LazyModule("mastodon")
 
 
 class PostWrapper(object):
@@ -55,7 +58,7 @@ class MastodonPoster(PostWrapper):
         self.creds_path = creds_path
         self.client_cred_file = client_cred_file
         self.user_cred_file = user_cred_file
-        self.mastodon = Mastodon(client_id=self.client_cred_file, access_token=self.user_cred_file)
+        self.mastodon = mastodon.Mastodon(client_id=self.client_cred_file, access_token=self.user_cred_file)
         return
 
     def post_image(self, img, text):
@@ -79,7 +82,7 @@ class MastodonPoster(PostWrapper):
 
     @staticmethod
     def create_app(app_name, base_url, client_cred_path):
-        Mastodon.create_app(
+        mastodon.Mastodon.create_app(
             app_name,
             api_base_url=base_url,
             to_file=client_cred_path
@@ -3,15 +3,19 @@ Defines the base class for prompt generation blocks.
 """
 
 import abc
-import requests
 import logging
-import openai
-import feedparser
 
+from piblo.feed_cache import FeedCache
 from piblo.file_operations import FileOperations
-from piblo.constants import LLMConst, ProvidersConst, BlockInfoConst
+from piblo.http_pool import HttpPool
+from piblo.constants import LLMConst, ProvidersConst, BlockInfoConst, BlockConst
+from piblo.lazy_module import LazyModule
 from piblo.provider import DalleProvider
 
+# Network libraries are only loaded once a block that needs them is generated
+openai = LazyModule("openai")
+requests = LazyModule("requests")
+
 
 class PromptBlock(abc.ABC):
     """
@@ -54,14 +58,27 @@ class QuoteBlock(PromptBlock):
     A prompt block that generates text containing a random Zen quote.
     Fetches data from https://zenquotes.io/
     """
-    API_URL = "https://zenquotes.io/api/random"
-    TIMEOUT = 10  # seconds
+    API_URL = BlockInfoConst.ZENQUOTE_URL.value
+    TIMEOUT = BlockInfoConst.READ_TIMEOUT.value  # seconds
 
-    def __init__(self):
-        # No specific initialization needed for this block
-        pass
+    def __init__(self, cache=None):
+        """
+        Initialize the quote block. Quotes are taken from the pool in BlockCache 'cache' when given.
+        """
+        self.cache = cache
 
     def generate(self) -> str:
+        """
+        Returns a random Zen quote, from the cache's pool if there is one.
+
+        Returns:
+            str: The Zen quote string, or an empty string on failure
+        """
+        if self.cache is None:
+            return self.fetch()
+        return self.cache.take(BlockConst.QUOTE.value, self.fetch)
+
+    def fetch(self) -> str:
         """
         Fetches a random Zen quote and returns it.
 
@@ -70,7 +87,7 @@ class QuoteBlock(PromptBlock):
         """
         try:
             logging.info(f"Fetching random zen quote from {self.API_URL}...")
-            response = requests.get(self.API_URL, timeout=self.TIMEOUT)
+            response = HttpPool.get(self.API_URL, read_timeout=self.TIMEOUT)
             response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
             data = response.json()
 
@@ -141,13 +158,16 @@ class LLMBlock(PromptBlock):
     """
 
     def __init__(self, key=None, creds_mode=ProvidersConst.USE_KEYCHAIN,
-                 creds_path=ProvidersConst.CREDENTIAL_PATH.value):
+                 creds_path=ProvidersConst.CREDENTIAL_PATH.value, llm_provider=None):
         """
-        Initialize the LLM block with model configuration.
+        Initialize the LLM block with model configuration. An existing provider can be passed in as 'llm_provider'
+        to reuse its client.
         """
         logging.info(f"Initializing LLM block")
 
-        self.llm_provider = DalleProvider(key=key, creds_mode=creds_mode, creds_path=creds_path)
+        self.llm_provider = llm_provider
+        if self.llm_provider is None:
+            self.llm_provider = DalleProvider(key=key, creds_mode=creds_mode, creds_path=creds_path)
         self.model_name = LLMConst.MODEL.value
         self.temperature = LLMConst.TEMPERATURE.value
         self.max_tokens = LLMConst.MAX_TOKENS.value
@@ -221,11 +241,29 @@ class RSSBlock(PromptBlock):
     A prompt block that loads text from an RSS feed
     """
 
-    def __init__(self):
-        # No specific initialization needed for this block
-        pass
+    def __init__(self, cache=None, feeds=None):
+        """
+        Initialize the RSS block. Text is kept in BlockCache 'cache' when given. Feeds are read through FeedCache
+        'feeds', or one kept in memory for this block if not given.
+        """
+        self.cache = cache
+        self.feeds = feeds
+        if self.feeds is None:
+            self.feeds = FeedCache()
 
     def generate(self, feed, tag='title', index=0) -> str:
+        """
+        Returns text from an RSS feed available at 'feed', from the cache if there is one.
+
+        Returns:
+            str: Text found in RSS feed, or empty string on failure
+        """
+        if self.cache is None:
+            return self.fetch(feed, tag, index)
+        key = BlockConst.SEPERATOR.value.join([BlockConst.RSS.value, feed, str(tag), str(index)])
+        return self.cache.get(key, lambda: self.fetch(feed, tag, index))
+
+    def fetch(self, feed, tag='title', index=0) -> str:
         """
         Fetches text from an RSS feed available at 'feed'. Default 'title' tag works for most rss news feeds, however
         can be set to something else. 'index' can define another item, by default it should load the most recent.
@@ -234,8 +272,15 @@ class RSSBlock(PromptBlock):
             str: Text found in RSS feed, or empty string on failure
         """
         try:
-            feed = feedparser.parse(feed)
-            text = feed.entries[0].title
+            entries = self.feeds.get_entries(feed)
+            if not entries:
+                logging.error(f"No items found in \"{feed}\"")
+                return ""
+
+            text = FeedCache.get_text(entries[int(index)], tag)
+            if text is None:
+                logging.error(f"Tag \"{tag}\" not found in item {index} of \"{feed}\"")
+                return ""
             return text
 
         except Exception as e:
@@ -249,11 +294,24 @@ class JokeBlock(PromptBlock):
     A prompt block that loads text from an RSS feed
     """
 
-    def __init__(self):
-        # No specific initialization needed for this block
-        pass
+    def __init__(self, cache=None):
+        """
+        Initialize the joke block. Jokes are taken from the pool in BlockCache 'cache' when given.
+        """
+        self.cache = cache
 
     def generate(self) -> str:
+        """
+        Returns a random dad joke, from the cache's pool if there is one.
+
+        Returns:
+            str: Text found in RSS feed, or empty string on failure
+        """
+        if self.cache is None:
+            return self.fetch()
+        return self.cache.take(BlockConst.JOKE.value, self.fetch)
+
+    def fetch(self) -> str:
         """
         Fetches a random dad joke from icanhazdadjoke.com.
 
@@ -264,7 +322,7 @@ class JokeBlock(PromptBlock):
         headers = {"Accept": "application/json"}
         logging.info(f"Fetching dad joke from {api_url}...")
         try:
-            response = requests.get(api_url, headers=headers, timeout=10)
+            response = HttpPool.get(api_url, headers=headers, read_timeout=BlockInfoConst.READ_TIMEOUT.value)
             response.raise_for_status()
             data = response.json()
             joke = data.get("joke")
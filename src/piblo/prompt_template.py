@@ -0,0 +1,324 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Compiles prompt text with brackets into a tree once, so choosing options and running blocks is a single walk
+
+import logging
+import random
+import threading
+import time
+
+from piblo.constants import TemplateConst
+
+
+class PromptTemplate:
+    """
+    A class used to parse prompt text containing bracketed options, blocks and subject markers into a tree in a single
+    pass, and to expand that tree. Compiled trees are kept in a size limited cache, as the same lines are read from
+    prompt files again and again.
+
+    A tree is a list of nodes. Each node is either a string of plain text, or a tuple of opening bracket, closing
+    bracket and list of alternatives, where each alternative is itself a list of nodes. Alternatives are only split
+    when a separator is given, otherwise a bracket has a single alternative.
+
+    Attributes
+    ----------
+    trees:dict
+        compiled trees, keyed by text, bracket pairs and separator
+
+    Methods
+    -------
+    compile(text, bracket_pairs, separator)
+        Returns tree of 'text' for all 2 string bracket strings in list 'bracket_pairs', splitting alternatives on
+        'separator' if given. Pairs with mismatching brackets in 'text' are left as plain text. Returns None if brackets
+        of different pairs cross each other.
+
+    check_brackets(text, pair)
+        Returns True if every bracket of 2 string 'pair' in 'text' has a matching partner.
+
+    split_weight(option)
+        Returns tuple of weight and text of 'option', where a leading 'N:' gives weight N, otherwise weight is 1.
+
+    choose_option(options)
+        Returns a random option from list 'options' by weight, or "" if no option has a weight.
+
+    expand_choices(text, bracket_pairs, loop_limit)
+        Replaces every bracket from list 'bracket_pairs' in 'text' with one of its options, starting inside first.
+        At most 'loop_limit' brackets of each pair are replaced, the rest are left as they are.
+        Returns updated text, or 'text' unchanged if brackets cross each other.
+
+    expand_blocks(text, block_brackets, subject_brackets, process, loop_limit, fallback, workers, deadline)
+        Replaces every block within 'block_brackets' in 'text' with the result of calling 'process' with its contents,
+        starting inside first. Any brackets in the result are expanded in turn. Text within 'subject_brackets' has its
+        brackets removed and is collected as the subject. Stops replacing after 'loop_limit' replacements, in case
+        blocks reference each other. Blocks next to each other are run at the same time in up to 'workers' threads.
+        A block not finished by time.monotonic() time 'deadline', or that raises, is replaced with the result of
+        calling 'fallback' with its contents instead (default "").
+        Returns updated text and subject string, or 'text' unchanged if any brackets are mismatched.
+
+    expand_blocks_many(texts, block_brackets, subject_brackets, process, loop_limit, fallback, workers, deadline)
+        Same as expand_blocks() for every text in list 'texts', with the blocks of all texts run together, so blocks in
+        different parts of a prompt are run at the same time. 'loop_limit' is shared by all texts.
+        Returns list of tuples of updated text and subject string, in the same order as 'texts'.
+
+    walk_blocks(trees, pairs, state)
+        Returns list of tuples of text and subject string for each tree in list 'trees', running the blocks found at
+        each level of all trees in one call to run_blocks().
+
+    run_blocks(blocks, state)
+        Returns results of running each block text in list 'blocks' with the process, fallback, workers and deadline
+        in dictionary 'state'.
+    """
+
+    trees = {}
+
+    @staticmethod
+    def compile(text, bracket_pairs, separator=None):
+        key = (text, tuple(bracket_pairs), separator)
+        tree = PromptTemplate.trees.get(key)
+        if tree is not None:
+            return tree
+
+        brackets = {}
+        for pair in bracket_pairs:
+            # A pair that doesn't match up is kept as plain text
+            if not PromptTemplate.check_brackets(text, pair):
+                logging.warning(f"Mismatching brackets in \"{text}\"")
+                continue
+            brackets[pair[0]] = pair[1]
+        opens = {close: bracket for bracket, close in brackets.items()}
+
+        root = []
+        # Each entry is opening bracket, alternatives of the bracket and nodes of the current alternative
+        stack = [(None, [root], root)]
+        start = 0
+        for i, c in enumerate(text):
+            if c in brackets:
+                if start < i:
+                    stack[-1][2].append(text[start:i])
+                alternative = []
+                stack.append((c, [alternative], alternative))
+                start = i + 1
+            elif c in opens:
+                if stack[-1][0] != opens[c]:
+                    logging.warning(f"Mismatching brackets in \"{text}\" : \"{stack[-1][0]}\" closed by \"{c}\"")
+                    return None
+                if start < i:
+                    stack[-1][2].append(text[start:i])
+                bracket, alternatives, _ = stack.pop()
+                stack[-1][2].append((bracket, c, alternatives))
+                start = i + 1
+            elif c == separator and len(stack) > 1:
+                if start < i:
+                    stack[-1][2].append(text[start:i])
+                alternative = []
+                stack[-1][1].append(alternative)
+                stack[-1] = (stack[-1][0], stack[-1][1], alternative)
+                start = i + 1
+        if start < len(text):
+            root.append(text[start:])
+
+        if len(PromptTemplate.trees) >= TemplateConst.CACHE_SIZE.value:
+            PromptTemplate.trees.clear()
+        PromptTemplate.trees[key] = root
+        return root
+
+    @staticmethod
+    def check_brackets(text, pair):
+        # Same check as FileOperations.check_brackets
+        count = 0
+        for c in text:
+            if c == pair[0]:
+                count += 1
+            elif c == pair[1]:
+                count -= 1
+                if count < 0:
+                    return False
+        return count == 0
+
+    @staticmethod
+    def split_weight(option):
+        split = option.split(TemplateConst.WEIGHT.value, maxsplit=1)
+        if len(split) > 1 and split[0].isdigit():
+            return int(split[0]), split[1]
+        return 1, option
+
+    @staticmethod
+    def choose_option(options):
+        weights = []
+        texts = []
+        for option in options:
+            weight, option = PromptTemplate.split_weight(option)
+            weights.append(weight)
+            texts.append(option)
+
+        if sum(weights) <= 0:
+            logging.warning(f"No options with weight found in \"{TemplateConst.SEPARATOR.value.join(options)}\"")
+            return ""
+        return random.choices(texts, weights)[0]
+
+    @staticmethod
+    def expand_choices(text, bracket_pairs=TemplateConst.BRACKETS.value, loop_limit=TemplateConst.LOOP_LIMIT.value):
+        tree = PromptTemplate.compile(text, bracket_pairs, TemplateConst.SEPARATOR.value)
+        if tree is None:
+            return text
+
+        limits = {pair[0]: loop_limit for pair in bracket_pairs}
+        return PromptTemplate.walk_choices(tree, limits)
+
+    @staticmethod
+    def walk_choices(nodes, limits):
+        parts = []
+        for node in nodes:
+            if isinstance(node, str):
+                parts.append(node)
+                continue
+
+            bracket, close, alternatives = node
+            options = [PromptTemplate.walk_choices(alternative, limits) for alternative in alternatives]
+            if limits[bracket] > 0:
+                limits[bracket] -= 1
+                parts.append(PromptTemplate.choose_option(options))
+            else:
+                parts.append(bracket + TemplateConst.SEPARATOR.value.join(options) + close)
+        return "".join(parts)
+
+    @staticmethod
+    def expand_blocks(text, block_brackets, subject_brackets, process, loop_limit=TemplateConst.LOOP_LIMIT.value,
+                      fallback=None, workers=1, deadline=None):
+        return PromptTemplate.expand_blocks_many([text], block_brackets, subject_brackets, process, loop_limit,
+                                                 fallback, workers, deadline)[0]
+
+    @staticmethod
+    def expand_blocks_many(texts, block_brackets, subject_brackets, process, loop_limit=TemplateConst.LOOP_LIMIT.value,
+                           fallback=None, workers=1, deadline=None):
+        pairs = [block_brackets]
+        if subject_brackets is not None:
+            pairs.append(subject_brackets)
+
+        results = [(text, "") for text in texts]
+        expand = []
+        trees = []
+        for index, text in enumerate(texts):
+            if not all(PromptTemplate.check_brackets(text, pair) for pair in pairs):
+                logging.warning(f"Mismatching brackets in \"{text}\"")
+                continue
+            tree = PromptTemplate.compile(text, pairs)
+            if tree is not None:
+                expand.append(index)
+                trees.append(tree)
+
+        if fallback is None:
+            fallback = PromptTemplate.get_blank_text
+
+        state = {"limit": loop_limit, "process": process, "fallback": fallback, "workers": workers,
+                 "running": threading.BoundedSemaphore(max(workers, 1)), "deadline": deadline}
+        for index, result in zip(expand, PromptTemplate.walk_blocks(trees, pairs, state)):
+            results[index] = result
+
+        if state["limit"] < 0:
+            logging.warning(f"Recursion limit hit while processing blocks for \"{' '.join(texts)}\" - check for "
+                            f"recursive references in blocks")
+        return results
+
+    @staticmethod
+    def get_blank_text(text):
+        return ""
+
+    @staticmethod
+    def walk_blocks(trees, pairs, state):
+        tree_parts = []
+        tree_subjects = []
+        # Blocks of every tree at this level, as tree, position in its parts and block text
+        blocks = []
+        for tree, nodes in enumerate(trees):
+            parts = []
+            subjects = []
+            for node in nodes:
+                if isinstance(node, str):
+                    parts.append(node)
+                    subjects.append("")
+                    continue
+
+                bracket, close, alternatives = node
+                inner, subject = PromptTemplate.walk_blocks([alternatives[0]], pairs, state)[0]
+                if state["limit"] <= 0:
+                    # Marks the limit as hit, the remaining brackets are kept as they are
+                    state["limit"] = -1
+                    parts.append(bracket + inner + close)
+                    subjects.append(subject)
+                elif bracket == pairs[0][0]:
+                    state["limit"] -= 1
+                    # Filled in once every block at this level has been run
+                    blocks.append((tree, len(parts), inner))
+                    parts.append("")
+                    subjects.append(subject)
+                else:
+                    state["limit"] -= 1
+                    parts.append(inner)
+                    subjects.append(subject + inner)
+            tree_parts.append(parts)
+            tree_subjects.append(subjects)
+
+        # Results are expanded in turn, again running all of their blocks together
+        expand = []
+        result_trees = []
+        results = PromptTemplate.run_blocks([inner for tree, i, inner in blocks], state)
+        for (tree, i, inner), result in zip(blocks, results):
+            result_tree = PromptTemplate.compile(result, pairs)
+            if result_tree is None:
+                tree_parts[tree][i] = result
+            else:
+                expand.append((tree, i))
+                result_trees.append(result_tree)
+
+        if len(result_trees) > 0:
+            for (tree, i), (text, subject) in zip(expand, PromptTemplate.walk_blocks(result_trees, pairs, state)):
+                tree_parts[tree][i] = text
+                tree_subjects[tree][i] += subject
+
+        return [("".join(parts), "".join(subjects)) for parts, subjects in zip(tree_parts, tree_subjects)]
+
+    @staticmethod
+    def run_blocks(blocks, state):
+        process = state["process"]
+        fallback = state["fallback"]
+        deadline = state["deadline"]
+
+        if state["workers"] <= 1 or (deadline is None and len(blocks) <= 1):
+            results = []
+            for block in blocks:
+                if deadline is not None and time.monotonic() >= deadline:
+                    logging.warning(f"Ran out of time for blocks, using fallback for \"{block}\"")
+                    results.append(fallback(block))
+                else:
+                    results.append(process(block))
+            return results
+
+        finished = [None] * len(blocks)
+
+        def run_block(index, block):
+            # Runs in its own thread, a block that fails or runs late gets its fallback instead
+            with state["running"]:
+                try:
+                    finished[index] = process(block)
+                except BaseException as e:
+                    logging.error(e)
+            return
+
+        threads = [threading.Thread(target=run_block, args=(index, block), daemon=True)
+                   for index, block in enumerate(blocks)]
+        for thread in threads:
+            thread.start()
+
+        results = []
+        for index, thread in enumerate(threads):
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            thread.join(timeout)
+            result = finished[index]
+            if thread.is_alive():
+                logging.warning(f"Ran out of time for blocks, using fallback for \"{blocks[index]}\"")
+                result = fallback(blocks[index])
+            elif result is None:
+                result = fallback(blocks[index])
+            results.append(result)
+        return results
@@ -5,20 +5,22 @@ import base64
 import configparser
 import io
 import logging
+import math
 import os
 import warnings
-import webuiapi
-from io import BytesIO
 
-import keyring
-import openai
-from openai import OpenAI
-import requests
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, features
 
-from piblo.constants import ProvidersConst, StabilityConst, DalleConst, AutomaticConst
+from piblo.constants import ProvidersConst, StabilityConst, DalleConst, AutomaticConst, HttpConst
 from piblo.file_operations import FileOperations
+from piblo.http_pool import HttpPool
 from piblo.image_functions import ImageFunctions
+from piblo.lazy_module import LazyModule
+
+# Provider libraries are slow to import, so only load them once a provider actually needs them
+keyring = LazyModule("keyring")
+openai = LazyModule("openai")
+webuiapi = LazyModule("webuiapi")
 
 
 class Provider(object):
@@ -39,6 +41,10 @@ class Provider(object):
     fit_image(img, width, height)
         Resizes image object so that it can be shown on screen with no black space. Returns PIL Image object.
 
+    load_image_stream(response, width, height)
+        Decodes image from streamed requests response 'response' as it downloads, reduced to near 'width', 'height'.
+        Returns PIL Image object.
+
     read_creds(keyname, path, example_path)
         Reads credentials from .creds file with variable name 'keyname'. 'path' and 'example_path' default to constant
         location.
@@ -95,6 +101,13 @@ class Provider(object):
         img.thumbnail(tup)
         return img
 
+    @staticmethod
+    def load_image_stream(response, width=0, height=0):
+        with response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=HttpConst.CHUNK_SIZE.value)
+            return ImageFunctions.decode_stream(chunks, width, height)
+
     @staticmethod
     def read_creds(keyname, path=ProvidersConst.CREDENTIAL_PATH.value,
                    example_path=ProvidersConst.CREDENTIAL_PATH_EG.value):
@@ -172,12 +185,16 @@ class StabilityProvider(Provider):
 
         return
 
-    def get_image_from_string(self, text, height=0, width=0, aspect_ratio=StabilityConst.ASPECT_RATIO.value):
+    def get_image_from_string(self, text, height=0, width=0, aspect_ratio=StabilityConst.ASPECT_RATIO.value,
+                              output_format=StabilityConst.LOSSLESS_FORMAT.value):
         try:
             fetch_height = ImageFunctions.ceiling_multiple(height, StabilityConst.MULTIPLE.value)
             fetch_width = ImageFunctions.ceiling_multiple(width, StabilityConst.MULTIPLE.value)
+            if aspect_ratio == StabilityConst.AUTO.value:
+                aspect_ratio = self.get_aspect_ratio(width, height)
+            logging.info(f"Requesting {aspect_ratio} {output_format} image from stability")
 
-            response = requests.post(
+            response = HttpPool.post(
                 self.host,
                 headers={
                     "authorization": f"Bearer {self.key}",
@@ -191,15 +208,16 @@ class StabilityProvider(Provider):
                     "seed": "0",
                     "style_preset": "enhance",
                     "prompt": text,
-                    "output_format": "png",
+                    "output_format": output_format,
                 },
+                stream=True,
             )
     
             if response.status_code != 200:
                 raise Exception(str(response.json()))
 
-            img = Image.open(BytesIO(response.content))
-    
+            img = self.load_image_stream(response, width, height)
+
             img = self.fit_image(img, width, height)
 
         except BaseException as e:
@@ -208,6 +226,32 @@ class StabilityProvider(Provider):
 
         return img
 
+    @staticmethod
+    def get_aspect_ratio(width, height):
+        # Closest supported ratio to the display, so as little as possible is cropped off
+        if width <= 0 or height <= 0:
+            return StabilityConst.ASPECT_RATIOS.value[0]
+        target = math.log(width / height)
+        best = None
+        best_diff = None
+        for ratio in StabilityConst.ASPECT_RATIOS.value:
+            ratio_width, ratio_height = ratio.split(":")
+            diff = abs(math.log(int(ratio_width) / int(ratio_height)) - target)
+            if best_diff is None or diff < best_diff:
+                best = ratio
+                best_diff = diff
+        return best
+
+    @staticmethod
+    def get_output_format(display_mode, output_format=StabilityConst.OUTPUT_FORMAT.value):
+        if output_format != StabilityConst.AUTO.value:
+            return output_format
+        if display_mode in StabilityConst.LOSSY_MODES.value:
+            for lossy_format, feature in StabilityConst.LOSSY_FORMATS.value.items():
+                if features.check(feature):
+                    return lossy_format
+        return StabilityConst.LOSSLESS_FORMAT.value
+
     @staticmethod
     def add_secret(text, mode=ProvidersConst.USE_KEYCHAIN.value, path=ProvidersConst.CREDENTIAL_PATH.value):
         Provider.process_add_secret(ProvidersConst.KEYCHAIN.value, ProvidersConst.STABLE_KEYNAME.value, text=text,
@@ -225,7 +269,10 @@ class DalleProvider(Provider):
                          creds_path=creds_path)
 
         self.get_secret()
-        self.client = OpenAI(api_key=self.key)
+        # OpenAI keeps its own connection pool, so match its timeouts and retries to the shared network settings
+        self.client = openai.OpenAI(api_key=self.key,
+                                    timeout=openai.Timeout(HttpPool.read_timeout, connect=HttpPool.connect_timeout),
+                                    max_retries=HttpPool.retries)
 
         return
 
@@ -243,7 +290,7 @@ class DalleProvider(Provider):
             response = self.client.images.generate(prompt=text, n=1, size=res)
 
             url = response.data[0].url
-            img = Image.open(BytesIO(requests.get(url).content))
+            img = self.load_image_stream(HttpPool.get(url, stream=True), width, height)
 
         except openai.APIConnectionError as e:
             logging.error(e)
@@ -303,7 +350,8 @@ class DalleProvider(Provider):
                                                size=res)
 
             url = response.data[0].url
-            img = Image.open(BytesIO(requests.get(url).content))
+            # Not reduced, the infilled image is shrunk by infill_percent below
+            img = self.load_image_stream(HttpPool.get(url, stream=True))
 
             # Resize image based on infill_percent
             if infill_percent > 0:
@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Remembers how providers have behaved across runs so a provider that is down isn't tried on every run
+
+import json
+import logging
+import os
+import threading
+import time
+
+from piblo.constants import HealthConst
+
+
+class ProviderHealth:
+    """
+    A class used to keep a circuit breaker and average latency for each provider, saved to a file between runs.
+
+    A provider's circuit opens after 'failure_limit' failures in a row, and it is skipped until 'cool_down' minutes have
+    passed. The circuit is then half open, letting one run try the provider again. Success closes the circuit, failure
+    opens it for another 'cool_down' minutes.
+
+    Attributes
+    ----------
+    path:string
+        file path of JSON file to save provider health to
+
+    failure_limit:int
+        failures in a row before a provider's circuit opens. 0 disables the circuit breaker.
+
+    cool_down:float
+        minutes to skip a provider after its circuit opens
+
+    Methods
+    -------
+    load()
+        Loads provider health from file, if it exists.
+
+    save()
+        Saves provider health to file. Returns True if saved.
+
+    get_state(provider, now)
+        Returns circuit state of 'provider' at time 'now' (default current time): 'closed', 'open' or 'half_open'.
+
+    is_available(provider, now)
+        Returns False if the circuit for 'provider' is open, otherwise True.
+
+    get_latency(provider)
+        Returns average seconds taken by 'provider' to return an image, or None if not known.
+
+    record_success(provider, latency)
+        Records that 'provider' returned an image in 'latency' seconds and closes its circuit.
+
+    record_failure(provider, latency)
+        Records that 'provider' failed after 'latency' seconds, opening its circuit if it has failed too many times.
+    """
+
+    def __init__(self, path, failure_limit=HealthConst.FAILURE_LIMIT.value, cool_down=HealthConst.COOL_DOWN.value):
+        self.path = path
+        self.failure_limit = failure_limit
+        self.cool_down = cool_down
+        self.providers = {}
+        self.lock = threading.Lock()
+        self.load()
+        return
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self.providers
+
+        try:
+            with open(self.path, "r") as file:
+                self.providers = json.load(file)
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read provider health from '{self.path}'. Starting fresh.")
+            self.providers = {}
+
+        return self.providers
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}{HealthConst.TEMP_SUFFIX.value}"
+            with self.lock:
+                with open(temp_path, "w") as file:
+                    json.dump(self.providers, file, indent=1)
+                os.replace(temp_path, self.path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to save provider health to '{self.path}'")
+            return False
+
+        return True
+
+    def get_provider(self, provider):
+        # JSON keys are always strings
+        return self.providers.setdefault(str(provider), {
+            HealthConst.FAILURES.value: 0,
+            HealthConst.LATENCY.value: None,
+            HealthConst.OPENED.value: None
+        })
+
+    def get_state(self, provider, now=None):
+        if now is None:
+            now = time.time()
+
+        health = self.providers.get(str(provider))
+        if self.failure_limit <= 0 or health is None or health.get(HealthConst.OPENED.value) is None:
+            return HealthConst.CLOSED.value
+
+        if now - health[HealthConst.OPENED.value] >= self.cool_down * 60:
+            return HealthConst.HALF_OPEN.value
+
+        return HealthConst.OPEN.value
+
+    def is_available(self, provider, now=None):
+        return self.get_state(provider, now) != HealthConst.OPEN.value
+
+    def get_latency(self, provider):
+        health = self.providers.get(str(provider))
+        if health is None:
+            return None
+        return health.get(HealthConst.LATENCY.value)
+
+    def update_latency(self, health, latency):
+        if latency is None:
+            return
+        average = health.get(HealthConst.LATENCY.value)
+        if average is None:
+            health[HealthConst.LATENCY.value] = latency
+        else:
+            alpha = HealthConst.LATENCY_ALPHA.value
+            health[HealthConst.LATENCY.value] = alpha * latency + (1 - alpha) * average
+        return
+
+    def record_success(self, provider, latency=None):
+        with self.lock:
+            health = self.get_provider(provider)
+            if health.get(HealthConst.OPENED.value) is not None:
+                logging.info(f"Provider {provider} is working again, closing circuit")
+            health[HealthConst.FAILURES.value] = 0
+            health[HealthConst.OPENED.value] = None
+            self.update_latency(health, latency)
+        return
+
+    def record_failure(self, provider, latency=None, now=None):
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            health = self.get_provider(provider)
+            health[HealthConst.FAILURES.value] += 1
+            self.update_latency(health, latency)
+
+            # A failed probe while half open reopens the circuit straight away
+            if 0 < self.failure_limit <= health[HealthConst.FAILURES.value]:
+                logging.warning(f"Provider {provider} failed {health[HealthConst.FAILURES.value]} time(s) in a row. "
+                                f"Skipping it for {self.cool_down} minutes.")
+                health[HealthConst.OPENED.value] = now
+        return
@@ -3,26 +3,49 @@
 # Main pycasso class to run
 
 import argparse
+import configparser
+import copy
+import itertools
 import logging
 import os
+import queue
 import random
+import threading
+import time
 import warnings
-import re
 import numpy
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 from PIL import Image, ImageDraw, ImageFont, PngImagePlugin
-from omni_epd import displayfactory, EPDNotFoundError
 
+from piblo.block_cache import BlockCache
 from piblo.config_wrapper import Configs
+from piblo.disk_cache import DiskCache
+from piblo.feed_cache import FeedCache
 from piblo.constants import ProvidersConst, ConfigConst, PropertiesConst, PromptModeConst, ImageConst, AutomaticConst, \
-    IconFileConst, BatteryConst, PosterConst, BlockConst, StabilityConst
+    IconFileConst, BatteryConst, PosterConst, BlockConst, StabilityConst, FrameQueueConst, \
+    TraceConst, DiskCacheConst, QuantizeConst, RefreshConst, CatalogConst
 from piblo.file_operations import FileOperations
+from piblo.frame_queue import FrameQueue
+from piblo.frame_store import FrameStore
+from piblo.image_catalog import ImageCatalog
+from piblo.http_pool import HttpPool
 from piblo.image_functions import ImageFunctions
+from piblo.lazy_module import LazyModule
+from piblo.line_index import LineIndex
 from piblo.provider import StabilityProvider, DalleProvider, AutomaticProvider
+from piblo.provider_health import ProviderHealth
 from piblo.post_wrapper import MastodonPoster
 from piblo.prompt_block import FileBlock, QuoteBlock, LLMBlock, RSSBlock, JokeBlock
+from piblo.prompt_template import PromptTemplate
+from piblo.run_trace import RunTrace
+from piblo.scheduler import Scheduler
+
+# Display drivers pull in hardware libraries, so omni-epd is only loaded when the display is set up
+omni_epd = LazyModule("omni_epd")
+displayfactory = LazyModule("omni_epd.displayfactory")
 
 
 # noinspection PyTypeChecker
@@ -41,8 +64,62 @@ class Pycasso:
     load_config()
         Loads config from file provided to it or sets defaults
 
-    display_image_on_EPD(display_image, epd)
-        Displays PIL image object 'display_image' on omni_epd object 'epd'
+    refresh_config()
+        Reloads config if the config file has changed since it was loaded, otherwise restores the loaded settings.
+        Used between refreshes in daemon mode.
+
+    configure_network()
+        Applies timeouts and retry settings from config to all web requests.
+
+    load_display()
+        Loads the omni-epd display driver if it has not already been loaded and sets width and height for pycasso.
+
+    get_stability_format()
+        Returns image format to request from stability, using a lossy format for displays with few colours.
+
+    load_caches()
+        Sets up the caches of generated images, resized external images, prepared icons, block text and feeds, and the
+        image catalog, from config.
+
+    get_response_key(provider_type)
+        Returns the cache key for the current prompt with provider 'provider_type' and the settings it would use.
+
+    load_cached_response(provider_type)
+        Returns the cached image for the current prompt from generator 'provider_type', or None if not cached.
+
+    cache_response(provider_type, image)
+        Caches PIL image 'image' generated for the current prompt by 'provider_type'. Returns True if cached.
+
+    load_health()
+        Loads provider failures and latency saved by earlier runs, used to skip providers that keep failing.
+
+    record_provider_health(provider_type, success, latency)
+        Records whether 'provider_type' returned an image and how many seconds 'latency' it took, and saves it.
+
+    get_provider(provider_type)
+        Returns a provider object for 'provider_type', creating it on first use and keeping it for later refreshes.
+        Safe to call from several threads, only one provider is created for each type.
+
+    create_provider(provider_type)
+        Same as get_provider(), but must only be called while holding 'provider_lock'.
+
+    display_image_on_EPD(display_image, epd, rotate, box)
+        Displays PIL image object 'display_image' on omni_epd object 'epd'. Only refreshes 'box' of the panel if given,
+        using the driver's partial refresh.
+
+    supports_partial_refresh(epd)
+        Returns True if display driver 'epd' can refresh part of the panel.
+
+    load_last_frame(path)
+        Loads the frame last shown on the display from 'path'. Returns PIL image and number of partial refreshes since
+        the last full refresh, or None and 0 if there is no frame.
+
+    save_last_frame(path, image, partial_count)
+        Saves PIL image 'image' shown on the display to 'path' with 'partial_count'. Returns True if saved.
+
+    get_refresh(frame, previous, partial_count, supports_partial, partial_max, full_refresh_every)
+        Compares 'frame' to the 'previous' frame shown and returns the kind of refresh needed ('full', 'partial' or
+        'skip') and the box to refresh for a partial refresh.
 
     set_rotate()
         Swaps width and height if epd rotation is 90 or 270.
@@ -51,18 +128,49 @@ class Pycasso:
         Loads the default test image for pycasso. Good starting point to see if the screen works, and provides facility
         for unit tests.
 
-    load_external_image(location, width, height, preamble_regex, artist_regex, remove_text, parse_text, extension)
+    load_external_image(location, width, height, preamble_regex, artist_regex, remove_text, parse_text, extension,
+                        resize_external, cache, catalog)
         Loads a random external image previously generated by pycasso within file path string 'location' and with
         'extension' (default png). Will be resized to pixel size 'width' and 'height'. 'preamble regex' is text to be
         removed from the start of the filename before the title. 'artist_regex' is text to be removed from between the
         title and artist. 'remove_text' is a list of text items to be found and removed wherever occurring in filename.
+        Resized images are read from and saved to DiskCache 'cache' if provided. Picks the image and its text from
+        ImageCatalog 'catalog' if provided.
         returns PIL image object, title string and artist string
 
-    load_historic_image(location, extension)
+    get_external_key(image_path, width, height, resize_external)
+        Returns cache key for external image 'image_path' resized to 'width' and 'height'. Changes when the file does.
+
+    load_external_file(image_path, width, height, resize_external, cache)
+        Loads external image 'image_path' resized for the display, using DiskCache 'cache' if provided.
+        Returns PIL image object.
+
+    build_external_file(image_path, width, height, resize_external, cache)
+        Resizes external image 'image_path' into DiskCache 'cache'. Used by worker processes. Returns True if cached.
+
+    build_external_cache(workers)
+        Resizes every external image for the display into the external cache using 'workers' processes (default one
+        per CPU). Returns number of images cached.
+
+    load_historic_image(location, extension, width, height, catalog)
         Loads a random historic image previously generated by pycasso within file path string 'location' and with
-        'extension' (default png)
+        'extension' (default png). Shrunk by a whole factor if much larger than pixel size 'width' and 'height'.
+        Picks the image and its text from ImageCatalog 'catalog' if provided.
         returns PIL image object, title string and artist string
 
+    get_external_text(image_name, preamble_regex, artist_regex, remove_text, parse_text, extension)
+        Returns title and artist parsed from external image file name 'image_name' if 'parse_text', otherwise the
+        file name and None.
+
+    get_historic_text(image_name, metadata)
+        Returns title and artist from dictionary of image 'metadata' saved by pycasso, falling back to 'image_name'.
+
+    read_external_entry(image_path, preamble_regex, artist_regex, remove_text, parse_text, extension)
+        Returns width, height, title, artist and prompt of external image 'image_path' for the image catalog.
+
+    read_historic_entry(image_path)
+        Returns width, height, title, artist and prompt of historic image 'image_path' for the image catalog.
+
     load_stability_image(prompt, width, height, stability_key=None)
         Uses Stable Diffusion API to request an image based on 'prompt' text, of pixel dimensions 'width' and 'height'
         API key should be provided in 'stability_key'
@@ -80,18 +188,27 @@ class Pycasso:
         returns PIL image object
 
     parse_multiple_brackets(text, bracket_pairs)
-        Takes 'text' and applies parsing based on all 2 string bracket strings in 'bracket_pairs' list, sequentially.
+        Takes 'text' and applies parsing based on all 2 string bracket strings in 'bracket_pairs' list, in a single
+        pass.
         returns updated text
 
     parse_blocks_nested(text, block_bracket_one="<", block_bracket_two=">", subset_bracket_one="{",
             subset_bracket_two="}", loop_limit=100):
-        Takes 'text' and applies actions based on blocks defined within brackets, starting inside first.
+        Takes 'text' and applies actions based on blocks defined within brackets, starting inside first. Blocks next
+        to each other are processed at the same time, up to 'block_workers' at once and until 'block_timeout' passes.
         Returns updated text and subset of text if defined
 
+    parse_blocks_many(texts, loop_limit=100):
+        Same as parse_blocks_nested for each text in list 'texts', processing the blocks of all texts at the same time.
+        Returns list of tuples of updated text and subset of text, in the same order as 'texts'
+
     def process_block():
         Processes block based on the contents of the text block
         Returns updated text, returns "" if fails
 
+    get_block_fallback(block_text)
+        Returns text to use for block 'block_text' when it doesn't finish before the deadline for blocks
+
     prep_prompt_text(prompt_mode)
         Function to prepare prompt text based on current state of the class. Prompt mode to select which generation mode
         to be used.
@@ -122,8 +239,9 @@ class Pycasso:
         Saves a PIL image 'image' with 'extension' (default png) based on string 'prompt', with metadata object
         'metadata'
 
-    get_random_provider_mode()
-        returns a random provider mode based on the current set available to pycasso
+    get_random_provider_mode(exclude)
+        returns a random provider mode based on the current set available to pycasso, ignoring any in list 'exclude'
+        and any that have failed too many times recently
 
     get_random_provider_mode(mode)
         Removes provider mode 'mode' from the possible choices for pycasso to use in get_random_provider_mode().
@@ -140,11 +258,31 @@ class Pycasso:
         text sizes of the title and artist respectively. 'box_to_floor' is a boolean flag to draw the text box to the
         bottom of the image or not. 'box_to_edge' is a boolean flag to draw the text box to the edges of the image or
         not. 'crop_left' and 'crop_right' are the cropped image coordinates to use if 'box to edge' is used. These do
-        not need to be set if box_to_edge is false.
+        not need to be set if box_to_edge is false. If 'resize_text' is set, the title is drawn at the largest size
+        down to 'title_min_size' that fits the display width in as many lines as wrapping at 'max_chars' would give.
+        'resize_ratio' is no longer used.
+
+    load_provider_image(provider_type, prompt, title_text, artist_text)
+        Loads an image from provider 'provider_type' using 'prompt' for generators, without changing pycasso's state.
+        returns PIL image object, title string and artist string
 
     get_image()
         Runs logic to get an image from appropriate provider
 
+    get_image_racing()
+        Starts a random provider, and another each time 'hedge_delay' passes or a provider fails, keeping the first
+        image returned. Paid providers started are limited by 'race_spend_cap'. Providers that finish after the winner
+        have their images added to the frame queue, so a paid image is never thrown away.
+        returns PIL image object and provider type of the winner
+
+    queue_late_frame(provider_type, image_base, info)
+        Crops image 'image_base' from a provider that lost a race and adds it to the frame queue with frame info
+        dictionary 'info', saving it as well if 'save_image' is set.
+        Returns True if queued
+
+    wait_racers()
+        Waits for providers still running after a race to finish, so their images are queued before pycasso closes.
+
     get_image_fallback_modes()
         Runs get_image(), but repeats if image fails to load.
 
@@ -160,8 +298,66 @@ class Pycasso:
     add_exception_icon():
         Adds exception icon to icon list.
 
+    fetch_image()
+        Gets an image from a provider, using fallback modes if set in config. Returns PIL image and provider type.
+
+    crop_image()
+        Crops the current image to the display size. Returns left and right crop coordinates.
+
+    decorate_image(crop_left, crop_right)
+        Adds icons, status shape and text to the current image, ready to display. Draws on a copy only if the image is
+        posted after.
+
+    get_quantize_palette()
+        Returns list of colours the display can show, from palette_filter or the display mode. None if not known.
+
+    quantize_image()
+        Reduces the image ready to display to the colours the display can show, if set in config.
+
+    store_frame()
+        Keeps the image ready to display in the frame store, so it can be shown again without decoding.
+        Returns True if stored.
+
+    show_stored_frame()
+        Shows a recently shown frame from the frame store, for when no new image is available.
+        Returns True if a frame was shown.
+
+    refresh_display()
+        Shows the image ready to display, refreshing only the changed part of the panel or skipping the refresh when
+        little or nothing has changed, if set in config. Returns the kind of refresh done.
+
+    load_queued_frame()
+        Takes the oldest frame from the queue if one is available.
+        Returns PIL image, provider type and crop coordinates, or None if the queue is empty.
+
+    get_frame_info(provider, crop_left, crop_right)
+        Returns dictionary of the current text, 'provider' and crop coordinates to store with a frame.
+
+    set_frame_info(info)
+        Sets the current text from dictionary 'info' stored with a frame. Returns provider type and crop coordinates.
+
+    save_base_frame(provider, crop_left, crop_right)
+        Saves the current cropped image before icons and text are added, with its text, if set in config.
+        Returns True if saved.
+
+    load_base_frame()
+        Loads the base frame saved by the last run if it fits the display.
+        Returns PIL image, provider type and crop coordinates, or None if there is no usable frame.
+
+    prefetch(count)
+        Fetches and crops up to 'count' images (default queue_size) and adds them to the queue for later runs.
+        Returns number of frames queued.
+
     run()
         Do pycasso
+
+    run_status()
+        Redraws icons and text on the base frame saved by the last run and refreshes the display, without calling
+        providers or parsing prompts. Returns True if the display was refreshed.
+
+    run_daemon(max_runs)
+        Runs pycasso repeatedly as a long-lived process on the schedule set in config, keeping config, display
+        driver, fonts, icons and provider clients loaded between refreshes. Runs forever unless 'max_runs' is set.
     """
 
     def __init__(self, config_path=None, file_path=os.getcwd(), charge_level=-1):
@@ -195,6 +391,45 @@ class Pycasso:
         self.stability_key = None
         self.dalle_key = None
 
+        # Providers kept between refreshes. Blocks and raced providers run in threads and can ask for one at once.
+        self.providers = {}
+        self.provider_lock = threading.Lock()
+
+        # Set while running as a daemon, so ctrl + c stops the daemon rather than a single refresh
+        self.daemon = False
+        self.config_time = None
+
+        # Timing of each phase of the run
+        self.trace = RunTrace()
+
+        # Provider failures and latency remembered between runs
+        self.health = None
+
+        # Generated images kept to avoid paying for the same prompt twice
+        self.response_cache = None
+
+        # External images already cropped and resized for the display
+        self.external_cache = None
+
+        # Icons already coloured and resized
+        self.icon_cache = None
+
+        # Index of historic and external images with their text
+        self.catalog = None
+
+        # Text fetched by blocks
+        self.block_cache = None
+
+        # Entries of feeds read by rss blocks
+        self.feed_cache = None
+
+        # Providers still running after losing a race, their images are queued for later runs
+        self.racers = []
+        self.race_lock = threading.Lock()
+
+        # Time blocks in the prompt being prepared have to finish by
+        self.block_deadline = None
+
         # Args read
         self.args = self.parse_args()
         self.stability_key = self.args.stabilitykey
@@ -203,7 +438,13 @@ class Pycasso:
             self.icon_shape = self.args.displayshape
 
         # Load config or set defaults
-        self.config = self.load_config(config_path)
+        with self.trace.phase(TraceConst.LOAD_CONFIG.value):
+            self.config = self.load_config(config_path)
+        self.config_time = self.get_config_time()
+        self.trace.path = self.config.trace_file
+        self.configure_network()
+        self.load_health()
+        self.load_caches()
 
         if self.args.savekeys:
             if self.stability_key is not None:
@@ -256,6 +497,33 @@ class Pycasso:
                                 help="Displays a shape in the top left corner of the epd. Good for providing visual"
                                      "information while using a mostly disconnected headless setup."
                                      "\n0 - Square\n1 - Cross\n2 - Triangle\n3 - Circle")
+            parser.add_argument("--daemon",
+                                dest="daemon",
+                                action="store_const",
+                                const=1,
+                                default=0,
+                                help="Keep pycasso running and refresh the epaper screen on the schedule set in the "
+                                     "[Daemon] section of .config")
+            parser.add_argument("--prefetch",
+                                dest="prefetch",
+                                type=int,
+                                default=0,
+                                help="Fetch and queue up to this many frames ahead of time, so later runs can update "
+                                     "the epaper screen without waiting on a provider")
+            parser.add_argument("--status-only",
+                                dest="statusonly",
+                                action="store_const",
+                                const=1,
+                                default=0,
+                                help="Redraw the battery and status icons on the last image shown and refresh the "
+                                     "epaper screen, without fetching a new image")
+            parser.add_argument("--buildcache",
+                                dest="buildcache",
+                                action="store_const",
+                                const=1,
+                                default=0,
+                                help="Resize every external image for the epaper screen ahead of time, so later runs "
+                                     "only read a small file")
 
             args, unknown = parser.parse_known_args()
 
@@ -306,19 +574,223 @@ class Pycasso:
 
         return config
 
+    def get_config_time(self):
+        if self.config is None or not os.path.exists(self.config.config_path):
+            return None
+        return os.path.getmtime(self.config.config_path)
+
+    def refresh_config(self):
+        with self.trace.phase(TraceConst.REFRESH_CONFIG.value):
+            config_time = self.get_config_time()
+            if config_time != self.config_time:
+                logging.info("Config file changed, reloading config")
+                self.config.config = configparser.ConfigParser()
+                self.config_dict = self.config.read_config()
+                self.config_time = config_time
+                # Settings used to create display and providers may have changed
+                self.epd = None
+                self.providers = {}
+            else:
+                # Restore settings changed during the last refresh, eg providers removed after failure
+                self.config.load_config(self.config.config)
+        self.trace.path = self.config.trace_file
+        self.configure_network()
+        self.load_health()
+        self.load_caches()
+        return self.config
+
+    def configure_network(self):
+        HttpPool.configure(connect_timeout=self.config.connect_timeout, read_timeout=self.config.read_timeout,
+                           retries=self.config.network_retries, backoff=self.config.retry_backoff,
+                           backoff_max=self.config.retry_backoff_max)
+        return
+
+    def reset_run_state(self):
+        self.image_base = None
+        self.image_display = None
+        self.prompt = ""
+        self.artist_text = ""
+        self.title_text = ""
+        self.full_text = ""
+        self.metadata = None
+        self.icons = []
+        self.trace = RunTrace(self.config.trace_file)
+        return
+
+    def load_health(self):
+        self.health = ProviderHealth(self.config.health_file, self.config.circuit_failures,
+                                     self.config.circuit_cool_down)
+        return self.health
+
+    def record_provider_health(self, provider_type, success, latency=None):
+        # Test mode is always available, and nothing is written when the circuit breaker is off
+        if provider_type == ProvidersConst.TEST.value or self.config.circuit_failures <= 0:
+            return
+        if success:
+            self.health.record_success(provider_type, latency)
+        else:
+            self.health.record_failure(provider_type, latency)
+        self.health.save()
+        return
+
+    def get_stability_format(self):
+        # Display may not be loaded yet when prefetching, in which case the mode is unknown
+        return StabilityProvider.get_output_format(getattr(self.epd, "mode", None), self.config.stability_format)
+
+    def load_caches(self):
+        self.response_cache = DiskCache(self.config.response_cache_location,
+                                        self.config.response_cache_size * DiskCacheConst.MEGABYTE.value)
+        self.external_cache = DiskCache(self.config.external_cache_location,
+                                        self.config.external_cache_size * DiskCacheConst.MEGABYTE.value)
+        self.icon_cache = DiskCache(os.path.join(self.config.cache_location, DiskCacheConst.ICON_FOLDER.value),
+                                    DiskCacheConst.ICON_MAX_BYTES.value)
+        self.catalog = None
+        if self.config.use_catalog:
+            self.catalog = ImageCatalog(self.config.catalog_file)
+        LineIndex.configure(self.config.line_index_location if self.config.use_line_index else None)
+        self.block_cache = None
+        if self.config.block_cache_ttl > 0:
+            self.block_cache = BlockCache(self.config.block_cache_file, self.config.block_cache_ttl,
+                                          self.config.block_pool_size)
+        self.feed_cache = FeedCache(self.config.feed_cache_location if self.config.use_feed_cache else None)
+        return
+
+    def get_response_key(self, provider_type):
+        # Everything that changes what the provider would send back for this prompt
+        parts = [provider_type, self.prompt, self.width, self.height]
+        if provider_type == ProvidersConst.STABLE.value:
+            parts += [self.config.stable_host, self.config.aspect_ratio, self.get_stability_format()]
+        elif provider_type == ProvidersConst.DALLE.value:
+            parts += [self.config.infill, self.config.infill_percent]
+        elif provider_type == ProvidersConst.AUTOMATIC.value:
+            parts += [self.config.automatic_host, self.config.automatic_port]
+        return DiskCache.get_key(*parts)
+
+    def load_cached_response(self, provider_type):
+        if provider_type not in ProvidersConst.GENERATORS.value:
+            return None
+        image = self.response_cache.get(self.get_response_key(provider_type))
+        if image is not None:
+            logging.info(f"Using cached image for provider {provider_type} instead of generating '{self.prompt}'")
+        return image
+
+    def cache_response(self, provider_type, image):
+        if provider_type not in ProvidersConst.GENERATORS.value:
+            return False
+        return self.response_cache.put(self.get_response_key(provider_type), image)
+
+    def load_display(self):
+        if self.epd is None:
+            self.epd = displayfactory.load_display_driver(self.config.display_type, self.config_dict)
+            # If display is mock, apply height and width to it
+            if self.config.display_type == ConfigConst.DISPLAY_TYPE.value:
+                self.epd.width = self.config.test_epd_width
+                self.epd.height = self.config.test_epd_height
+
+        # Set width and height for pycasso program
+        self.width, self.height = self.set_rotate(self.epd.width, self.epd.height, self.config.image_rotate)
+        return self.epd
+
+    def get_provider(self, provider_type):
+        # Creating a provider loads keys from the keychain, which isn't safe to do from several threads at once
+        with self.provider_lock:
+            return self.create_provider(provider_type)
+
+    def create_provider(self, provider_type):
+        provider = self.providers.get(provider_type)
+        if provider is not None:
+            return provider
+
+        if provider_type == ProvidersConst.STABLE.value:
+            provider = StabilityProvider(key=self.stability_key, host=self.config.stable_host,
+                                         creds_mode=self.config.use_keychain, creds_path=self.config.credential_path)
+        elif provider_type == ProvidersConst.DALLE.value:
+            provider = DalleProvider(key=self.dalle_key, creds_mode=self.config.use_keychain,
+                                     creds_path=self.config.credential_path)
+        elif provider_type == ProvidersConst.AUTOMATIC.value:
+            provider = AutomaticProvider(host=self.config.automatic_host, port=self.config.automatic_port)
+        else:
+            logging.warning(f"No provider object available for provider type {provider_type}")
+            return None
+
+        self.providers[provider_type] = provider
+        return provider
+
     @staticmethod
-    def display_image_on_epd(display_image, epd, rotate):
+    def display_image_on_epd(display_image, epd, rotate, box=None):
         # Rotate image back to save
-        display_image = display_image.rotate(-rotate, expand=1)
+        display_image = ImageFunctions.rotate_frame(display_image, rotate)
         logging.info("Prepare epaper")
         epd.prepare()
 
-        epd.display(display_image)
+        if box is None:
+            epd.display(display_image)
+        else:
+            logging.info(f"Partially refreshing epaper in {box}")
+            getattr(epd, RefreshConst.PARTIAL_METHOD.value)(display_image, box)
 
         logging.info("Send epaper to sleep")
         epd.close()
         return
 
+    @staticmethod
+    def supports_partial_refresh(epd):
+        return callable(getattr(epd, RefreshConst.PARTIAL_METHOD.value, None))
+
+    @staticmethod
+    def load_last_frame(path):
+        if not os.path.exists(path):
+            return None, 0
+
+        try:
+            with Image.open(path) as frame:
+                frame.load()
+                partial_count = int(frame.text.get(RefreshConst.PARTIAL_COUNT.value, 0))
+                image = frame.convert(ImageConst.CONVERT_MODE.value)
+        except (IOError, OSError, ValueError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read last displayed frame '{path}'. Doing a full refresh.")
+            return None, 0
+
+        return image, partial_count
+
+    @staticmethod
+    def save_last_frame(path, image, partial_count=0):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            metadata = PngImagePlugin.PngInfo()
+            metadata.add_text(RefreshConst.PARTIAL_COUNT.value, str(partial_count))
+            temp_path = f"{path}{RefreshConst.TEMP_SUFFIX.value}"
+            image.save(temp_path, format=RefreshConst.FORMAT.value, pnginfo=metadata)
+            os.replace(temp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to save displayed frame to '{path}'")
+            return False
+
+        return True
+
+    @staticmethod
+    def get_refresh(frame, previous=None, partial_count=0, supports_partial=False,
+                    partial_max=ConfigConst.REFRESH_PARTIAL_MAX.value,
+                    full_refresh_every=ConfigConst.REFRESH_FULL_EVERY.value):
+        if previous is None or previous.size != frame.size:
+            return RefreshConst.FULL.value, None
+
+        box = ImageFunctions.get_changed_box(previous, frame, RefreshConst.ALIGN.value)
+        if box is None:
+            return RefreshConst.SKIP.value, None
+
+        # Partial refreshes leave ghosting behind, so a full refresh clears it every so often
+        if not supports_partial or 0 < full_refresh_every <= partial_count:
+            return RefreshConst.FULL.value, None
+
+        left, top, right, bottom = box
+        if (right - left) * (bottom - top) * 100 > partial_max * frame.width * frame.height:
+            return RefreshConst.FULL.value, None
+
+        return RefreshConst.PARTIAL.value, box
+
     @staticmethod
     def set_rotate(width, height, rotate=0):
         if (rotate / 90) % 2 == 1:
@@ -350,11 +822,11 @@ class Pycasso:
 
     @staticmethod
     def load_external_image(location, width, height, preamble_regex=ConfigConst.TEXT_PREAMBLE_REGEX.value,
-                            artist_regex=ConfigConst.TEXT_ARTIST_REGEX,
+                            artist_regex=ConfigConst.TEXT_ARTIST_REGEX.value,
                             remove_text=ConfigConst.TEXT_REMOVE_TEXT_LIST.value,
                             parse_text=ConfigConst.TEXT_PARSE_FILE_TEXT.value,
                             extension=ConfigConst.FILE_IMAGE_FORMAT.value,
-                            resize_external=ConfigConst.FILE_RESIZE_EXTERNAL.value):
+                            resize_external=ConfigConst.FILE_RESIZE_EXTERNAL.value, cache=None, catalog=None):
         title_text = None
         artist_text = None
         try:
@@ -363,34 +835,32 @@ class Pycasso:
                 warnings.warn("External image directory path does not exist: '" + image_directory + "'")
                 exit()
 
-            # Get random image from folder
-            file = FileOperations(image_directory)
-            image_path = file.get_random_file_of_type(extension)
-            image_base = Image.open(image_path)
-
-            # Add text to via parsing if necessary
-            image_name = os.path.basename(image_path)
-            title_text = image_name
-
-            if parse_text:
-                title_text, artist_text = FileOperations.get_title_and_artist(image_name,
-                                                                              preamble_regex,
-                                                                              artist_regex,
-                                                                              extension)
-                title_text = FileOperations.remove_text(title_text, remove_text)
-                artist_text = FileOperations.remove_text(artist_text, remove_text)
-                title_text = title_text.title()
-                artist_text = artist_text.title()
-
-            # Resize to thumbnail size based on epd resolution depending on if option selected
-            epd_res = (width, height)
-            if not resize_external:
-                crop_min = min(image_base.height, image_base.width)
-                image_crop = ImageFunctions.get_crop_size(image_base.width, image_base.height, crop_min, crop_min)
-                image_base = image_base.crop(image_crop)
-                image_base.thumbnail(ImageFunctions.max_tup(epd_res))
+            # Pick from the catalog if it can be used, otherwise get random image from folder
+            entry = None
+            if catalog is not None:
+                settings = DiskCache.get_key(preamble_regex, artist_regex, remove_text, parse_text)
+
+                def reader(path):
+                    return Pycasso.read_external_entry(path, preamble_regex, artist_regex, remove_text, parse_text,
+                                                       extension)
+
+                if catalog.update(image_directory, ProvidersConst.EXTERNAL.value, extension, reader,
+                                  settings) is not None:
+                    entry = catalog.get_random(image_directory, ProvidersConst.EXTERNAL.value)
+
+            if entry is not None:
+                image_path = entry[CatalogConst.PATH.value]
+                title_text = entry[CatalogConst.TITLE.value]
+                artist_text = entry[CatalogConst.ARTIST.value]
             else:
-                image_base.thumbnail(epd_res)
+                file = FileOperations(image_directory)
+                image_path = file.get_random_file_of_type(extension)
+                title_text, artist_text = Pycasso.get_external_text(os.path.basename(image_path), preamble_regex,
+                                                                    artist_regex, remove_text, parse_text, extension)
+
+            image_base = Pycasso.load_external_file(image_path, width, height, resize_external, cache)
+            if entry is not None:
+                catalog.record_shown(image_path)
         except AttributeError as e:
             logging.warning(e)
             logging.warning("Unable to open external image. Check if you have any files in the folder.")
@@ -403,7 +873,79 @@ class Pycasso:
         return image_base, title_text, artist_text
 
     @staticmethod
-    def load_historic_image(location, extension=ConfigConst.FILE_IMAGE_FORMAT.value):
+    def get_external_key(image_path, width, height, resize_external=ConfigConst.FILE_RESIZE_EXTERNAL.value):
+        # A changed or replaced file gets a new key, old versions age out of the cache
+        stat = os.stat(image_path)
+        return DiskCache.get_key(os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, width, height,
+                                 resize_external)
+
+    @staticmethod
+    def load_external_file(image_path, width, height, resize_external=ConfigConst.FILE_RESIZE_EXTERNAL.value,
+                           cache=None):
+        key = None
+        if cache is not None:
+            key = Pycasso.get_external_key(image_path, width, height, resize_external)
+            image_base = cache.get(key)
+            if image_base is not None:
+                return image_base
+
+        # Decode at close to display size, cropping to a square needs the short side to cover the whole display
+        epd_res = (width, height)
+        decode_res = epd_res
+        if not resize_external:
+            decode_res = ImageFunctions.max_tup(epd_res)
+        image_base = ImageFunctions.open_image(image_path, *decode_res)
+
+        # Resize to thumbnail size based on epd resolution depending on if option selected
+        if not resize_external:
+            crop_min = min(image_base.height, image_base.width)
+            image_crop = ImageFunctions.get_crop_size(image_base.width, image_base.height, crop_min, crop_min)
+            image_base = image_base.crop(image_crop)
+            image_base.thumbnail(ImageFunctions.max_tup(epd_res))
+        else:
+            image_base.thumbnail(epd_res)
+
+        if cache is not None:
+            cache.put(key, image_base)
+        return image_base
+
+    @staticmethod
+    def build_external_file(image_path, width, height, resize_external=ConfigConst.FILE_RESIZE_EXTERNAL.value,
+                            cache=None):
+        # Runs in a worker process, so only report back whether it worked rather than sending the image
+        try:
+            Pycasso.load_external_file(image_path, width, height, resize_external, cache)
+        except BaseException as e:
+            logging.warning(e)
+            logging.warning(f"Unable to cache external image '{image_path}'")
+            return False
+        return True
+
+    def build_external_cache(self, workers=None):
+        logging.info("pycasso external cache build has begun")
+        self.load_display()
+
+        if self.external_cache.max_bytes <= 0:
+            logging.warning("External cache is disabled. Set 'external_cache_size' in .config to use it.")
+            return 0
+
+        file = FileOperations(self.config.external_image_location)
+        paths = file.get_all_files_of_type(self.config.image_format)
+        if len(paths) == 0:
+            return 0
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(Pycasso.build_external_file, paths, itertools.repeat(self.width),
+                               itertools.repeat(self.height), itertools.repeat(self.config.resize_external),
+                               itertools.repeat(self.external_cache))
+            built = sum(results)
+
+        logging.info(f"Cached {built} of {len(paths)} external image(s)")
+        return built
+
+    @staticmethod
+    def load_historic_image(location, extension=ConfigConst.FILE_IMAGE_FORMAT.value, width=0, height=0,
+                            catalog=None):
         title_text = None
         artist_text = None
         try:
@@ -412,21 +954,28 @@ class Pycasso:
                 warnings.warn(f"Historic image directory path does not exist: '{image_directory}'")
                 exit()
 
-            # Get random image from folder
-            file = FileOperations(image_directory)
-            image_path = file.get_random_file_of_type(extension)
-            image_base = Image.open(image_path)
-            image_name = os.path.basename(image_path)
-            title_text = image_name
-
-            # Get and apply metadata if it exists
-            metadata = image_base.text
-            if PropertiesConst.TITLE.value in metadata.keys():
-                title_text = metadata[PropertiesConst.TITLE.value]
-            elif PropertiesConst.PROMPT.value in metadata.keys():
-                title_text = metadata[PropertiesConst.PROMPT.value]
-            if PropertiesConst.ARTIST.value in metadata.keys():
-                artist_text = metadata[PropertiesConst.ARTIST.value]
+            # Pick from the catalog if it can be used, otherwise get random image from folder
+            entry = None
+            if catalog is not None:
+                if catalog.update(image_directory, ProvidersConst.HISTORIC.value, extension,
+                                  Pycasso.read_historic_entry) is not None:
+                    entry = catalog.get_random(image_directory, ProvidersConst.HISTORIC.value)
+
+            if entry is not None:
+                # Text is already known, so the image can be decoded straight to display size
+                image_path = entry[CatalogConst.PATH.value]
+                title_text = entry[CatalogConst.TITLE.value]
+                artist_text = entry[CatalogConst.ARTIST.value]
+                image_base = ImageFunctions.open_image(image_path, width, height)
+                catalog.record_shown(image_path)
+            else:
+                file = FileOperations(image_directory)
+                image_path = file.get_random_file_of_type(extension)
+                image_base = Image.open(image_path)
+                title_text, artist_text = Pycasso.get_historic_text(os.path.basename(image_path), image_base.text)
+
+                # Metadata is lost on resizing, so only shrink once it has been read
+                image_base = ImageFunctions.reduce_image(image_base, width, height)
         except AttributeError as e:
             logging.warning(e)
             logging.warning("Unable to open historical image. Check if you have any files in the folder.")
@@ -438,24 +987,87 @@ class Pycasso:
 
         return image_base, title_text, artist_text
 
+    @staticmethod
+    def get_external_text(image_name, preamble_regex=ConfigConst.TEXT_PREAMBLE_REGEX.value,
+                          artist_regex=ConfigConst.TEXT_ARTIST_REGEX.value,
+                          remove_text=ConfigConst.TEXT_REMOVE_TEXT_LIST.value,
+                          parse_text=ConfigConst.TEXT_PARSE_FILE_TEXT.value,
+                          extension=ConfigConst.FILE_IMAGE_FORMAT.value):
+        title_text = image_name
+        artist_text = None
+
+        # Add text to via parsing if necessary
+        if parse_text:
+            title_text, artist_text = FileOperations.get_title_and_artist(image_name,
+                                                                          preamble_regex,
+                                                                          artist_regex,
+                                                                          extension)
+            title_text = FileOperations.remove_text(title_text, remove_text)
+            artist_text = FileOperations.remove_text(artist_text, remove_text)
+            title_text = title_text.title()
+            artist_text = artist_text.title()
+        return title_text, artist_text
+
+    @staticmethod
+    def get_historic_text(image_name, metadata):
+        title_text = image_name
+        artist_text = None
+
+        # Get and apply metadata if it exists
+        if PropertiesConst.TITLE.value in metadata.keys():
+            title_text = metadata[PropertiesConst.TITLE.value]
+        elif PropertiesConst.PROMPT.value in metadata.keys():
+            title_text = metadata[PropertiesConst.PROMPT.value]
+        if PropertiesConst.ARTIST.value in metadata.keys():
+            artist_text = metadata[PropertiesConst.ARTIST.value]
+        return title_text, artist_text
+
+    @staticmethod
+    def read_external_entry(image_path, preamble_regex=ConfigConst.TEXT_PREAMBLE_REGEX.value,
+                            artist_regex=ConfigConst.TEXT_ARTIST_REGEX.value,
+                            remove_text=ConfigConst.TEXT_REMOVE_TEXT_LIST.value,
+                            parse_text=ConfigConst.TEXT_PARSE_FILE_TEXT.value,
+                            extension=ConfigConst.FILE_IMAGE_FORMAT.value):
+        # Only the header is read for the size
+        with Image.open(image_path) as image:
+            width, height = image.size
+        title_text, artist_text = Pycasso.get_external_text(os.path.basename(image_path), preamble_regex, artist_regex,
+                                                            remove_text, parse_text, extension)
+        return width, height, title_text, artist_text, None
+
+    @staticmethod
+    def read_historic_entry(image_path):
+        with Image.open(image_path) as image:
+            width, height = image.size
+            metadata = image.text
+        title_text, artist_text = Pycasso.get_historic_text(os.path.basename(image_path), metadata)
+        return width, height, title_text, artist_text, metadata.get(PropertiesConst.PROMPT.value)
+
     @staticmethod
     def load_stability_image(prompt, width, height, stability_key=None, creds_mode=ProvidersConst.USE_KEYCHAIN,
                              creds_path=ProvidersConst.CREDENTIAL_PATH.value, stability_host=None,
-                             aspect_ratio=StabilityConst.ASPECT_RATIO.value):
+                             aspect_ratio=StabilityConst.ASPECT_RATIO.value,
+                             output_format=StabilityConst.LOSSLESS_FORMAT.value, provider=None):
         logging.info("Loading Stability API")
-        stability_provider = StabilityProvider(key=stability_key, host=stability_host, creds_mode=creds_mode,
-                                               creds_path=creds_path)
+        stability_provider = provider
+        if stability_provider is None:
+            stability_provider = StabilityProvider(key=stability_key, host=stability_host, creds_mode=creds_mode,
+                                                   creds_path=creds_path)
 
         logging.info("Getting Image")
-        image = stability_provider.get_image_from_string(prompt, height, width, aspect_ratio=aspect_ratio)
+        image = stability_provider.get_image_from_string(prompt, height, width, aspect_ratio=aspect_ratio,
+                                                         output_format=output_format)
         return image
 
     @staticmethod
     def load_dalle_image(prompt, width, height, infill=ConfigConst.GENERATION_INFILL.value,
                          infill_percent=ConfigConst.GENERATION_INFILL_PERCENT.value, dalle_key=None,
-                         creds_mode=ProvidersConst.USE_KEYCHAIN, creds_path=ProvidersConst.CREDENTIAL_PATH.value):
+                         creds_mode=ProvidersConst.USE_KEYCHAIN, creds_path=ProvidersConst.CREDENTIAL_PATH.value,
+                         provider=None):
         logging.info("Loading Dalle API")
-        dalle_provider = DalleProvider(key=dalle_key, creds_mode=creds_mode, creds_path=creds_path)
+        dalle_provider = provider
+        if dalle_provider is None:
+            dalle_provider = DalleProvider(key=dalle_key, creds_mode=creds_mode, creds_path=creds_path)
 
         logging.info("Getting Image")
         image_base = dalle_provider.get_image_from_string(prompt, height, width)
@@ -468,9 +1080,11 @@ class Pycasso:
 
     @staticmethod
     def load_automatic_image(prompt, width, height, host=AutomaticConst.DEFAULT_HOST.value,
-                             port=AutomaticConst.DEFAULT_PORT.value):
+                             port=AutomaticConst.DEFAULT_PORT.value, provider=None):
         logging.info("Loading Automatic API")
-        automatic_provider = AutomaticProvider(host=host, port=port)
+        automatic_provider = provider
+        if automatic_provider is None:
+            automatic_provider = AutomaticProvider(host=host, port=port)
 
         logging.info("Getting Image")
         image = automatic_provider.get_image_from_string(prompt, height, width)
@@ -480,6 +1094,11 @@ class Pycasso:
         # Build prompt, add metadata as we go
         self.metadata = PngImagePlugin.PngInfo()
 
+        # All blocks in the prompt share one deadline
+        self.block_deadline = None
+        if self.config.block_timeout > 0:
+            self.block_deadline = time.monotonic() + self.config.block_timeout
+
         if prompt_mode == PromptModeConst.RANDOM.value:
             # Pick random type of building
             random.seed()
@@ -506,7 +1125,7 @@ class Pycasso:
             self.full_text = self.title_text
         elif prompt_mode == PromptModeConst.QUOTE.value:
             # Build prompt based on Quote
-            quote_block = QuoteBlock()
+            quote_block = QuoteBlock(cache=self.block_cache)
             prompt_gen = quote_block.generate()
 
             if prompt_gen is None:
@@ -535,70 +1154,30 @@ class Pycasso:
         return self.artist_text, self.title_text
 
     def parse_blocks_nested(self, text="", loop_limit=100):
-        subject = ""
-
-        b_one = self.config.block_brackets[0]
-        b_two = self.config.block_brackets[1]
-        s_one = self.config.subject_brackets[0]
-        s_two = self.config.subject_brackets[1]
-
-        if not FileOperations.check_brackets(text, b_one, b_two):
-            logging.warning(f"Mismatching brackets in \"{text}\"")
-            return text, subject
-
-        if self.config.specify_subject and not FileOperations.check_brackets(text, s_one, s_two):
-            logging.warning(f"Mismatching brackets in \"{text}\"")
-            return text, subject
-
-        # Get everything inside brackets (either type) and then handle appropriately after
-        regex = fr"([\{b_one}\{s_one}][^\{b_one}\{s_one}\{b_two}{s_two}]*[\{b_two}\{s_two}])"
-        match = re.search(regex, text)
-
-        while match is not None:
-
-            bracket = match.group()
-            open_bracket = bracket[0]
-            close_bracket = bracket[len(bracket) - 1]
-
-            # Check if brackets are mismatching types
-            if open_bracket == b_one and close_bracket != b_two:
-                logging.warning(f"Mismatching brackets in \"{text}\" : \"{bracket}\"")
-                return text, subject
-            if open_bracket == s_one and close_bracket != s_two:
-                logging.warning(f"Mismatching brackets in \"{text}\" : \"{bracket}\"")
-                return text, subject
-
-            if open_bracket == b_one:
-                bracket = bracket.replace(b_one, '').replace(b_two, '')
-                # Process block
-                bracket = self.process_block(bracket)
-                bracket = FileOperations.clean_block_text(bracket)
-            elif open_bracket == s_one:
-                if self.config.specify_subject:
-                    bracket = bracket.replace(s_one, '').replace(s_two, '')
-                    # Process subset
-                    subject = subject + bracket
-                else:
-                    logging.warning(f"Bracket {s_one} found, however specify subject mode not used")
-            else:
-                # Should never happen
-                logging.warning(f"Although processed, brackets \"{b_one}\" or \"{s_one}\" not found in \"{bracket}\"."
-                                f"Logic error processing \"{text}\"")
+        return self.parse_blocks_many([text], loop_limit)[0]
+
+    def parse_blocks_many(self, texts, loop_limit=100):
+        subject_brackets = None
+        if self.config.specify_subject:
+            subject_brackets = self.config.subject_brackets
+        elif any(self.config.subject_brackets[0] in text for text in texts):
+            logging.warning(f"Bracket {self.config.subject_brackets[0]} found, however specify subject mode not used")
 
-            # Substitute brackets
-            text = re.sub(regex, bracket, text, 1)
+        def process(block):
+            return FileOperations.clean_block_text(self.process_block(block))
 
-            # Check for matches remaining in the text
-            match = re.search(regex, text)
+        def fallback(block):
+            return FileOperations.clean_block_text(self.get_block_fallback(block))
 
-            # Use loop_limit to stop this going forever due to error.
-            if loop_limit < 0:
-                logging.warning(f"Recursion limit hit while processing blocks for \"{text}\" - check for recursive"
-                                f"references in blocks")
-                return text, subject
-            loop_limit -= 1
+        return PromptTemplate.expand_blocks_many(texts, self.config.block_brackets, subject_brackets, process,
+                                                 loop_limit, fallback, self.config.block_workers, self.block_deadline)
 
-        return text, subject
+    def get_block_fallback(self, block_text="", arg_seperator=BlockConst.SEPERATOR.value):
+        split = block_text.split(arg_seperator)
+        # Same as the llm block gives back when its request fails
+        if split[0].lower() == BlockConst.LLM.value and len(split) > 1:
+            return split[1]
+        return ""
 
     def process_block(self, block_text="", arg_seperator=BlockConst.SEPERATOR.value):
         split = block_text.split(arg_seperator)
@@ -627,14 +1206,15 @@ class Pycasso:
 
             llm_block = LLMBlock(key=self.dalle_key,
                                  creds_mode=self.config.use_keychain,
-                                 creds_path=self.config.credential_path)
+                                 creds_path=self.config.credential_path,
+                                 llm_provider=self.get_provider(ProvidersConst.DALLE.value))
             return llm_block.generate(args[0],system_prompt=self.config.llm_system_prompt)
 
         elif block_function == BlockConst.RSS.value:
             # RSS Block
             logging.info("Processing RSS block")
 
-            the_block = RSSBlock()
+            the_block = RSSBlock(cache=self.block_cache, feeds=self.feed_cache)
             if len(args) >= 3:
                 return the_block.generate(args[0], args[1], args[2])
             elif len(args) >= 2:
@@ -650,7 +1230,7 @@ class Pycasso:
             # Quote Block
             logging.info("Processing quote block")
 
-            quote_block = QuoteBlock()
+            quote_block = QuoteBlock(cache=self.block_cache)
             return quote_block.generate()
 
         elif block_function == BlockConst.WEATHER.value:
@@ -661,7 +1241,7 @@ class Pycasso:
             # Quote Block
             logging.info("Processing joke block")
 
-            joke_block = JokeBlock()
+            joke_block = JokeBlock(cache=self.block_cache)
             return joke_block.generate()
 
         else:
@@ -672,11 +1252,7 @@ class Pycasso:
 
     @staticmethod
     def parse_multiple_brackets(text, bracket_pairs=ConfigConst.TEXT_PARSE_BRACKETS_LIST.value):
-        pairs = bracket_pairs.copy()
-        pairs.reverse()
-        for brackets in pairs:
-            text = FileOperations.parse_text_nested(text, brackets[0], brackets[1])
-        return text
+        return PromptTemplate.expand_choices(text, bracket_pairs)
 
     def prep_subject_artist_prompt(self, artists_file, subjects_file, preamble=ConfigConst.PROMPT_PREAMBLE.value,
                                    connector=ConfigConst.PROMPT_CONNECTOR.value,
@@ -700,11 +1276,13 @@ class Pycasso:
         postscript_subset = ""
 
         if self.config.use_blocks:
-            artist_text, artist_subset = self.parse_blocks_nested(artist_text)
-            title_text, title_subset = self.parse_blocks_nested(title_text)
-            preamble, preamble_subset = self.parse_blocks_nested(preamble)
-            connector, connector_subset = self.parse_blocks_nested(connector)
-            postscript, postscript_subset = self.parse_blocks_nested(postscript)
+            # All parts of the prompt are parsed together so their blocks are processed at the same time
+            parsed = self.parse_blocks_many([artist_text, title_text, preamble, connector, postscript])
+            artist_text, artist_subset = parsed[0]
+            title_text, title_subset = parsed[1]
+            preamble, preamble_subset = parsed[2]
+            connector, connector_subset = parsed[3]
+            postscript, postscript_subset = parsed[4]
 
         prompt = (preamble + title_text + connector + artist_text + postscript)
 
@@ -734,9 +1312,11 @@ class Pycasso:
         postscript_subset = ""
 
         if self.config.use_blocks:
-            title_text, title_subset = self.parse_blocks_nested(title_text)
-            preamble, preamble_subset = self.parse_blocks_nested(preamble)
-            postscript, postscript_subset = self.parse_blocks_nested(postscript)
+            # All parts of the prompt are parsed together so their blocks are processed at the same time
+            parsed = self.parse_blocks_many([title_text, preamble, postscript])
+            title_text, title_subset = parsed[0]
+            preamble, preamble_subset = parsed[1]
+            postscript, postscript_subset = parsed[2]
 
         prompt = preamble + title_text + postscript
 
@@ -763,7 +1343,7 @@ class Pycasso:
         image.save(save_path, pnginfo=metadata)
         return
 
-    def get_random_provider_mode(self):
+    def get_random_provider_mode(self, exclude=None):
         provider_types = [
             ProvidersConst.EXTERNAL.value,
             ProvidersConst.HISTORIC.value,
@@ -780,6 +1360,19 @@ class Pycasso:
             self.config.automatic_amount
         )
 
+        if exclude is not None:
+            provider_weights = tuple(0 if provider_type in exclude else weight
+                                     for provider_type, weight in zip(provider_types, provider_weights))
+
+        # Skip providers that have failed too often recently, unless that leaves nothing to choose from
+        if self.health is not None:
+            available_weights = tuple(weight if self.health.is_available(provider_type) else 0
+                                      for provider_type, weight in zip(provider_types, provider_weights))
+            if sum(available_weights) > 0:
+                provider_weights = available_weights
+            elif sum(provider_weights) > 0:
+                logging.warning("All available providers have failed recently. Trying them anyway.")
+
         # If no weights provided, return test provider
         total_amounts = 0
         for i in provider_weights:
@@ -821,27 +1414,28 @@ class Pycasso:
                           resize_text=ConfigConst.TEXT_RESIZE_TEXT.value,
                           resize_ratio=ConfigConst.TEXT_RESIZE_RATIO.value, crop_left=0, crop_right=0):
 
-        # Reduce font size based on length and ratio
-        if resize_text:
-            if resize_ratio > 0:
-                reduction = (len(title_text)/resize_ratio)
-            old_title_size = title_size
-            title_size -= reduction
-            title_size = int(max(title_size, title_min_size))
+        font_exists = os.path.exists(font_file)
+        wrapped_text = None
+        if wrap_text:
+            wrapped_text = textwrap.wrap(title_text, max_chars)
 
-            # Dynamically increase max_chars by old title
-            max_chars = int(max_chars*(old_title_size/title_size))
+        # Shrink title to the largest size that fits the width of the display in as many lines as wrapping allows
+        if resize_text and font_exists and title_text:
+            max_lines = max(len(wrapped_text), 1) if wrap_text else 1
+            title_size, lines = ImageFunctions.fit_text(title_text, font_file, epd_width - padding * 2, max_lines,
+                                                        title_size, min(title_min_size, title_size), wrap_text)
+            if wrap_text:
+                wrapped_text = lines
 
-        if not os.path.exists(font_file):
+        if not font_exists:
             warnings.warn("Font file path does not exist: '" + font_file + "'. Setting default font.")
             title_font = ImageFont.load_default()
             artist_font = ImageFont.load_default()
         else:
-            title_font = ImageFont.truetype(font_file, title_size)
-            artist_font = ImageFont.truetype(font_file, artist_size)
+            title_font = ImageFunctions.get_font(font_file, title_size)
+            artist_font = ImageFunctions.get_font(font_file, artist_size)
 
         if wrap_text:
-            wrapped_text = textwrap.wrap(title_text, max_chars)
             title_text = ""
             title_location -= title_size  # prep for loop below
             for line in wrapped_text:
@@ -865,7 +1459,7 @@ class Pycasso:
                 box_to_edge = True
                 title_box = [0, image_height - title_location, epd_width, image_height]
             else:
-                title_box = draw.textbbox((epd_width / 2, image_height - title_location), title_text, font=artist_font,
+                title_box = draw.textbbox((epd_width / 2, image_height - title_location), title_text, font=title_font,
                                           anchor="mb")
             title_proceed = True
 
@@ -897,79 +1491,260 @@ class Pycasso:
                               fill=0)
         return draw
 
-    def get_image(self):
-        provider_type = self.get_random_provider_mode()
-
+    def load_provider_image(self, provider_type, prompt="", title_text="", artist_text=""):
+        # Only reads state, so it can be run for several providers at once when racing
         if provider_type == ProvidersConst.EXTERNAL.value:
             # External image load
-            mode_list = self.load_external_image(self.config.external_image_location, self.width, self.height,
-                                                 self.config.preamble_regex, self.config.artist_regex,
-                                                 self.config.remove_text, self.config.parse_file_text,
-                                                 self.config.image_format, self.config.resize_external)
-            self.image_base, self.title_text, self.artist_text = mode_list
+            return self.load_external_image(self.config.external_image_location, self.width, self.height,
+                                            self.config.preamble_regex, self.config.artist_regex,
+                                            self.config.remove_text, self.config.parse_file_text,
+                                            self.config.image_format, self.config.resize_external,
+                                            self.external_cache, self.catalog)
 
         elif provider_type == ProvidersConst.HISTORIC.value:
             # Historic image previously saved
-            mode_list = self.load_historic_image(self.config.generated_image_location, self.config.image_format)
-            self.image_base, self.title_text, self.artist_text = mode_list
-
+            return self.load_historic_image(self.config.generated_image_location, self.config.image_format,
+                                            self.width, self.height, self.catalog)
+
+        # Pick between providers
+        if provider_type == ProvidersConst.TEST.value and self.config.test_enabled is True:
+            # Test run
+            logging.info(
+                "Running test mode as no other provider selected due to config or failures. Configure providers in "
+                "'.config' to enable your preferred functionality. Set 'test_enabled = False' to prevent test mode "
+                "from ever running again."
+            )
+            return self.load_test_image(self.width, self.height, title_text, artist_text)
+
+        elif provider_type == ProvidersConst.STABLE.value:
+            # Stable Diffusion
+            image_base = self.load_stability_image(prompt, self.width, self.height,
+                                                   stability_key=self.stability_key,
+                                                   creds_mode=self.config.use_keychain,
+                                                   creds_path=self.config.credential_path,
+                                                   stability_host=self.config.stable_host,
+                                                   aspect_ratio=self.config.aspect_ratio,
+                                                   output_format=self.get_stability_format(),
+                                                   provider=self.get_provider(provider_type))
+
+        elif provider_type == ProvidersConst.DALLE.value:
+            # Dalle
+            image_base = self.load_dalle_image(prompt, self.width, self.height,
+                                               infill=self.config.infill,
+                                               infill_percent=self.config.infill_percent,
+                                               dalle_key=self.dalle_key, creds_mode=self.config.use_keychain,
+                                               creds_path=self.config.credential_path,
+                                               provider=self.get_provider(provider_type))
+
+        elif provider_type == ProvidersConst.AUTOMATIC.value:
+            # Automatic
+            image_base = self.load_automatic_image(prompt, self.width, self.height,
+                                                   host=self.config.automatic_host,
+                                                   port=self.config.automatic_port,
+                                                   provider=self.get_provider(provider_type))
         else:
-            # Build prompt, get metadata
-            self.prompt, self.metadata, self.artist_text, self.title_text = \
-                self.prep_prompt_text(self.config.prompt_mode)
-            logging.info(f"Requesting \'{self.prompt}\'")
-
-            # Pick between providers
-            if provider_type == ProvidersConst.TEST.value and self.config.test_enabled is True:
-                # Test run
-                logging.info(
-                    "Running test mode as no other provider selected due to config or failures. Configure providers in "
-                    "'.config' to enable your preferred functionality. Set 'test_enabled = False' to prevent test mode "
-                    "from ever running again."
-                )
-                self.image_base, self.title_text, self.artist_text = self.load_test_image(self.width, self.height,
-                                                                                          self.title_text,
-                                                                                          self.artist_text)
-                self.config.save_image = False
-
-            elif provider_type == ProvidersConst.STABLE.value:
-                # Stable Diffusion
-                self.image_base = self.load_stability_image(self.prompt, self.width, self.height,
-                                                            stability_key=self.stability_key,
-                                                            creds_mode=self.config.use_keychain,
-                                                            creds_path=self.config.credential_path,
-                                                            stability_host=self.config.stable_host,
-                                                            aspect_ratio=self.config.aspect_ratio)
-
-            elif provider_type == ProvidersConst.DALLE.value:
-                # Dalle
-                self.image_base = self.load_dalle_image(self.prompt, self.width, self.height,
-                                                        infill=self.config.infill,
-                                                        infill_percent=self.config.infill_percent,
-                                                        dalle_key=self.dalle_key, creds_mode=self.config.use_keychain,
-                                                        creds_path=self.config.credential_path)
-
-            elif provider_type == ProvidersConst.AUTOMATIC.value:
-                # Automatic
-                self.image_base = self.load_automatic_image(self.prompt, self.width, self.height,
-                                                            host=self.config.automatic_host,
-                                                            port=self.config.automatic_port)
-            else:
-                # Invalid provider
-                warnings.warn(f"Invalid provider option chosen: '{provider_type}'")
-                exit()
+            # Invalid provider
+            warnings.warn(f"Invalid provider option chosen: '{provider_type}'")
+            exit()
 
-            # Handle if image failed to load
-            if self.image_base is None:
-                logging.warning(f"Image failed to load for provider '{provider_type}'. Please check providers.")
-                return None, provider_type
+        return image_base, title_text, artist_text
 
-            if self.config.save_image:
-                self.save_image(self.prompt, self.image_base, self.metadata, self.config.generated_image_location,
-                                save_date=self.config.save_date)
+    def get_image(self):
+        provider_type = self.get_random_provider_mode()
+
+        if provider_type in ProvidersConst.FILE_MODES.value:
+            start = time.perf_counter()
+            self.image_base, self.title_text, self.artist_text = self.load_provider_image(provider_type)
+            self.record_provider_health(provider_type, self.image_base is not None, time.perf_counter() - start)
+            return self.image_base, provider_type
+
+        # Build prompt, get metadata
+        self.prompt, self.metadata, self.artist_text, self.title_text = \
+            self.prep_prompt_text(self.config.prompt_mode)
+        logging.info(f"Requesting \'{self.prompt}\'")
+
+        # A prompt already generated with the same settings is shown again without calling the provider
+        cached = self.load_cached_response(provider_type)
+        if cached is not None:
+            self.image_base = cached
+            return self.image_base, provider_type
+
+        start = time.perf_counter()
+        mode_list = self.load_provider_image(provider_type, self.prompt, self.title_text, self.artist_text)
+        self.image_base, self.title_text, self.artist_text = mode_list
+        self.record_provider_health(provider_type, self.image_base is not None, time.perf_counter() - start)
+        if provider_type == ProvidersConst.TEST.value:
+            self.config.save_image = False
+
+        # Handle if image failed to load
+        if self.image_base is None:
+            logging.warning(f"Image failed to load for provider '{provider_type}'. Please check providers.")
+            return None, provider_type
+
+        self.cache_response(provider_type, self.image_base)
+
+        if self.config.save_image:
+            with self.trace.phase(TraceConst.SAVE_IMAGE.value):
+                self.save_image(self.prompt, self.image_base, self.metadata,
+                                self.config.generated_image_location, save_date=self.config.save_date)
 
         return self.image_base, provider_type
 
+    def race_provider(self, provider_type, results, race):
+        # Runs in its own thread, always reports back so the race never waits on a crashed provider
+        image_base, title_text, artist_text = None, self.title_text, self.artist_text
+        # Kept from the start of the race, in case the image arrives after the next run has begun
+        info = self.get_frame_info(provider_type)
+        prompt = info[PropertiesConst.PROMPT.value]
+        metadata = self.metadata
+        start = time.perf_counter()
+        try:
+            image_base, title_text, artist_text = self.load_provider_image(provider_type, prompt, title_text,
+                                                                           artist_text)
+        except BaseException as e:
+            logging.error(e)
+        self.record_provider_health(provider_type, image_base is not None, time.perf_counter() - start)
+
+        with self.race_lock:
+            if not race["over"]:
+                results.put((provider_type, image_base, title_text, artist_text))
+                return
+
+        if image_base is not None:
+            logging.info(f"Provider {provider_type} finished after the race was won, queueing its image")
+            info[PropertiesConst.TITLE.value] = title_text
+            info[PropertiesConst.ARTIST.value] = artist_text
+            self.queue_late_frame(provider_type, image_base, info, metadata)
+        return
+
+    def queue_late_frame(self, provider_type, image_base, info, metadata=None):
+        image_crop = ImageFunctions.get_crop_size(image_base.width, image_base.height, self.width, self.height)
+        info[FrameQueueConst.CROP_LEFT.value] = image_crop[0]
+        info[FrameQueueConst.CROP_RIGHT.value] = image_crop[2]
+        frame = ImageFunctions.crop_frame(image_base, image_crop)
+
+        if self.config.save_image and provider_type not in ProvidersConst.FILE_MODES.value and metadata is not None:
+            self.save_image(info[PropertiesConst.PROMPT.value], image_base, metadata,
+                            self.config.generated_image_location, save_date=self.config.save_date)
+
+        frame_queue = FrameQueue(self.config.queue_location, self.config.queue_size)
+        return frame_queue.push(frame, info)
+
+    def wait_racers(self):
+        with self.race_lock:
+            racers = self.racers
+            self.racers = []
+        # Providers have their own timeouts, so this can't wait forever
+        for thread in racers:
+            thread.join()
+        return
+
+    def get_hedge_provider_mode(self, started, paid):
+        exclude = list(started)
+        if paid >= self.config.race_spend_cap:
+            exclude += ProvidersConst.PAID.value
+        provider_type = self.get_random_provider_mode(exclude)
+        if provider_type == ProvidersConst.TEST.value:
+            return None
+        return provider_type
+
+    def get_image_racing(self):
+        provider_type = self.get_random_provider_mode()
+        if provider_type == ProvidersConst.TEST.value:
+            return self.get_image()
+
+        results = queue.Queue()
+        race = {"over": False}
+        started = []
+        paid = 0
+        running = 0
+        provider = provider_type
+        cached = None
+
+        while True:
+            if provider is not None:
+                if provider in ProvidersConst.PAID.value and paid >= self.config.race_spend_cap:
+                    logging.info(f"Spend cap of {self.config.race_spend_cap} reached, not starting provider {provider}")
+                else:
+                    if provider not in ProvidersConst.FILE_MODES.value and self.metadata is None:
+                        # Build prompt once and share it with every generator in the race
+                        self.prep_prompt_text(self.config.prompt_mode)
+                        logging.info(f"Requesting \'{self.prompt}\'")
+
+                    # A cached image wins straight away
+                    cached = self.load_cached_response(provider)
+                    if cached is not None:
+                        provider_type, image_base, title_text, artist_text = \
+                            provider, cached, self.title_text, self.artist_text
+                        break
+
+                    logging.info(f"Starting provider {provider} in race")
+                    # Daemon threads so a slow loser never holds up pycasso exiting after the winner is shown
+                    thread = threading.Thread(target=self.race_provider, args=(provider, results, race),
+                                              daemon=True)
+                    thread.start()
+                    with self.race_lock:
+                        self.racers.append(thread)
+                    started.append(provider)
+                    running += 1
+                    if provider in ProvidersConst.PAID.value:
+                        paid += 1
+
+            hedge = self.get_hedge_provider_mode(started, paid)
+            if running == 0:
+                if hedge is None:
+                    logging.warning("No providers left to race.")
+                    return None, provider_type
+                provider = hedge
+                continue
+
+            try:
+                # Only wait for the hedge delay if there is another provider to start
+                timeout = self.config.hedge_delay if hedge is not None else None
+                provider_type, image_base, title_text, artist_text = results.get(timeout=timeout)
+            except queue.Empty:
+                logging.info(f"No image after {self.config.hedge_delay} seconds, starting provider {hedge}")
+                provider = hedge
+                continue
+
+            running -= 1
+            if image_base is not None:
+                break
+
+            # Failed providers are replaced straight away
+            logging.warning(f"Image failed to load on provider '{provider_type}' while racing.")
+            self.remove_provider_mode(provider_type)
+            self.add_provider_fail_icon(provider_type)
+            provider = hedge
+
+        # Anything that finishes from here on is queued by its own thread, anything already finished is queued here
+        with self.race_lock:
+            race["over"] = True
+            self.racers = [thread for thread in self.racers if thread.is_alive()]
+        while not results.empty():
+            late_type, late_image, late_title, late_artist = results.get()
+            if late_image is not None:
+                info = self.get_frame_info(late_type)
+                info[PropertiesConst.TITLE.value] = late_title
+                info[PropertiesConst.ARTIST.value] = late_artist
+                self.queue_late_frame(late_type, late_image, info, self.metadata)
+
+        logging.info(f"Provider {provider_type} won the race")
+        self.image_base = image_base
+        self.title_text = title_text
+        self.artist_text = artist_text
+
+        if cached is None:
+            self.cache_response(provider_type, self.image_base)
+
+        if cached is None and provider_type not in ProvidersConst.FILE_MODES.value and self.config.save_image:
+            with self.trace.phase(TraceConst.SAVE_IMAGE.value):
+                self.save_image(self.prompt, self.image_base, self.metadata,
+                                self.config.generated_image_location, save_date=self.config.save_date)
+
+        self.add_provider_icon(provider_type)
+        return self.image_base, provider_type
+
     def get_image_fallback_modes(self):
         error = True
         while error:
@@ -1066,46 +1841,21 @@ class Pycasso:
             mastodon.post_image(self.image_base, self.full_text)
         return
 
-    def run(self):
-        logging.info("pycasso has begun")
-
-        try:
-            self.epd = displayfactory.load_display_driver(self.config.display_type, self.config_dict)
-            # If display is mock, apply height and width to it
-            if self.config.display_type == ConfigConst.DISPLAY_TYPE.value:
-                self.epd.width = self.config.test_epd_width
-                self.epd.height = self.config.test_epd_height
-
-            # Set width and height for pycasso program
-            self.width, self.height = self.set_rotate(self.epd.width, self.epd.height, self.config.image_rotate)
-
-        except EPDNotFoundError:
-            logging.error(f"Couldn't find {self.config.display_type}")
-            exit()
-
-        except KeyboardInterrupt:
-            logging.info("ctrl + c:")
-            exit()
-
-        except BaseException as e:
-            logging.error(e)
-            exit()
-
-        if self.args.norun:
-            logging.info("--norun option used, closing pycasso without running")
-            exit()
-
-        try:
-            if self.config.provider_fallback:
+    def fetch_image(self):
+        with self.trace.phase(TraceConst.FETCH_IMAGE.value):
+            if self.config.race_providers:
+                self.image_base, provider = self.get_image_racing()
+                if self.image_base is None and self.config.provider_fallback:
+                    # Every raced provider failed, fall back to whatever is left, eg test mode
+                    self.image_base, provider = self.get_image_fallback_modes()
+            elif self.config.provider_fallback:
                 self.image_base, provider = self.get_image_fallback_modes()
             else:
                 self.image_base, provider = self.get_image()
+        return self.image_base, provider
 
-            if self.image_base is None:
-                logging.error("Image failed to load and there is no fallback. Please check providers or folders. "
-                              "Exiting pycasso.")
-                exit()
-
+    def crop_image(self):
+        with self.trace.phase(TraceConst.CROP_IMAGE.value):
             # Make sure image is correct size and centered after thumbnail set
             # Define locations and crop settings
             image_crop = ImageFunctions.get_crop_size(self.image_base.width, self.image_base.height, self.width,
@@ -1114,18 +1864,22 @@ class Pycasso:
             crop_right = image_crop[2]
 
             # Crop and prepare image
-            self.image_base = self.image_base.crop(image_crop)
+            self.image_base = ImageFunctions.crop_frame(self.image_base, image_crop)
 
-            if self.image_base.mode not in ImageConst.SUPPORTED_MODES.value:
-                self.image_base = self.image_base.convert(ImageConst.CONVERT_MODE.value)
+        return crop_left, crop_right
 
+    def decorate_image(self, crop_left=0, crop_right=0):
+        # Icons and text are drawn straight onto the frame, unless the plain image is still needed for posting
+        self.image_display = self.image_base
+        if len(self.posters) > 0:
             self.image_display = self.image_base.copy()
 
-            # Show battery icon if relevant
-            if self.config.show_battery_icon:
-                self.add_battery_icon(self.charge_level)
+        # Show battery icon if relevant
+        if self.config.show_battery_icon:
+            self.add_battery_icon(self.charge_level)
 
-            # Draw icons
+        # Draw icons
+        with self.trace.phase(TraceConst.DRAW_ICONS.value):
             self.image_display = ImageFunctions.draw_icons(self.image_display, self.icons,
                                                            icon_path=self.config.icon_path,
                                                            icon_color=self.config.icon_color,
@@ -1133,21 +1887,23 @@ class Pycasso:
                                                            icon_padding=self.config.icon_padding,
                                                            icon_size=self.config.icon_size,
                                                            icon_gap=self.config.icon_gap,
-                                                           icon_opacity=self.config.icon_opacity)
+                                                           icon_opacity=self.config.icon_opacity,
+                                                           cache=self.icon_cache)
 
-            draw = ImageDraw.Draw(self.image_display, ImageConst.DRAW_MODE.value)
+        draw = ImageDraw.Draw(self.image_display, ImageConst.DRAW_MODE.value)
 
-            # Draw status shape if provided
-            if self.icon_shape is not None:
-                draw = ImageFunctions.add_status_icon(draw, self.icon_shape, self.config.icon_padding,
-                                                      self.config.icon_size, self.config.icon_width,
-                                                      self.config.icon_opacity)
+        # Draw status shape if provided
+        if self.icon_shape is not None:
+            draw = ImageFunctions.add_status_icon(draw, self.icon_shape, self.config.icon_padding,
+                                                  self.config.icon_size, self.config.icon_width,
+                                                  self.config.icon_opacity)
 
-            # Draw text(s) if necessary
-            if self.config.add_text:
-                if self.config.override_text:
-                    self.override_text(self.config.override_path)
+        # Draw text(s) if necessary
+        if self.config.add_text:
+            if self.config.override_text:
+                self.override_text(self.config.override_path)
 
+            with self.trace.phase(TraceConst.ADD_TEXT.value):
                 self.add_text_to_image(draw=draw, font_file=self.config.font_file,
                                        image_height=self.image_display.height, epd_width=self.width,
                                        title_text=self.title_text, artist_text=self.artist_text,
@@ -1159,23 +1915,364 @@ class Pycasso:
                                        max_chars=self.config.wrap_max, line_ratio=self.config.line_ratio,
                                        resize_text=self.config.resize_text, resize_ratio=self.config.resize_ratio,
                                        crop_left=crop_left, crop_right=crop_right)
+        return self.image_display
+
+    def load_queued_frame(self):
+        frame_queue = FrameQueue(self.config.queue_location, self.config.queue_size)
+        with self.trace.phase(TraceConst.LOAD_QUEUED_FRAME.value):
+            image, info = frame_queue.pop(self.width, self.height)
+        if image is None:
+            return None, None, 0, 0
+
+        self.image_base = image
+        provider, crop_left, crop_right = self.set_frame_info(info)
+        self.add_provider_icon(provider)
+        return self.image_base, provider, crop_left, crop_right
+
+    def get_frame_info(self, provider, crop_left=0, crop_right=0):
+        return {
+            PropertiesConst.TITLE.value: self.title_text,
+            PropertiesConst.ARTIST.value: self.artist_text,
+            PropertiesConst.PROMPT.value: self.prompt,
+            FrameQueueConst.FULL_TEXT.value: self.full_text,
+            FrameQueueConst.PROVIDER.value: provider,
+            FrameQueueConst.CROP_LEFT.value: crop_left,
+            FrameQueueConst.CROP_RIGHT.value: crop_right
+        }
+
+    def set_frame_info(self, info):
+        self.title_text = info.get(PropertiesConst.TITLE.value, "")
+        self.artist_text = info.get(PropertiesConst.ARTIST.value, "")
+        self.prompt = info.get(PropertiesConst.PROMPT.value, "")
+        self.full_text = info.get(FrameQueueConst.FULL_TEXT.value, "")
 
+        try:
+            provider = int(info.get(FrameQueueConst.PROVIDER.value, ProvidersConst.TEST.value))
+            crop_left = float(info.get(FrameQueueConst.CROP_LEFT.value, 0))
+            crop_right = float(info.get(FrameQueueConst.CROP_RIGHT.value, 0))
+        except ValueError as e:
+            logging.warning(e)
+            logging.warning("Frame has invalid metadata. Using defaults.")
+            provider = ProvidersConst.TEST.value
+            crop_left = 0
+            crop_right = 0
+
+        return provider, crop_left, crop_right
+
+    def save_base_frame(self, provider, crop_left=0, crop_right=0):
+        if not self.config.save_base_frame:
+            return False
+
+        path = self.config.base_frame_file
+        try:
+            with self.trace.phase(TraceConst.SAVE_BASE_FRAME.value):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                metadata = PngImagePlugin.PngInfo()
+                for key, value in self.get_frame_info(provider, crop_left, crop_right).items():
+                    metadata.add_text(key, "" if value is None else str(value))
+                temp_path = f"{path}{RefreshConst.TEMP_SUFFIX.value}"
+                # Saved every run, so favour speed over file size
+                self.image_base.save(temp_path, format=RefreshConst.FORMAT.value, pnginfo=metadata, compress_level=1)
+                os.replace(temp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to save base frame to '{path}'")
+            return False
+
+        return True
+
+    def load_base_frame(self):
+        path = self.config.base_frame_file
+        if not os.path.exists(path):
+            return None, None, 0, 0
+
+        try:
+            with self.trace.phase(TraceConst.LOAD_BASE_FRAME.value):
+                with Image.open(path) as frame:
+                    frame.load()
+                    info = dict(frame.text)
+                    image = frame.convert(ImageConst.CONVERT_MODE.value)
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to read base frame '{path}'")
+            return None, None, 0, 0
+
+        if image.size != (self.width, self.height):
+            logging.warning(f"Base frame is {image.size[0]}x{image.size[1]} but the display is "
+                            f"{self.width}x{self.height}. Not using it.")
+            return None, None, 0, 0
+
+        self.image_base = image
+        provider, crop_left, crop_right = self.set_frame_info(info)
+        self.add_provider_icon(provider)
+        return self.image_base, provider, crop_left, crop_right
+
+    def prefetch(self, count=None):
+        logging.info("pycasso prefetch has begun")
+        self.load_display()
+
+        frame_queue = FrameQueue(self.config.queue_location, self.config.queue_size)
+        if count is None:
+            count = self.config.queue_size
+
+        config = self.config
+        queued = 0
+        while queued < count and not frame_queue.is_full():
+            self.reset_run_state()
+            # Fetch with a copy of config so providers removed after a failure are tried again for the next frame
+            self.config = copy.copy(config)
+            try:
+                self.image_base, provider = self.fetch_image()
+            finally:
+                self.config = config
+
+            if self.image_base is None or provider == ProvidersConst.TEST.value:
+                logging.warning("No provider available to prefetch from. Stopping prefetch.")
+                break
+
+            crop_left, crop_right = self.crop_image()
+            if not frame_queue.push(self.image_base, self.get_frame_info(provider, crop_left, crop_right)):
+                break
+            queued += 1
+
+        self.reset_run_state()
+        logging.info(f"Prefetched {queued} frame(s), {frame_queue.size()} in queue")
+        return queued
+
+    def get_quantize_palette(self):
+        if self.config.palette_filter is not None:
+            return self.config.palette_filter
+        return QuantizeConst.PALETTES.value.get(getattr(self.epd, "mode", None))
+
+    def quantize_image(self):
+        if self.config.quantize_mode == QuantizeConst.NONE.value:
+            return self.image_display
+
+        palette = self.get_quantize_palette()
+        if palette is None:
+            logging.warning(f"No palette known for display mode '{getattr(self.epd, 'mode', None)}'. Set "
+                            f"palette_filter in .config to quantize. Leaving it to the display driver.")
+            return self.image_display
+
+        with self.trace.phase(TraceConst.QUANTIZE.value):
+            self.image_display = ImageFunctions.quantize(self.image_display, palette, self.config.quantize_mode)
+        return self.image_display
+
+    def store_frame(self):
+        store = FrameStore(self.config.frame_store_location, self.config.frame_store_size)
+        with self.trace.phase(TraceConst.STORE_FRAME.value):
+            return store.push(self.image_display)
+
+    def show_stored_frame(self):
+        store = FrameStore(self.config.frame_store_location, self.config.frame_store_size)
+        with self.trace.phase(TraceConst.LOAD_STORED_FRAME.value):
+            image = store.get_random(self.width, self.height)
+        if image is None:
+            return False
+
+        logging.warning("No new image available. Showing a recently shown frame instead.")
+        self.image_display = image
+        with self.trace.phase(TraceConst.DISPLAY.value):
+            self.refresh_display()
+        return True
+
+    def refresh_display(self):
+        if not self.config.partial_refresh:
             self.display_image_on_epd(self.image_display, self.epd, self.config.image_rotate)
+            return RefreshConst.FULL.value
+
+        # Compare in panel orientation so a partial refresh box can be handed straight to the driver
+        frame = ImageFunctions.rotate_frame(self.image_display, self.config.image_rotate)
+        previous, partial_count = self.load_last_frame(self.config.last_frame_file)
+        refresh, box = self.get_refresh(frame, previous, partial_count, self.supports_partial_refresh(self.epd),
+                                        self.config.partial_max, self.config.full_refresh_every)
+
+        if refresh == RefreshConst.SKIP.value:
+            logging.info("Display already shows this frame, skipping refresh")
+            return refresh
+
+        self.display_image_on_epd(frame, self.epd, 0, box)
+        partial_count = partial_count + 1 if refresh == RefreshConst.PARTIAL.value else 0
+        self.save_last_frame(self.config.last_frame_file, frame, partial_count)
+        return refresh
+
+    def run(self):
+        logging.info("pycasso has begun")
+
+        try:
+            with self.trace.phase(TraceConst.LOAD_DISPLAY.value):
+                self.load_display()
+
+        except omni_epd.EPDNotFoundError:
+            logging.error(f"Couldn't find {self.config.display_type}")
+            exit()
+
+        except KeyboardInterrupt:
+            logging.info("ctrl + c:")
+            if self.daemon:
+                raise
+            exit()
+
+        except BaseException as e:
+            logging.error(e)
+            exit()
+
+        if self.args.norun:
+            logging.info("--norun option used, closing pycasso without running")
+            exit()
+
+        try:
+            # Use a frame prepared ahead of time if there is one, otherwise fetch a new image
+            self.image_base, provider, crop_left, crop_right = self.load_queued_frame()
+
+            if self.image_base is None:
+                self.image_base, provider = self.fetch_image()
+
+                # A recently shown frame is better than nothing or the test image when providers fail
+                if self.image_base is None or provider == ProvidersConst.TEST.value:
+                    if self.show_stored_frame():
+                        return
+
+                if self.image_base is None:
+                    logging.error("Image failed to load and there is no fallback. Please check providers or folders. "
+                                  "Exiting pycasso.")
+                    exit()
+
+                crop_left, crop_right = self.crop_image()
+
+            # Keep the plain frame so --status-only can redraw icons on it later
+            self.save_base_frame(provider, crop_left, crop_right)
+            self.decorate_image(crop_left, crop_right)
+            self.quantize_image()
+
+            with self.trace.phase(TraceConst.DISPLAY.value):
+                self.refresh_display()
+
+            if provider != ProvidersConst.TEST.value:
+                self.store_frame()
 
             # Post image if necessary
             if provider != ProvidersConst.TEST.value:
-                self.post_image()
+                with self.trace.phase(TraceConst.POST_IMAGE.value):
+                    self.post_image()
 
-            logging.shutdown()
+            if not self.args.daemon:
+                # Images still being made by providers that lost a race would be lost when pycasso closes
+                self.wait_racers()
+                logging.shutdown()
 
-        except EPDNotFoundError:
+        except omni_epd.EPDNotFoundError:
             warnings.warn(f"Couldn't find {self.config.display_type}")
             exit()
 
         except IOError as e:
             logging.info(e)
 
+        except KeyboardInterrupt:
+            logging.info("ctrl + c:")
+            self.epd.close()
+            if self.daemon:
+                raise
+            exit()
+
+        finally:
+            # Record the run even if it failed part way through
+            self.trace.write()
+
+    def run_status(self):
+        logging.info("pycasso status refresh has begun")
+
+        try:
+            with self.trace.phase(TraceConst.LOAD_DISPLAY.value):
+                self.load_display()
+
+        except omni_epd.EPDNotFoundError:
+            logging.error(f"Couldn't find {self.config.display_type}")
+            exit()
+
+        except KeyboardInterrupt:
+            logging.info("ctrl + c:")
+            exit()
+
+        except BaseException as e:
+            logging.error(e)
+            exit()
+
+        try:
+            self.image_base, provider, crop_left, crop_right = self.load_base_frame()
+            if self.image_base is None:
+                logging.warning("No base frame saved by an earlier run. Run pycasso without --status-only first.")
+                return False
+
+            self.decorate_image(crop_left, crop_right)
+            self.quantize_image()
+
+            with self.trace.phase(TraceConst.DISPLAY.value):
+                self.refresh_display()
+
+        except IOError as e:
+            logging.info(e)
+            return False
+
         except KeyboardInterrupt:
             logging.info("ctrl + c:")
             self.epd.close()
             exit()
+
+        finally:
+            self.trace.write()
+
+        return True
+
+    def run_daemon(self, max_runs=0):
+        logging.info("pycasso daemon has begun")
+        scheduler = Scheduler(self.config.daemon_interval, self.config.daemon_schedule)
+        runs = 0
+        self.daemon = True
+
+        while True:
+            try:
+                self.run()
+            except KeyboardInterrupt:
+                logging.info("ctrl + c:")
+                break
+            except SystemExit:
+                # run() exits on failure when running once, keep the daemon alive for the next refresh instead
+                logging.warning("pycasso refresh did not complete. Waiting for next scheduled refresh.")
+            except Exception as e:
+                # One unexpected error shouldn't stop every refresh after it
+                logging.error(e)
+                logging.warning("pycasso refresh failed. Waiting for next scheduled refresh.")
+
+            if self.config.fill_queue_in_daemon:
+                try:
+                    self.prefetch()
+                except KeyboardInterrupt:
+                    logging.info("ctrl + c:")
+                    break
+                except SystemExit:
+                    logging.warning("pycasso prefetch did not complete.")
+                except Exception as e:
+                    logging.error(e)
+                    logging.warning("pycasso prefetch did not complete.")
+
+            runs += 1
+            if 0 < max_runs <= runs:
+                break
+
+            wait = scheduler.seconds_until_next_run()
+            logging.info(f"Next refresh in {int(wait)} seconds")
+            try:
+                time.sleep(wait)
+            except KeyboardInterrupt:
+                logging.info("ctrl + c:")
+                break
+
+            # Start the next refresh with a clean slate but warm resources
+            self.reset_run_state()
+            self.refresh_config()
+            scheduler = Scheduler(self.config.daemon_interval, self.config.daemon_schedule)
+
+        self.daemon = False
+        logging.shutdown()
+        return
@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Records how long each phase of a pycasso run takes and what resources it uses
+
+import contextlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy
+
+from piblo.constants import TraceConst
+
+# resource is only available on unix, peak memory is left out of traces elsewhere
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class RunTrace:
+    """
+    A class used to time the phases of a single pycasso run and append the results to a trace file as one JSON line.
+
+    Attributes
+    ----------
+    path:string
+        file path of trace file to append to. Nothing is written if not set.
+
+    Methods
+    -------
+    phase(name)
+        Context manager that records wall time, CPU time, network bytes and the rise in peak memory of the code run
+        inside it as phase 'name'. Peak memory itself is only recorded for the whole run.
+
+    to_dict()
+        Returns the run and all recorded phases as a dictionary.
+
+    write()
+        Appends the run to the trace file as one line of JSON. Returns True if written. A trace file larger than
+        TraceConst.MAX_SIZE kilobytes is first moved aside to the same name ending in TraceConst.OLD_SUFFIX.
+
+    get_network_bytes()
+        Returns total bytes received and sent on all network interfaces except loopback, or None if not available.
+
+    get_peak_rss()
+        Returns peak resident memory of this process in kilobytes, or None if not available.
+
+    read_traces(path, include_old)
+        Reads all runs from trace file at 'path', oldest first. Runs moved aside to the file ending in
+        TraceConst.OLD_SUFFIX are read first if 'include_old' is set. Returns list of dictionaries.
+
+    summarise(traces, percentiles)
+        Works out 'percentiles' of each metric for each phase across list of runs 'traces'.
+        Returns dictionary of phase name to dictionary of metric name to list of values, plus run count.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.phases = []
+        self.started = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.start_bytes = self.get_network_bytes()
+        return
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        start_bytes = self.get_network_bytes()
+        start_peak = self.get_peak_rss()
+        try:
+            yield self
+        finally:
+            end_bytes = self.get_network_bytes()
+            transferred = None
+            if start_bytes is not None and end_bytes is not None:
+                transferred = end_bytes - start_bytes
+
+            # Peak memory never goes down, a phase that stays under the earlier peak rises by 0
+            end_peak = self.get_peak_rss()
+            peak_rise = None
+            if start_peak is not None and end_peak is not None:
+                peak_rise = end_peak - start_peak
+
+            self.phases.append({
+                TraceConst.NAME.value: name,
+                TraceConst.WALL.value: time.perf_counter() - start_wall,
+                TraceConst.CPU.value: time.process_time() - start_cpu,
+                TraceConst.BYTES.value: transferred,
+                TraceConst.PEAK_RSS_RISE.value: peak_rise
+            })
+
+    def to_dict(self):
+        end_bytes = self.get_network_bytes()
+        transferred = None
+        if self.start_bytes is not None and end_bytes is not None:
+            transferred = end_bytes - self.start_bytes
+
+        return {
+            TraceConst.STARTED.value: self.started.isoformat(timespec="seconds"),
+            TraceConst.WALL.value: time.perf_counter() - self.start_wall,
+            TraceConst.CPU.value: time.process_time() - self.start_cpu,
+            TraceConst.BYTES.value: transferred,
+            TraceConst.PEAK_RSS.value: self.get_peak_rss(),
+            TraceConst.PHASES.value: self.phases
+        }
+
+    def write(self):
+        if self.path is None or self.path == "":
+            return False
+
+        try:
+            # Only the latest runs are kept, so traces never fill the disk of a long running frame
+            if os.path.exists(self.path) and os.path.getsize(self.path) > TraceConst.MAX_SIZE.value * 1024:
+                os.replace(self.path, f"{self.path}{TraceConst.OLD_SUFFIX.value}")
+            with open(self.path, "a") as file:
+                file.write(json.dumps(self.to_dict()) + "\n")
+        except (IOError, OSError) as e:
+            logging.warning(e)
+            logging.warning(f"Unable to write run trace to '{self.path}'")
+            return False
+
+        return True
+
+    @staticmethod
+    def get_network_bytes(path=TraceConst.NET_DEV_PATH.value):
+        if not os.path.exists(path):
+            return None
+
+        total = 0
+        try:
+            with open(path, "r") as file:
+                # First two lines are headers, each line after is 'interface: rx_bytes ... tx_bytes ...'
+                for line in file.readlines()[2:]:
+                    interface, data = line.split(":", maxsplit=1)
+                    if interface.strip() == TraceConst.LOOPBACK.value:
+                        continue
+                    fields = data.split()
+                    total += int(fields[0]) + int(fields[8])
+        except (IOError, OSError, ValueError, IndexError) as e:
+            logging.debug(e)
+            return None
+
+        return total
+
+    @staticmethod
+    def get_peak_rss():
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    @staticmethod
+    def read_traces(path, include_old=True):
+        traces = []
+        old_path = f"{path}{TraceConst.OLD_SUFFIX.value}"
+        if include_old and os.path.exists(old_path):
+            traces = RunTrace.read_traces(old_path, include_old=False)
+
+        if not os.path.exists(path):
+            logging.warning(f"Trace file '{path}' does not exist")
+            return traces
+
+        with open(path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line == "":
+                    continue
+                try:
+                    traces.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logging.warning(f"Skipping invalid trace line: {e}")
+
+        return traces
+
+    @staticmethod
+    def summarise(traces, percentiles=TraceConst.PERCENTILES.value):
+        metrics = [TraceConst.WALL.value, TraceConst.CPU.value, TraceConst.BYTES.value, TraceConst.PEAK_RSS.value,
+                   TraceConst.PEAK_RSS_RISE.value]
+        values = {}
+
+        for trace in traces:
+            # The run as a whole is summarised alongside its phases
+            entries = [dict(trace, **{TraceConst.NAME.value: TraceConst.TOTAL.value})]
+            entries += trace.get(TraceConst.PHASES.value, [])
+
+            for entry in entries:
+                name = entry.get(TraceConst.NAME.value)
+                phase_values = values.setdefault(name, {metric: [] for metric in metrics})
+                for metric in metrics:
+                    if entry.get(metric) is not None:
+                        phase_values[metric].append(entry[metric])
+
+        summary = {}
+        for name, phase_values in values.items():
+            summary[name] = {TraceConst.COUNT.value: len(phase_values[TraceConst.WALL.value])}
+            for metric, metric_values in phase_values.items():
+                if len(metric_values) == 0:
+                    summary[name][metric] = None
+                else:
+                    summary[name][metric] = list(numpy.percentile(metric_values, percentiles))
+
+        return summary
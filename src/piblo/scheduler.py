@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Scheduler used to decide when a long-running pycasso process should refresh the display
+
+import logging
+from datetime import datetime, timedelta
+
+from piblo.constants import SchedulerConst
+
+
+class Scheduler:
+    """
+    A class used to work out when the next pycasso refresh should happen in daemon mode.
+
+    Attributes
+    ----------
+    interval:int
+        minutes between refreshes, used when no cron style schedule is provided
+
+    schedule:string
+        cron style schedule 'minute hour day month weekday', eg '0 * * * *' for every hour on the hour
+
+    Methods
+    -------
+    next_run(after)
+        Returns the datetime of the next refresh after datetime 'after' (default now).
+
+    seconds_until_next_run(after)
+        Returns the number of seconds from 'after' (default now) until the next refresh.
+
+    parse_field(field, minimum, maximum)
+        Parses a single cron field into a set of valid integers. Supports '*', 'a-b', 'a,b' and '/step'.
+
+    parse_schedule(schedule)
+        Parses a cron style schedule string into a list of sets (minutes, hours, days, months, weekdays).
+        Returns None if the schedule is invalid.
+    """
+
+    def __init__(self, interval=SchedulerConst.DEFAULT_INTERVAL.value, schedule=""):
+        self.interval = interval
+        self.schedule = schedule
+        self.fields = None
+
+        if schedule is not None and schedule.strip() != "":
+            self.fields = self.parse_schedule(schedule)
+            if self.fields is None:
+                logging.warning(f"Invalid schedule '{schedule}'. Falling back to an interval of {interval} minutes.")
+        return
+
+    def next_run(self, after=None):
+        if after is None:
+            after = datetime.now()
+
+        if self.fields is None:
+            return after + timedelta(minutes=max(self.interval, 0))
+
+        minutes, hours, days, months, weekdays = self.fields
+        any_day = len(days) == SchedulerConst.DAY_RANGE.value[1]
+        any_weekday = len(weekdays) == SchedulerConst.WEEKDAY_RANGE.value[1] + 1
+
+        # Start from the next whole minute
+        when = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = when + timedelta(days=SchedulerConst.SEARCH_DAYS.value)
+
+        while when < limit:
+            if when.month not in months:
+                # Jump to the start of next month
+                year = when.year + (1 if when.month == 12 else 0)
+                month = 1 if when.month == 12 else when.month + 1
+                when = when.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+
+            # Cron treats weekday as 0-6 starting on Sunday
+            weekday = (when.weekday() + 1) % 7
+            day_match = when.day in days
+            weekday_match = weekday in weekdays
+            if any_day or any_weekday:
+                matched = day_match and weekday_match
+            else:
+                matched = day_match or weekday_match
+
+            if not matched:
+                when = when.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+
+            if when.hour not in hours:
+                when = when.replace(minute=0) + timedelta(hours=1)
+                continue
+
+            if when.minute not in minutes:
+                when += timedelta(minutes=1)
+                continue
+
+            return when
+
+        logging.warning(f"No time found matching schedule '{self.schedule}'. Using interval of {self.interval} "
+                        f"minutes.")
+        return after + timedelta(minutes=max(self.interval, 0))
+
+    def seconds_until_next_run(self, after=None):
+        if after is None:
+            after = datetime.now()
+        return max((self.next_run(after) - after).total_seconds(), 0)
+
+    @staticmethod
+    def parse_field(field, minimum, maximum):
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", maxsplit=1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Invalid step '{step_text}'")
+
+            if part == "*":
+                start, end = minimum, maximum
+            elif "-" in part:
+                start_text, end_text = part.split("-", maxsplit=1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(part)
+                # 'a/n' means every n starting from a
+                end = maximum if step > 1 else start
+
+            if start < minimum or end > maximum or start > end:
+                raise ValueError(f"Value '{part}' out of range {minimum}-{maximum}")
+
+            values.update(range(start, end + 1, step))
+        return values
+
+    @staticmethod
+    def parse_schedule(schedule):
+        parts = schedule.split()
+        if len(parts) != 5:
+            logging.warning(f"Schedule '{schedule}' needs 5 fields: minute hour day month weekday")
+            return None
+
+        ranges = [SchedulerConst.MINUTE_RANGE.value, SchedulerConst.HOUR_RANGE.value, SchedulerConst.DAY_RANGE.value,
+                  SchedulerConst.MONTH_RANGE.value, (0, 7)]
+        try:
+            fields = [Scheduler.parse_field(part, low, high) for part, (low, high) in zip(parts, ranges)]
+        except ValueError as e:
+            logging.warning(e)
+            return None
+
+        # Both 0 and 7 mean Sunday
+        if 7 in fields[4]:
+            fields[4].discard(7)
+            fields[4].add(0)
+        return fields
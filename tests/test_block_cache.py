@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for block_cache.py
+
+import os
+import time
+
+from piblo.block_cache import BlockCache
+from piblo.constants import UnitTestConst
+
+
+def get_cache_path():
+    path = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                        UnitTestConst.BLOCK_CACHE_FILE.value)
+
+    # Cleanup file before
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+class Fetcher:
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        if len(self.texts) == 0:
+            return ""
+        return self.texts.pop(0)
+
+
+def test_get():
+    path = get_cache_path()
+    cache = BlockCache(path, ttl=1)
+    fetcher = Fetcher(["first", "second"])
+
+    assert cache.get("rss", fetcher.fetch) == "first"
+    assert cache.get("rss", fetcher.fetch) == "first"
+    assert fetcher.calls == 1
+
+    # Kept between runs
+    assert BlockCache(path, ttl=1).get("rss", fetcher.fetch) == "first"
+    assert fetcher.calls == 1
+
+    # Cleanup file after
+    os.remove(path)
+
+
+def test_get_stale():
+    path = get_cache_path()
+    cache = BlockCache(path, ttl=1)
+    fetcher = Fetcher(["first", "second"])
+    cache.get("rss", fetcher.fetch)
+
+    # Stale text is returned straight away and replaced in the background
+    stale = time.time() + 120
+    assert cache.get("rss", fetcher.fetch, now=stale) == "first"
+    assert cache.wait(5)
+    assert cache.get("rss", fetcher.fetch) == "second"
+
+    # Failed fetches keep the stale text
+    assert cache.get("rss", fetcher.fetch, now=stale) == "second"
+    assert cache.wait(5)
+    assert cache.get("rss", fetcher.fetch) == "second"
+
+    # Cleanup file after
+    os.remove(path)
+
+
+def test_take():
+    path = get_cache_path()
+    cache = BlockCache(path, ttl=1, pool_size=3, throttle=0)
+    fetcher = Fetcher(["a", "b", "c", "d", "e"])
+
+    # Empty pool fetches straight away, then fills the pool in the background
+    assert cache.take("quote", fetcher.fetch) == "a"
+    assert cache.wait(5)
+    assert fetcher.calls == 4
+
+    assert cache.entries["quote"]["pool"] == ["b", "c", "d"]
+
+    # Newest first, and not topped up until half the pool is used
+    assert cache.take("quote", fetcher.fetch) == "d"
+    assert cache.wait(5)
+    assert fetcher.calls == 4
+    assert cache.take("quote", fetcher.fetch) == "c"
+    assert cache.wait(5)
+    assert cache.entries["quote"]["pool"] == ["b", "e"]
+
+    # Cleanup file after
+    cache.wait(5)
+    os.remove(path)
+
+
+def test_take_offline():
+    path = get_cache_path()
+    cache = BlockCache(path, ttl=1, pool_size=3, throttle=0)
+    fetcher = Fetcher([])
+    assert cache.take("joke", fetcher.fetch) == ""
+    assert cache.wait(5)
+    # Fill stops at the first failure
+    assert fetcher.calls == 2
+    assert not os.path.exists(path) or "joke" not in BlockCache(path).entries
+
+    # Cleanup file after
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def test_fill_throttle():
+    path = get_cache_path()
+    cache = BlockCache(path, ttl=1, pool_size=3, throttle=0.2)
+    fetcher = Fetcher(["a", "b", "c"])
+
+    # Fetches are spaced out, and each one is saved as it arrives
+    start = time.monotonic()
+    cache.fill("quote", fetcher.fetch)
+    assert time.monotonic() - start >= 0.4
+    assert BlockCache(path).entries["quote"]["pool"] == ["a", "b", "c"]
+
+    # Cleanup file after
+    os.remove(path)
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for disk_cache.py
+
+import os
+import shutil
+
+from PIL import Image
+
+from piblo.constants import UnitTestConst
+from piblo.disk_cache import DiskCache
+
+
+def get_cache_location():
+    location = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                            UnitTestConst.CACHE_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(location):
+        shutil.rmtree(location)
+    return location
+
+
+def get_image(size=16):
+    image = Image.effect_noise((size, size), 64)
+    return image.convert("RGB")
+
+
+def test_get_key():
+    key = DiskCache.get_key(2, "a prompt", 800, 480)
+    assert key == DiskCache.get_key(2, "a prompt", 800, 480)
+    assert key != DiskCache.get_key(2, "a prompt", 480, 800)
+    assert key != DiskCache.get_key(3, "a prompt", 800, 480)
+
+
+def test_put_and_get():
+    location = get_cache_location()
+    cache = DiskCache(location)
+    key = DiskCache.get_key("test")
+    image = get_image()
+
+    assert cache.get(key) is None
+    assert cache.put(key, image) is True
+    cached = cache.get(key)
+    assert cached.size == image.size
+    assert list(cached.getdata()) == list(image.getdata())
+
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+def test_evict_least_recently_used():
+    location = get_cache_location()
+    cache = DiskCache(location)
+    keys = [DiskCache.get_key(i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, get_image())
+        os.utime(cache.get_path(key), (1000 + i, 1000 + i))
+
+    # Using the oldest image makes the second oldest the first to go
+    cache.get(keys[0])
+    cache.max_bytes = cache.get_size() - 1
+    assert cache.evict() == 1
+    assert os.path.exists(cache.get_path(keys[0]))
+    assert not os.path.exists(cache.get_path(keys[1]))
+    assert os.path.exists(cache.get_path(keys[2]))
+
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+def test_disabled():
+    location = get_cache_location()
+    cache = DiskCache(location, max_bytes=0)
+    key = DiskCache.get_key("test")
+    assert cache.put(key, get_image()) is False
+    assert cache.get(key) is None
+    assert not os.path.exists(location)
+
+
+def test_get_corrupt():
+    location = get_cache_location()
+    cache = DiskCache(location)
+    key = DiskCache.get_key("test")
+    os.makedirs(location)
+    with open(cache.get_path(key), "w") as file:
+        file.write("not an image")
+
+    assert cache.get(key) is None
+    assert not os.path.exists(cache.get_path(key))
+
+    # Cleanup folder after
+    shutil.rmtree(location)
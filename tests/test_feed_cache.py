@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for feed_cache.py
+
+import os
+import shutil
+
+import responses
+
+from piblo.constants import UnitTestConst, FeedCacheConst
+from piblo.feed_cache import FeedCache
+
+FEED_URL = "https://example.com/feed/"
+FIRST_TITLE = "Local woman worried as new Pope is a Leo"
+SECOND_TITLE = "Vatican avoids tariffs with made in USA Pope"
+
+
+def get_feed_path():
+    return os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value, "test_rss_chaser_20250511.rss")
+
+
+def get_location():
+    location = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                            UnitTestConst.FEED_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(location):
+        shutil.rmtree(location)
+    return location
+
+
+def test_get_file_entries():
+    cache = FeedCache()
+    entries = cache.get_file_entries(get_feed_path())
+    assert len(entries) == 10
+    assert entries[0]["title"] == FIRST_TITLE
+    assert all(isinstance(value, str) for entry in entries for value in entry.values())
+    assert cache.get_entries(get_feed_path()) is entries
+    assert cache.get_entries("missing.rss") is None
+
+
+@responses.activate
+def test_get_entries_not_modified():
+    location = get_location()
+    with open(get_feed_path(), "rb") as file:
+        body = file.read()
+    responses.add(responses.GET, FEED_URL, body=body, status=200, headers={"ETag": "\"v1\""})
+    cache = FeedCache(location)
+    assert cache.get_entries(FEED_URL)[1]["title"] == SECOND_TITLE
+
+    # A new run sends the saved validator, and the 304 is served from the saved entries
+    responses.replace(responses.GET, FEED_URL, status=304,
+                      match=[responses.matchers.header_matcher({"If-None-Match": "\"v1\""})])
+    assert FeedCache(location).get_entries(FEED_URL)[1]["title"] == SECOND_TITLE
+    assert len(responses.calls) == 2
+
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+@responses.activate
+def test_get_entries_offline():
+    cache = FeedCache()
+    responses.add(responses.GET, FEED_URL, body=responses.ConnectionError())
+    assert cache.get_entries(FEED_URL) is None
+
+    cache.save(FEED_URL, {FeedCacheConst.ETAG.value: None, FeedCacheConst.MODIFIED.value: None,
+                          FeedCacheConst.ENTRIES.value: [{"title": "Cached"}]})
+    assert cache.get_entries(FEED_URL) == [{"title": "Cached"}]
@@ -157,6 +157,12 @@ def test_parse_text():
     assert result in expected
 
 
+def test_parse_text_weighted():
+    text = "part1 (0:option1|1000000000:option2) part3"
+    for i in range(20):
+        assert FileOperations.parse_text(text) == "part1 option2 part3"
+
+
 def test_parse_text_bad():
     text = "part1 ((option1|option2) part3"
     result = FileOperations.parse_text(text)
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for frame_queue.py
+
+import os
+import shutil
+
+from PIL import Image
+
+from piblo.constants import UnitTestConst, PropertiesConst, FrameQueueConst
+from piblo.frame_queue import FrameQueue
+
+
+def get_queue_location():
+    location = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                            UnitTestConst.QUEUE_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(location):
+        shutil.rmtree(location)
+    return location
+
+
+def test_push_pop():
+    location = get_queue_location()
+    queue = FrameQueue(location, 3)
+    image = Image.new("RGB", (40, 30), (255, 0, 0))
+    info = {PropertiesConst.TITLE.value: "test title",
+            PropertiesConst.ARTIST.value: None,
+            FrameQueueConst.CROP_LEFT.value: -5}
+
+    assert queue.push(image, info) is True
+    assert queue.size() == 1
+
+    result, result_info = queue.pop(40, 30)
+    assert result.size == (40, 30)
+    assert result.getpixel((0, 0)) == (255, 0, 0)
+    assert result_info[PropertiesConst.TITLE.value] == "test title"
+    assert result_info[PropertiesConst.ARTIST.value] == ""
+    assert result_info[FrameQueueConst.CROP_LEFT.value] == "-5"
+    assert queue.size() == 0
+
+    shutil.rmtree(location)
+
+
+def test_pop_oldest_first():
+    location = get_queue_location()
+    queue = FrameQueue(location, 3)
+    queue.push(Image.new("RGB", (10, 10), (0, 0, 0)), {PropertiesConst.TITLE.value: "first"})
+    queue.push(Image.new("RGB", (10, 10), (0, 0, 0)), {PropertiesConst.TITLE.value: "second"})
+
+    result, result_info = queue.pop()
+    assert result_info[PropertiesConst.TITLE.value] == "first"
+    result, result_info = queue.pop()
+    assert result_info[PropertiesConst.TITLE.value] == "second"
+
+    shutil.rmtree(location)
+
+
+def test_push_full():
+    location = get_queue_location()
+    queue = FrameQueue(location, 2)
+    image = Image.new("RGB", (10, 10))
+
+    assert queue.push(image) is True
+    assert queue.push(image) is True
+    assert queue.is_full() is True
+    assert queue.push(image) is False
+    assert queue.size() == 2
+
+    shutil.rmtree(location)
+
+
+def test_pop_empty():
+    location = get_queue_location()
+    queue = FrameQueue(location, 2)
+    result, result_info = queue.pop()
+    assert result is None
+    assert result_info is None
+
+
+def test_pop_discards_wrong_size():
+    location = get_queue_location()
+    queue = FrameQueue(location, 3)
+    queue.push(Image.new("RGB", (20, 10)), {PropertiesConst.TITLE.value: "wrong"})
+    queue.push(Image.new("RGB", (10, 20)), {PropertiesConst.TITLE.value: "right"})
+
+    result, result_info = queue.pop(10, 20)
+    assert result_info[PropertiesConst.TITLE.value] == "right"
+    assert queue.size() == 0
+
+    shutil.rmtree(location)
+
+
+def test_pop_discards_corrupt():
+    location = get_queue_location()
+    queue = FrameQueue(location, 3)
+    os.makedirs(location)
+    with open(os.path.join(location, f"0.{FrameQueueConst.EXTENSION.value}"), "w") as f:
+        f.write("not an image")
+    queue.push(Image.new("RGB", (10, 10)), {PropertiesConst.TITLE.value: "valid"})
+
+    result, result_info = queue.pop()
+    assert result_info[PropertiesConst.TITLE.value] == "valid"
+    assert queue.size() == 0
+
+    shutil.rmtree(location)
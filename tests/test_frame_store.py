@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for frame_store.py
+
+import os
+import shutil
+
+from PIL import Image
+
+from piblo.constants import UnitTestConst
+from piblo.frame_store import FrameStore
+
+
+def get_store_location():
+    location = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                            UnitTestConst.STORE_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(location):
+        shutil.rmtree(location)
+    return location
+
+
+def test_push_load():
+    location = get_store_location()
+    store = FrameStore(location, 3)
+    image = Image.new("RGB", (40, 30), (255, 0, 0))
+
+    assert store.push(image) is True
+    path = store.get_frames()[0]
+    result = store.load(path, 40, 30)
+    assert result.size == (40, 30)
+    assert result.getpixel((0, 0)) == (255, 0, 0)
+    assert store.load(path, 30, 40) is None
+
+    shutil.rmtree(location)
+
+
+def test_push_removes_oldest():
+    location = get_store_location()
+    store = FrameStore(location, 2)
+    for colour in [(1, 0, 0), (2, 0, 0), (3, 0, 0)]:
+        store.push(Image.new("RGB", (10, 10), colour))
+
+    frames = store.get_frames()
+    assert len(frames) == 2
+    assert store.load(frames[0]).getpixel((0, 0)) == (2, 0, 0)
+
+    # Newest frame is likely on the display already, so the other is picked
+    assert store.get_random(10, 10).getpixel((0, 0)) == (2, 0, 0)
+    assert store.get_random(20, 20) is None
+
+    shutil.rmtree(location)
+
+
+def test_disabled():
+    location = get_store_location()
+    store = FrameStore(location, 0)
+    assert store.push(Image.new("RGB", (10, 10))) is False
+    assert store.get_random() is None
+    assert not os.path.exists(location)
+
+
+def test_load_corrupt():
+    location = get_store_location()
+    store = FrameStore(location)
+    os.makedirs(location)
+    path = os.path.join(location, "corrupt.npy")
+    with open(path, "w") as file:
+        file.write("not a frame")
+
+    assert store.load(path) is None
+    assert not os.path.exists(path)
+
+    shutil.rmtree(location)
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for http_pool.py
+
+import pytest
+import requests
+import responses
+
+from piblo.http_pool import HttpPool
+
+TEST_URL = "https://pycasso.test/api"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    # Keep retries instant for tests and restore defaults after
+    HttpPool.configure(backoff=0, backoff_max=5)
+    yield
+    HttpPool.configure()
+
+
+def test_get_session_shared():
+    assert HttpPool.get_session() is HttpPool.get_session()
+
+
+@responses.activate
+def test_request_success():
+    responses.add(responses.GET, TEST_URL, json={"ok": True}, status=200)
+    response = HttpPool.get(TEST_URL)
+    assert response.json() == {"ok": True}
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_request_retry_status():
+    responses.add(responses.GET, TEST_URL, status=503)
+    responses.add(responses.GET, TEST_URL, status=200)
+    response = HttpPool.get(TEST_URL)
+    assert response.status_code == 200
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_request_post_not_retried():
+    responses.add(responses.POST, TEST_URL, status=503)
+    response = HttpPool.post(TEST_URL)
+    assert response.status_code == 503
+    assert len(responses.calls) == 1
+
+    responses.add(responses.POST, TEST_URL, body=requests.exceptions.ConnectionError())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        HttpPool.post(TEST_URL)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_request_post_retry_connect_timeout():
+    responses.add(responses.POST, TEST_URL, body=requests.exceptions.ConnectTimeout())
+    responses.add(responses.POST, TEST_URL, status=200)
+    response = HttpPool.post(TEST_URL)
+    assert response.status_code == 200
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_request_retries_exhausted():
+    responses.add(responses.GET, TEST_URL, status=429)
+    response = HttpPool.get(TEST_URL, retries=2)
+    assert response.status_code == 429
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_request_no_retry_client_error():
+    responses.add(responses.GET, TEST_URL, status=400)
+    response = HttpPool.get(TEST_URL)
+    assert response.status_code == 400
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_request_retry_after_too_long():
+    responses.add(responses.GET, TEST_URL, status=429, headers={"Retry-After": "600"})
+    response = HttpPool.get(TEST_URL)
+    assert response.status_code == 429
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_request_retry_connection_error():
+    responses.add(responses.GET, TEST_URL, body=requests.exceptions.ConnectionError())
+    responses.add(responses.GET, TEST_URL, status=200)
+    response = HttpPool.get(TEST_URL)
+    assert response.status_code == 200
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_request_connection_error_raised():
+    responses.add(responses.GET, TEST_URL, body=requests.exceptions.ConnectionError())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        HttpPool.get(TEST_URL, retries=1)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_request_read_timeout_not_retried():
+    responses.add(responses.GET, TEST_URL, body=requests.exceptions.ReadTimeout())
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        HttpPool.get(TEST_URL)
+    assert len(responses.calls) == 1
+
+
+def test_get_backoff():
+    for attempt in range(6):
+        wait = HttpPool.get_backoff(attempt, 1.0, 10.0)
+        assert 0 <= wait <= min(10.0, 2 ** attempt)
+
+
+def test_get_retry_after():
+    response = requests.Response()
+    assert HttpPool.get_retry_after(response) is None
+
+    response.headers["Retry-After"] = "7"
+    assert HttpPool.get_retry_after(response) == 7
+
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert HttpPool.get_retry_after(response) == 0
+
+    response.headers["Retry-After"] = "soon"
+    assert HttpPool.get_retry_after(response) is None
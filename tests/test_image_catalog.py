@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for image_catalog.py
+
+import os
+import shutil
+
+from PIL import Image
+
+from piblo.constants import UnitTestConst, ProvidersConst, CatalogConst
+from piblo.image_catalog import ImageCatalog
+
+
+def get_catalog():
+    temp = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value)
+    path = os.path.join(temp, UnitTestConst.CATALOG_FILE.value)
+    location = os.path.join(temp, UnitTestConst.CACHE_FOLDER.value)
+
+    # Cleanup before
+    if os.path.exists(path):
+        os.remove(path)
+    if os.path.exists(location):
+        shutil.rmtree(location)
+    os.makedirs(location)
+    return ImageCatalog(path), location
+
+
+def save_image(location, name, size=(20, 10)):
+    path = os.path.join(location, name)
+    Image.new("RGB", size).save(path)
+    return path
+
+
+def test_update_and_get():
+    catalog, location = get_catalog()
+    source = ProvidersConst.EXTERNAL.value
+    reads = []
+
+    def reader(path):
+        reads.append(path)
+        with Image.open(path) as image:
+            return image.width, image.height, os.path.basename(path), "artist", None
+
+    first = save_image(location, "first.png")
+    save_image(location, "ignored.jpg")
+    assert catalog.update(location, source, "png", reader) == 1
+    entry = catalog.get_random(location, source)
+    assert entry[CatalogConst.PATH.value] == first
+    assert entry[CatalogConst.WIDTH.value] == 20
+    assert entry[CatalogConst.TITLE.value] == "first.png"
+
+    # Nothing is read again until the folder changes
+    assert catalog.update(location, source, "png", reader) == 0
+    second = save_image(location, "second.png")
+    os.utime(location, ns=(0, 0))
+    assert catalog.update(location, source, "png", reader) == 1
+    assert reads == [first, second]
+
+    # Removed files leave the catalog, changed settings read everything again
+    os.remove(first)
+    assert catalog.update(location, source, "png", reader, "new settings") == 1
+    assert catalog.get_image(first) is None
+    assert catalog.get_random(location, ProvidersConst.HISTORIC.value) is None
+
+    # Cleanup after
+    os.remove(catalog.path)
+    shutil.rmtree(location)
+
+
+def test_record_shown():
+    catalog, location = get_catalog()
+    path = save_image(location, "image.png")
+    catalog.update(location, ProvidersConst.HISTORIC.value, "png", lambda p: (20, 10, "title", None, "prompt"))
+
+    catalog.record_shown(path, now=1000)
+    catalog.record_shown(path, now=2000)
+    entry = catalog.get_image(path)
+    assert entry[CatalogConst.SHOWN.value] == 2
+    assert entry[CatalogConst.LAST_SHOWN.value] == 2000
+    assert entry[CatalogConst.PROMPT.value] == "prompt"
+
+    # Cleanup after
+    os.remove(catalog.path)
+    shutil.rmtree(location)
+
+
+def test_unreadable_image():
+    catalog, location = get_catalog()
+    with open(os.path.join(location, "broken.png"), "w") as file:
+        file.write("not an image")
+
+    def reader(path):
+        with Image.open(path) as image:
+            return image.width, image.height, None, None, None
+
+    assert catalog.update(location, ProvidersConst.HISTORIC.value, "png", reader) == 0
+    assert catalog.get_random(location, ProvidersConst.HISTORIC.value) is None
+    assert catalog.update(os.path.join(location, "missing"), ProvidersConst.HISTORIC.value, "png", reader) is None
+
+    # Cleanup after
+    os.remove(catalog.path)
+    shutil.rmtree(location)
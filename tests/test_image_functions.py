@@ -1,12 +1,13 @@
 #!/usr/bin/python3
 # -*- coding:utf-8 -*-
 # Unit tests for image_functions.py
+import io
 import os.path
 from pathlib import Path
 
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageFont
 
-from piblo.constants import IconFileConst, ConfigConst, IconConst, ImageConst
+from piblo.constants import IconFileConst, ConfigConst, IconConst, ImageConst, UnitTestConst, QuantizeConst
 from piblo.image_functions import ImageFunctions
 
 
@@ -160,10 +161,10 @@ def test_draw_icons():
 
     # Check image is not all black
     extrema = img.convert("L").getextrema()
-    # Check appropriate pixel is white
-    white_pixel = img.getpixel((20, 386))
+    # Check appropriate pixel is white, icons are resized to icon_size (default 20)
+    white_pixel = img.getpixel((20, 383))
     black_pixel = img.getpixel((580, 16))
-    red_pixel = img.getpixel((585, 387))
+    red_pixel = img.getpixel((585, 383))
 
     unexpected_extrema = (0, 0)
     expected_white_pixel = (150, 150, 150, 193)
@@ -174,3 +175,184 @@ def test_draw_icons():
     assert white_pixel == expected_white_pixel
     assert black_pixel == expected_black_pixel
     assert red_pixel == expected_red_pixel
+
+
+def test_get_reduce_factor():
+    assert ImageFunctions.get_reduce_factor((4000, 3000), 600, 448) == 6
+    assert ImageFunctions.get_reduce_factor((1024, 1024), 600, 448) == 1
+    assert ImageFunctions.get_reduce_factor((4000, 3000), 0, 0) == 1
+
+
+def test_decode_stream():
+    img = Image.new(mode="RGB", size=(400, 300), color=(0, 255, 0))
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    data = img_bytes.getvalue()
+    chunks = [data[i:i + 100] for i in range(0, len(data), 100)]
+
+    result = ImageFunctions.decode_stream(chunks, 100, 100)
+    assert result.size == (134, 100)
+    assert result.getpixel((0, 0)) == (0, 255, 0)
+
+
+def test_decode_stream_jpeg_draft():
+    img = Image.new(mode="RGB", size=(1600, 1200), color=(0, 0, 255))
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    data = img_bytes.getvalue()
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+
+    # JPEG decodes at 1/8 scale, the largest that still covers 100x100
+    result = ImageFunctions.decode_stream(chunks, 100, 100)
+    assert result.size == (200, 150)
+
+    result = ImageFunctions.decode_stream(chunks)
+    assert result.size == (1600, 1200)
+
+
+def test_open_image_draft():
+    path = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value, "test_draft.jpg")
+    img = Image.new(mode="RGB", size=(1600, 1200), color=(0, 0, 255))
+    img.save(path, format="JPEG")
+
+    # JPEG decodes at 1/8 scale, the largest that still covers 100x100
+    result = ImageFunctions.open_image(path, 100, 100)
+    assert result.size == (200, 150)
+
+    result = ImageFunctions.open_image(path)
+    assert result.size == (1600, 1200)
+
+    # Cleanup file after
+    os.remove(path)
+
+
+def test_quantize_nearest():
+    palette = QuantizeConst.PALETTES.value["4color"]
+    img = Image.new(mode="RGB", size=(4, 1))
+    img.putdata([(10, 10, 10), (240, 250, 245), (200, 30, 20), (230, 220, 40)])
+    result = ImageFunctions.quantize(img, palette, QuantizeConst.NEAREST.value)
+    assert list(result.getdata()) == [(0, 0, 0), (255, 255, 255), (255, 0, 0), (255, 255, 0)]
+
+
+def test_quantize_ordered():
+    palette = QuantizeConst.PALETTES.value["bw"]
+    img = Image.new(mode="RGB", size=(64, 64), color=(64, 64, 64))
+    result = ImageFunctions.quantize(img, palette, QuantizeConst.ORDERED.value)
+
+    # A quarter of the pixels are white, spread evenly by the threshold map
+    assert sorted(result.getcolors()) == [(1024, (255, 255, 255)), (3072, (0, 0, 0))]
+
+
+def test_quantize_diffusion():
+    palette = QuantizeConst.PALETTES.value["gray4"]
+    img = Image.linear_gradient("L").convert("RGB")
+    result = ImageFunctions.quantize(img, palette, QuantizeConst.DIFFUSION.value)
+    colours = [colour for count, colour in result.getcolors()]
+    assert sorted(colours) == [tuple(colour) for colour in palette]
+
+
+def test_get_icon():
+    here = os.path.dirname(__file__)
+    parent = Path(here).parent.absolute()
+    path = os.path.join(parent, ConfigConst.ICON_PATH.value, IconFileConst.ICON_STABLE.value[0])
+
+    icon = ImageFunctions.get_icon(path, (255, 0, 0), 255, 12)
+    assert icon.size == (12, 12)
+    assert ImageFunctions.get_icon(path, (255, 0, 0), 255, 12) is icon
+    assert ImageFunctions.get_icon(path, (255, 0, 0), 100, 12) is not icon
+
+
+def test_crop_frame():
+    img = Image.linear_gradient("L").convert("RGB")
+    for box in [(10, 20, 110, 70), (-10.4, -5, 90, 95.6), (200, 200, 300, 280)]:
+        result = ImageFunctions.crop_frame(img, box)
+        expected = img.crop(box)
+        assert result.size == expected.size
+        assert result.tobytes() == expected.tobytes()
+
+    # Modes that can't be drawn on are converted
+    result = ImageFunctions.crop_frame(img.convert("P"), (0, 0, 10, 10))
+    assert result.mode == ImageConst.CONVERT_MODE.value
+
+
+def test_rotate_frame():
+    img = Image.linear_gradient("L").convert("RGB").crop((0, 0, 60, 40))
+    for rotate in [90, 180, 270, 45]:
+        result = ImageFunctions.rotate_frame(img, rotate)
+        expected = img.rotate(-rotate, expand=1)
+        assert result.size == expected.size
+        assert result.tobytes() == expected.tobytes()
+    assert ImageFunctions.rotate_frame(img, 0) is img
+
+
+def test_get_changed_box():
+    old = Image.new("RGB", (100, 50))
+    new = old.copy()
+    assert ImageFunctions.get_changed_box(old, new) is None
+
+    new.putpixel((10, 20), (255, 255, 255))
+    new.putpixel((30, 25), (0, 0, 1))
+    assert ImageFunctions.get_changed_box(old, new) == (10, 20, 31, 26)
+    assert ImageFunctions.get_changed_box(old, new, 8) == (8, 20, 32, 26)
+    assert ImageFunctions.get_changed_box(old.convert("L"), new) == (10, 20, 31, 26)
+
+    # Widening never goes past the edge, and different sizes change everything
+    new.putpixel((99, 0), (255, 255, 255))
+    assert ImageFunctions.get_changed_box(old, new, 8) == (8, 0, 100, 26)
+    assert ImageFunctions.get_changed_box(old, new.crop((0, 0, 50, 50))) == (0, 0, 50, 50)
+
+
+def get_test_font_path():
+    # Pillow's built in font, saved so it can be opened by path like a font file
+    path = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value, "test_font.ttf")
+    with open(path, "wb") as file:
+        file.write(ImageFont.load_default().path.getvalue())
+    return path
+
+
+def test_wrap_text():
+    font = ImageFont.load_default()
+    text = "a painting of the sydney opera house"
+    lines = ImageFunctions.wrap_text(text, font, font.getlength("sydney opera house"))
+    assert lines == ["a painting of the", "sydney opera house"]
+
+    lines = ImageFunctions.wrap_text(text, font, 1000, max_chars=12)
+    assert lines == ["a painting", "of the", "sydney opera", "house"]
+
+
+def test_font_caches_bounded():
+    path = get_test_font_path()
+    font = ImageFunctions.get_font(path, 10)
+    for size in range(11, 11 + ImageConst.FONT_CACHE_SIZE.value):
+        ImageFunctions.get_font(path, size)
+    # Least recently used font is dropped first
+    assert len(ImageFunctions.fonts) <= ImageConst.FONT_CACHE_SIZE.value
+    assert (path, 10) not in ImageFunctions.fonts
+
+    for i in range(ImageConst.TEXT_LENGTH_CACHE_SIZE.value + 1):
+        ImageFunctions.get_text_length(font, str(i))
+    assert len(ImageFunctions.text_lengths) == ImageConst.TEXT_LENGTH_CACHE_SIZE.value
+    assert (font, "0") not in ImageFunctions.text_lengths
+
+
+def test_fit_text():
+    path = get_test_font_path()
+    text = "a painting of the sydney opera house"
+
+    # Largest size that fits on one line
+    size, lines = ImageFunctions.fit_text(text, path, 200, max_lines=1, max_size=40, min_size=4, wrap=False)
+    assert lines == [text]
+    assert ImageFunctions.get_font(path, size).getlength(text) <= 200
+    assert ImageFunctions.get_font(path, size + 1).getlength(text) > 200
+
+    # Wrapping allows a larger size
+    wrapped_size, lines = ImageFunctions.fit_text(text, path, 200, max_lines=2, max_size=40, min_size=4)
+    assert wrapped_size > size
+    assert len(lines) == 2
+
+    # Nothing fits, minimum size is used
+    size, lines = ImageFunctions.fit_text(text, path, 10, max_lines=1, max_size=40, min_size=8)
+    assert size == 8
+
+    # Cleanup file after
+    os.remove(path)
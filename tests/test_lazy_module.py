@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for lazy_module.py
+import json
+import os
+import subprocess
+import sys
+
+from piblo.constants import UnitTestConst
+from piblo.lazy_module import LazyModule
+
+IMPORT_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import piblo.pycasso
+elapsed = time.perf_counter() - start
+
+loaded = [name for name in json.loads(sys.argv[1]) if name in sys.modules]
+print(json.dumps({"elapsed": elapsed, "loaded": loaded}))
+"""
+
+
+def run_import_script():
+    src = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+    env = os.environ.copy()
+    env["PYTHONPATH"] = src + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, json.dumps(UnitTestConst.LAZY_MODULES.value)],
+                            capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_lazy_module_not_loaded():
+    module = LazyModule("piblo_module_that_does_not_exist")
+    assert "not loaded" in repr(module)
+
+
+def test_lazy_module_load_on_access():
+    module = LazyModule("colorsys")
+    result = module.rgb_to_hsv(1.0, 0.0, 0.0)
+    expected = (0.0, 1.0, 1.0)
+    assert result == expected
+    assert "(loaded)" in repr(module)
+
+
+def test_import_pycasso_loads_no_provider_libraries():
+    result = run_import_script()
+    assert result["loaded"] == []
+
+
+def test_import_pycasso_time_budget():
+    result = run_import_script()
+    assert result["elapsed"] < UnitTestConst.IMPORT_TIME_BUDGET.value
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for line_index.py
+
+import collections
+import os
+import shutil
+
+import pytest
+
+from piblo.constants import UnitTestConst
+from piblo.line_index import LineIndex
+
+
+def get_location():
+    location = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                            UnitTestConst.LINE_INDEX_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(location):
+        shutil.rmtree(location)
+    return location
+
+
+def write_lines(location, text):
+    os.makedirs(location, exist_ok=True)
+    path = os.path.join(location, "lines.txt")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    return path
+
+
+def test_build():
+    location = get_location()
+    path = write_lines(location, "0:never\n3:three\n\nlast")
+    index = LineIndex.build(path)
+    assert index[1:].tolist() == [[8, 3], [16, 4], [17, 5]]
+
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+def test_get_random_line():
+    location = get_location()
+    LineIndex.configure()
+    path = write_lines(location, "0:never\n3:three\r\nøne\n")
+    lines = collections.Counter(LineIndex.get_random_line(path) for i in range(400))
+    assert set(lines) == {"three", "øne"}
+    assert lines["three"] > lines["øne"]
+    assert LineIndex.get_first_line(path) == "three"
+
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+def test_get_random_line_empty():
+    location = get_location()
+    LineIndex.configure()
+    path = write_lines(location, "0:never\n")
+    assert LineIndex.get_random_line(path) is None
+    assert LineIndex.get_first_line(path) is None
+
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+def test_saved_index():
+    location = get_location()
+    LineIndex.configure(os.path.join(location, "index"))
+    path = write_lines(location, "first\nsecond\n")
+    assert LineIndex.get_first_line(path) == "first"
+    assert os.path.exists(LineIndex.get_saved_path(path))
+
+    # Saved index is used by a new process, and rebuilt once the file changes
+    LineIndex.indexes = {}
+    assert LineIndex.get_index(path)[1:].tolist() == [[0, 1], [6, 2]]
+    path = write_lines(location, "changed\n")
+    os.utime(path, ns=(0, 0))
+    assert LineIndex.get_random_line(path) == "changed"
+
+    LineIndex.configure()
+    # Cleanup folder after
+    shutil.rmtree(location)
+
+
+def test_missing_file():
+    LineIndex.configure()
+    with pytest.raises(FileNotFoundError):
+        LineIndex.get_random_line(os.path.join(os.path.dirname(__file__), "missing.txt"))
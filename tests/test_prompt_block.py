@@ -5,7 +5,8 @@ import os
 
 import pytest
 import responses
-from piblo.prompt_block import PromptBlock, QuoteBlock, FileBlock, JokeBlock
+from piblo.block_cache import BlockCache
+from piblo.prompt_block import PromptBlock, QuoteBlock, FileBlock, JokeBlock, RSSBlock
 from piblo.constants import UnitTestConst, BlockInfoConst
 
 
@@ -72,6 +73,31 @@ def test_quote_block_timeout():
     assert result == ""
 
 
+@responses.activate
+def test_quote_block_cached():
+    path = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value,
+                        UnitTestConst.BLOCK_CACHE_FILE.value)
+    if os.path.exists(path):
+        os.remove(path)
+    cache = BlockCache(path, ttl=1, pool_size=2, throttle=0)
+    responses.add(
+        responses.GET,
+        BlockInfoConst.ZENQUOTE_URL.value,
+        json=[{"q": "Cached", "a": "Someone"}],
+        status=200
+    )
+
+    assert QuoteBlock(cache=cache).generate() == '"Cached" - Someone'
+    assert cache.wait(5)
+    assert len(responses.calls) == 3
+    # Taken from the pool, which is then topped up
+    assert QuoteBlock(cache=cache).generate() == '"Cached" - Someone'
+    assert cache.wait(5)
+    assert len(responses.calls) == 4
+
+    os.remove(path)
+
+
 class MockPromptBlock(PromptBlock):
     def generate(self) -> str:
         return "test content"
@@ -126,3 +152,16 @@ def test_joke_block():
 
     result = joke_block.generate()
     assert result == ""
+
+
+def test_rss_block_tag_and_index():
+    feed_path = os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value,
+                             "test_rss_chaser_20250511.rss")
+    block = RSSBlock()
+    assert block.generate(feed_path) == "Local woman worried as new Pope is a Leo"
+    assert block.generate(feed_path, "title", "1") == "Vatican avoids tariffs with made in USA Pope"
+    assert block.generate(feed_path, "link", 1) == \
+        "https://chaser.com.au/world/vatican-avoids-tariffs-with-made-in-usa-pope/"
+    assert block.generate(feed_path, "description").startswith("<p>\"Leo's cant be trusted\"</p>")
+    assert block.generate(feed_path, "missing") == ""
+    assert block.generate(feed_path, "title", 100) == ""
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for prompt_template.py
+
+import time
+
+from piblo.prompt_template import PromptTemplate
+
+
+def test_compile():
+    tree = PromptTemplate.compile("a (b|[c]) d", ["()", "[]"], "|")
+    assert tree == ["a ", ("(", ")", [["b"], [("[", "]", [["c"]])]]), " d"]
+    assert PromptTemplate.compile("a (b|[c]) d", ["()", "[]"], "|") is tree
+
+
+def test_compile_crossing():
+    assert PromptTemplate.compile("a (b[c) d]", ["()", "[]"]) is None
+
+
+def test_compile_mismatch_is_text():
+    tree = PromptTemplate.compile("a ((b) [c]", ["()", "[]"])
+    assert tree == ["a ((b) ", ("[", "]", [["c"]])]
+
+
+def test_expand_choices():
+    text = "Test(5:pass|0:fail|[pass|{pass|20:pass|0:fail}|0:fail])(1:pass|0:fail)"
+    result = PromptTemplate.expand_choices(text, ["()", "[]", "{}"])
+    assert result == "Testpasspass"
+
+
+def test_expand_choices_zero_weight():
+    assert PromptTemplate.expand_choices("a(0:b|0:c)d") == "ad"
+
+
+def test_expand_blocks():
+    blocks = []
+
+    def process(block):
+        blocks.append(block)
+        return block.upper()
+
+    text, subject = PromptTemplate.expand_blocks("a <b{c}> {d}e", "<>", "{}", process)
+    assert text == "a BC de"
+    assert subject == "cd"
+    assert blocks == ["bc"]
+
+
+def test_expand_blocks_result_expanded():
+    # Results are expanded in turn, until the limit stops a block that keeps returning itself
+    text, subject = PromptTemplate.expand_blocks("<x>", "<>", "{}", lambda block: "R {s}<x>", loop_limit=2)
+    assert text == "R s<x>"
+    assert subject == "s"
+
+
+def test_expand_blocks_no_subject():
+    text, subject = PromptTemplate.expand_blocks("<b>{c}", "<>", None, lambda block: "B")
+    assert text == "B{c}"
+    assert subject == ""
+
+
+def test_expand_blocks_concurrent():
+    def process(block):
+        time.sleep(0.3)
+        return block.upper() + "{s}"
+
+    start = time.monotonic()
+    text, subject = PromptTemplate.expand_blocks("<a> meets <b{c}> and <d>", "<>", "{}", process, workers=3)
+    assert time.monotonic() - start < 0.8
+    assert text == "As meets BCs and Ds"
+    assert subject == "scss"
+
+
+def test_expand_blocks_many():
+    def process(block):
+        time.sleep(0.3)
+        return block.upper() + "{s}"
+
+    # Blocks from every text are run together, and each text keeps its own subject
+    start = time.monotonic()
+    results = PromptTemplate.expand_blocks_many(["<a>", "plain", "x <b> y", "<c"], "<>", "{}", process, workers=3)
+    assert time.monotonic() - start < 0.5
+    assert results == [("As", "s"), ("plain", ""), ("x Bs y", "s"), ("<c", "")]
+
+
+def test_expand_blocks_deadline():
+    def process(block):
+        if block == "slow":
+            time.sleep(1)
+        return block.upper()
+
+    deadline = time.monotonic() + 0.2
+    text, subject = PromptTemplate.expand_blocks("<fast> <slow>", "<>", "{}", process,
+                                                 fallback=lambda block: "fallback", workers=2, deadline=deadline)
+    assert text == "FAST fallback"
+
+    # Nothing is started once the deadline has passed
+    text, subject = PromptTemplate.expand_blocks("<fast>", "<>", "{}", process, deadline=deadline)
+    assert text == ""
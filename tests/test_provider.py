@@ -1,11 +1,16 @@
 #!/usr/bin/python3
 # -*- coding:utf-8 -*-
 # Unit tests for provider.py
+import io
 import os
 
+import responses
 from PIL import Image
-from piblo.constants import UnitTestConst, ProvidersConst
-from piblo.provider import Provider
+from piblo.constants import UnitTestConst, ProvidersConst, StabilityConst
+from piblo.http_pool import HttpPool
+from piblo.provider import Provider, StabilityProvider
+
+TEST_URL = "https://pycasso.test/image.png"
 
 
 def test_resize_image_high():
@@ -44,6 +49,33 @@ def test_fit_image_wide():
     assert result == expected
 
 
+@responses.activate
+def test_load_image_stream():
+    img = Image.new(mode="RGB", size=(1024, 1024))
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="PNG")
+    responses.add(responses.GET, TEST_URL, body=img_bytes.getvalue(), status=200, content_type="image/png")
+
+    img = Provider.load_image_stream(HttpPool.get(TEST_URL, stream=True), 300, 200)
+    result = (img.width, img.height)
+    expected = (342, 342)
+    assert result == expected
+
+
+def test_get_aspect_ratio():
+    assert StabilityProvider.get_aspect_ratio(600, 448) == "5:4"
+    assert StabilityProvider.get_aspect_ratio(448, 600) == "4:5"
+    assert StabilityProvider.get_aspect_ratio(800, 480) == "16:9"
+    assert StabilityProvider.get_aspect_ratio(200, 200) == "1:1"
+
+
+def test_get_output_format():
+    assert StabilityProvider.get_output_format("color") == StabilityConst.LOSSLESS_FORMAT.value
+    assert StabilityProvider.get_output_format("bw") in StabilityConst.LOSSY_FORMATS.value
+    assert StabilityProvider.get_output_format("bw", "png") == "png"
+    assert StabilityProvider.get_output_format(None) == StabilityConst.LOSSLESS_FORMAT.value
+
+
 def test_read_creds():
     directory = os.path.join(os.path.dirname(__file__), UnitTestConst.PROVIDER_FOLDER.value)
     path = os.path.join(directory, UnitTestConst.PROVIDER_CRED.value)
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for provider_health.py
+
+import os
+
+from piblo.constants import UnitTestConst, HealthConst, ProvidersConst
+from piblo.provider_health import ProviderHealth
+
+
+def get_health_path():
+    path = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value, UnitTestConst.HEALTH_FILE.value)
+
+    # Cleanup file before
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def test_circuit_opens():
+    health = ProviderHealth(get_health_path(), failure_limit=3, cool_down=10)
+    provider = ProvidersConst.STABLE.value
+
+    health.record_failure(provider, now=1000)
+    health.record_failure(provider, now=1000)
+    assert health.get_state(provider, now=1000) == HealthConst.CLOSED.value
+
+    health.record_failure(provider, now=1000)
+    assert health.get_state(provider, now=1000) == HealthConst.OPEN.value
+    assert health.is_available(provider, now=1000) is False
+
+
+def test_circuit_half_open_and_close():
+    health = ProviderHealth(get_health_path(), failure_limit=1, cool_down=10)
+    provider = ProvidersConst.DALLE.value
+
+    health.record_failure(provider, now=1000)
+    assert health.get_state(provider, now=1000 + 599) == HealthConst.OPEN.value
+    assert health.get_state(provider, now=1000 + 600) == HealthConst.HALF_OPEN.value
+    assert health.is_available(provider, now=1000 + 600) is True
+
+    # Failed probe opens the circuit again
+    health.record_failure(provider, now=2000)
+    assert health.get_state(provider, now=2000 + 60) == HealthConst.OPEN.value
+
+    health.record_success(provider)
+    assert health.get_state(provider, now=2000 + 60) == HealthConst.CLOSED.value
+
+
+def test_circuit_disabled():
+    health = ProviderHealth(get_health_path(), failure_limit=0)
+    provider = ProvidersConst.STABLE.value
+    for i in range(5):
+        health.record_failure(provider)
+    assert health.is_available(provider) is True
+
+
+def test_latency_average():
+    health = ProviderHealth(get_health_path())
+    provider = ProvidersConst.AUTOMATIC.value
+    assert health.get_latency(provider) is None
+
+    health.record_success(provider, 10.0)
+    assert health.get_latency(provider) == 10.0
+
+    alpha = HealthConst.LATENCY_ALPHA.value
+    health.record_success(provider, 20.0)
+    assert health.get_latency(provider) == alpha * 20.0 + (1 - alpha) * 10.0
+
+
+def test_save_and_load():
+    path = get_health_path()
+    health = ProviderHealth(path, failure_limit=1, cool_down=10)
+    health.record_failure(ProvidersConst.STABLE.value, latency=30.0, now=1000)
+    assert health.save() is True
+
+    loaded = ProviderHealth(path, failure_limit=1, cool_down=10)
+    assert loaded.get_state(ProvidersConst.STABLE.value, now=1000) == HealthConst.OPEN.value
+    assert loaded.get_latency(ProvidersConst.STABLE.value) == 30.0
+
+    # Cleanup file after
+    os.remove(path)
+
+
+def test_load_invalid():
+    path = get_health_path()
+    with open(path, "w") as file:
+        file.write("not json")
+
+    health = ProviderHealth(path)
+    assert health.providers == {}
+
+    # Cleanup file after
+    os.remove(path)
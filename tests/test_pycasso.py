@@ -3,12 +3,19 @@
 # Unit tests for pycasso.py
 
 import os.path
+import shutil
+import threading
+import time
 
 import responses
 from omni_epd import displayfactory
-from piblo.constants import PromptModeConst, PropertiesConst, ConfigConst, ProvidersConst, UnitTestConst, IconConst
+from piblo.constants import PromptModeConst, PropertiesConst, ConfigConst, ProvidersConst, UnitTestConst, IconConst, \
+    IconFileConst, TraceConst, QuantizeConst, RefreshConst, CatalogConst, FrameQueueConst
 from piblo.file_operations import FileOperations
+from piblo.frame_queue import FrameQueue
+from piblo.image_catalog import ImageCatalog
 from piblo.pycasso import Pycasso
+from piblo.run_trace import RunTrace
 from PIL import Image, PngImagePlugin, ImageDraw
 
 
@@ -65,6 +72,58 @@ def test_load_external_image():
     assert pixel == expected
 
 
+def test_build_external_cache():
+    here = os.path.dirname(__file__)
+    config_path = os.path.join(here, UnitTestConst.PYCASSO_FOLDER.value, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    cache_location = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.CACHE_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(cache_location):
+        shutil.rmtree(cache_location)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.external_cache_location = cache_location
+    instance.config.external_cache_size = 10
+    instance.load_caches()
+    assert instance.build_external_cache(workers=1) == 1
+
+    # Loading the image uses the resized copy from the cache
+    source = FileOperations(instance.config.external_image_location).get_all_files_of_type("png")[0]
+    key = Pycasso.get_external_key(source, instance.width, instance.height, instance.config.resize_external)
+    cached = instance.external_cache.get(key)
+    image_base, title_text, artist_text = instance.load_provider_image(ProvidersConst.EXTERNAL.value)
+    assert image_base.size == cached.size
+
+    # Cleanup folder after
+    shutil.rmtree(cache_location)
+
+
+def test_load_images_from_catalog():
+    here = os.path.dirname(__file__)
+    path = os.path.join(here, UnitTestConst.PYCASSO_FOLDER.value)
+    catalog_path = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.CATALOG_FILE.value)
+
+    # Cleanup file before
+    if os.path.exists(catalog_path):
+        os.remove(catalog_path)
+
+    catalog = ImageCatalog(catalog_path)
+    image_base, title, artist = Pycasso.load_historic_image(path, catalog=catalog)
+    assert (title, artist) == Pycasso.load_historic_image(path)[1:]
+    entry = catalog.get_image(os.path.join(path, "test.png"))
+    assert entry[CatalogConst.TITLE.value] == "A border collie with a phone"
+    assert entry[CatalogConst.SHOWN.value] == 1
+
+    external = os.path.join(path, "external")
+    image_base, title, artist = Pycasso.load_external_image(external, 400, 400, artist_regex=" in the style of ",
+                                                            parse_text=True, catalog=catalog)
+    assert image_base.size == Pycasso.load_external_image(external, 400, 400)[0].size
+    assert artist == "Lichtenstein"
+
+    # Cleanup file after
+    os.remove(catalog_path)
+
+
 def test_load_historic_image_load_image():
     path = os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value)
     tup = Pycasso.load_historic_image(path)
@@ -239,6 +298,32 @@ def test_nested_file_block_subset_prompt():
     assert title_text == expected_title
 
 
+def test_get_provider_threads():
+    config_path = os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value,
+                               UnitTestConst.CONFIG_FILE.value)
+    instance = Pycasso(config_path)
+    providers = []
+
+    # Blocks running at the same time share one provider
+    threads = [threading.Thread(target=lambda: providers.append(instance.get_provider(ProvidersConst.AUTOMATIC.value)))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(providers) == 8
+    assert all(provider is providers[0] for provider in providers)
+
+
+def test_get_block_fallback():
+    config_path = os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value,
+                               UnitTestConst.CONFIG_FILE.value)
+    instance = Pycasso(config_path)
+    assert instance.get_block_fallback("llm;a cat") == "a cat"
+    assert instance.get_block_fallback("quote") == ""
+    assert instance.get_block_fallback("rss;https://example.com/feed") == ""
+
+
 def test_recursive_file_block_limit():
     config_path = os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value,
                                UnitTestConst.CONFIG_FILE.value)
@@ -247,7 +332,7 @@ def test_recursive_file_block_limit():
     instance = Pycasso(config_path)
     text = f"R <file;{relative_file_path}>"
     prompt, title_text = instance.parse_blocks_nested(text=text, loop_limit=20)
-    expected_prompt = "R R R R R R R R R R R R R R R R R R R R R R R " \
+    expected_prompt = "R R R R R R R R R R R R R R R R R R R R R " \
                       "<file;tests/test_pycasso_content/test_file_block_recursive.txt>"
     expected_title = ""
 
@@ -470,6 +555,395 @@ def test_run_fallback():
         os.remove(output_path)
 
 
+def test_run_daemon():
+    here = os.path.dirname(__file__)
+    output_path = "mock_output.png"
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.daemon_interval = 0
+    instance.run_daemon(max_runs=2)
+
+    assert os.path.exists(output_path)
+    assert instance.epd is not None
+
+    # Cleanup files after
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+
+def test_run_daemon_errors():
+    here = os.path.dirname(__file__)
+    output_path = "mock_output.png"
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.daemon_interval = 0
+    instance.config.fill_queue_in_daemon = False
+    calls = []
+
+    def fail():
+        calls.append("fail")
+        raise ValueError("unexpected")
+
+    # Unexpected errors are logged and the daemon keeps going
+    instance.fetch_image = fail
+    instance.run_daemon(max_runs=2)
+    assert calls == ["fail", "fail"]
+
+    def interrupt():
+        calls.append("interrupt")
+        raise KeyboardInterrupt
+
+    # ctrl + c during a refresh stops the daemon
+    calls.clear()
+    instance.fetch_image = interrupt
+    instance.run_daemon(max_runs=3)
+    assert calls == ["interrupt"]
+    assert instance.daemon is False
+
+    # Cleanup files after
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+
+def test_prefetch_and_run_queued():
+    here = os.path.dirname(__file__)
+    output_path = "mock_output.png"
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    queue_location = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.QUEUE_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(queue_location):
+        shutil.rmtree(queue_location)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.queue_location = queue_location
+    instance.config.queue_size = 2
+    instance.config.historic_amount = 1
+    queued = instance.prefetch(3)
+
+    assert queued == 2
+    assert len(os.listdir(queue_location)) == 2
+
+    # Run should use a queued frame without calling a provider
+    instance.config.historic_amount = 0
+    instance.config.test_enabled = False
+    instance.run()
+
+    assert os.path.exists(output_path)
+    assert len(os.listdir(queue_location)) == 1
+    assert IconFileConst.ICON_HISTORIC.value in instance.icons
+
+    # Cleanup files after
+    shutil.rmtree(queue_location)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+
+def test_run_writes_trace():
+    here = os.path.dirname(__file__)
+    output_path = "mock_output.png"
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    trace_path = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.TRACE_FILE.value)
+
+    # Cleanup file before
+    if os.path.exists(trace_path):
+        os.remove(trace_path)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.historic_amount = 1
+    instance.trace.path = trace_path
+    instance.run()
+
+    traces = RunTrace.read_traces(trace_path)
+    assert len(traces) == 1
+    phases = [phase[TraceConst.NAME.value] for phase in traces[0][TraceConst.PHASES.value]]
+    assert phases[0] == TraceConst.LOAD_CONFIG.value
+    assert TraceConst.LOAD_DISPLAY.value in phases
+    assert TraceConst.FETCH_IMAGE.value in phases
+    assert TraceConst.CROP_IMAGE.value in phases
+    assert TraceConst.DRAW_ICONS.value in phases
+    assert TraceConst.DISPLAY.value in phases
+
+    # Cleanup files after
+    os.remove(trace_path)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+
+def test_get_image_racing_hedge():
+    here = os.path.dirname(__file__)
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.historic_amount = 1
+    instance.config.race_providers = True
+    instance.config.hedge_delay = 0.1
+    queue_location = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.QUEUE_FOLDER.value)
+    instance.config.queue_location = queue_location
+
+    # Cleanup folder before
+    if os.path.exists(queue_location):
+        shutil.rmtree(queue_location)
+
+    def slow_historic_image(*args, **kwargs):
+        time.sleep(2)
+        return Pycasso.load_historic_image(*args, **kwargs)
+
+    # Historic is the only choice to start with, external is started once the hedge delay passes
+    instance.load_historic_image = slow_historic_image
+    instance.get_hedge_provider_mode = lambda started, paid: \
+        ProvidersConst.EXTERNAL.value if ProvidersConst.EXTERNAL.value not in started else None
+
+    image, provider = instance.get_image_racing()
+    assert image is not None
+    assert provider == ProvidersConst.EXTERNAL.value
+    assert IconFileConst.ICON_EXTERNAL.value in instance.icons
+
+    # The slower provider's image is kept for a later run instead of thrown away
+    instance.wait_racers()
+    frame_queue = FrameQueue(queue_location)
+    assert frame_queue.size() == 1
+    image, info = frame_queue.pop(instance.width, instance.height)
+    assert image is not None
+    assert int(info[FrameQueueConst.PROVIDER.value]) == ProvidersConst.HISTORIC.value
+
+    # Cleanup folder after
+    shutil.rmtree(queue_location)
+
+
+def test_get_image_racing_failure():
+    here = os.path.dirname(__file__)
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.external_image_location = "bad folder"
+    instance.config.historic_amount = 1
+    instance.config.external_amount = 1
+    instance.config.race_providers = True
+    instance.config.hedge_delay = 60
+
+    # Whichever starts first, a failed external provider is replaced straight away by historic
+    image, provider = instance.get_image_racing()
+    assert image is not None
+    assert provider == ProvidersConst.HISTORIC.value
+
+
+def test_get_hedge_provider_mode_spend_cap():
+    config_path = os.path.join(os.path.dirname(__file__), UnitTestConst.PYCASSO_FOLDER.value,
+                               UnitTestConst.CONFIG_FILE.value)
+    instance = Pycasso(config_path)
+    instance.config.stability_amount = 1
+    instance.config.dalle_amount = 1
+    instance.config.historic_amount = 1
+    instance.config.external_amount = 0
+    instance.config.automatic_amount = 0
+    instance.config.race_spend_cap = 1
+
+    for i in range(10):
+        assert instance.get_hedge_provider_mode([ProvidersConst.STABLE.value], 1) == ProvidersConst.HISTORIC.value
+    assert instance.get_hedge_provider_mode([ProvidersConst.HISTORIC.value, ProvidersConst.STABLE.value], 1) is None
+
+
+def test_get_random_provider_mode_open_circuit():
+    here = os.path.dirname(__file__)
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    health_path = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.HEALTH_FILE.value)
+
+    # Cleanup file before
+    if os.path.exists(health_path):
+        os.remove(health_path)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.health_file = health_path
+    instance.config.circuit_failures = 2
+    instance.config.external_image_location = "bad folder"
+    instance.config.external_amount = 1
+    instance.load_health()
+
+    # External fails twice in a row and is skipped on the next run, leaving historic
+    instance.get_image()
+    instance.get_image()
+    instance.config.historic_amount = 1
+    instance.load_health()
+    for i in range(10):
+        assert instance.get_random_provider_mode() == ProvidersConst.HISTORIC.value
+
+    # With nothing else available the open circuit is ignored
+    instance.config.historic_amount = 0
+    assert instance.get_random_provider_mode() == ProvidersConst.EXTERNAL.value
+
+    # Cleanup file after
+    os.remove(health_path)
+
+
+def test_get_image_cached_response():
+    here = os.path.dirname(__file__)
+    test_folder = UnitTestConst.PYCASSO_FOLDER.value
+    config_path = os.path.join(here, test_folder, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    cache_location = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.CACHE_FOLDER.value)
+
+    # Cleanup folder before
+    if os.path.exists(cache_location):
+        shutil.rmtree(cache_location)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.response_cache_location = cache_location
+    instance.config.stability_amount = 1
+    instance.config.save_image = False
+    instance.load_caches()
+    instance.prompt, instance.metadata, instance.artist_text, instance.title_text = \
+        instance.prep_prompt_text(instance.config.prompt_mode)
+
+    # Stability has no key here, so only the cache can return an image
+    image = Image.new("RGB", (instance.width, instance.height), (255, 0, 0))
+    assert instance.cache_response(ProvidersConst.STABLE.value, image) is True
+    image_base, provider_type = instance.get_image()
+    assert provider_type == ProvidersConst.STABLE.value
+    assert image_base.getpixel((0, 0)) == (255, 0, 0)
+
+    # File providers are never cached
+    assert instance.cache_response(ProvidersConst.EXTERNAL.value, image) is False
+
+    # Cleanup folder after
+    shutil.rmtree(cache_location)
+
+
+def test_quantize_image():
+    here = os.path.dirname(__file__)
+    config_path = os.path.join(here, UnitTestConst.PYCASSO_FOLDER.value, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    instance = Pycasso(config_path, file_path=here)
+    instance.load_display()
+    instance.image_display = Image.new("RGB", (instance.width, instance.height), (200, 60, 40))
+
+    # Mock display is colour, which has no fixed palette
+    instance.config.quantize_mode = QuantizeConst.NEAREST.value
+    assert instance.get_quantize_palette() is None
+    assert instance.quantize_image().getpixel((0, 0)) == (200, 60, 40)
+
+    instance.config.palette_filter = QuantizeConst.PALETTES.value["red"]
+    assert instance.quantize_image().getpixel((0, 0)) == (255, 0, 0)
+
+
+def test_get_refresh():
+    previous = Image.new("RGB", (100, 50))
+    frame = previous.copy()
+    assert Pycasso.get_refresh(frame) == (RefreshConst.FULL.value, None)
+    assert Pycasso.get_refresh(frame, previous, supports_partial=True) == (RefreshConst.SKIP.value, None)
+
+    # Small change is refreshed partially, only if the driver can
+    frame.putpixel((10, 20), (255, 255, 255))
+    assert Pycasso.get_refresh(frame, previous, supports_partial=True) == (RefreshConst.PARTIAL.value,
+                                                                          (8, 20, 16, 21))
+    assert Pycasso.get_refresh(frame, previous) == (RefreshConst.FULL.value, None)
+    assert Pycasso.get_refresh(frame, previous, partial_count=10, supports_partial=True,
+                               full_refresh_every=10) == (RefreshConst.FULL.value, None)
+
+    # Large change gets a full refresh
+    frame.paste((255, 255, 255), (0, 0, 60, 50))
+    assert Pycasso.get_refresh(frame, previous, supports_partial=True) == (RefreshConst.FULL.value, None)
+
+
+def test_refresh_display():
+    here = os.path.dirname(__file__)
+    config_path = os.path.join(here, UnitTestConst.PYCASSO_FOLDER.value, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    last_frame_file = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.LAST_FRAME_FILE.value)
+    output_path = "mock_output.png"
+
+    # Cleanup files before
+    for path in [last_frame_file, output_path]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.load_display()
+    instance.config.partial_refresh = True
+    instance.config.last_frame_file = last_frame_file
+    boxes = []
+    instance.epd.display_partial = lambda image, box: boxes.append(box)
+    instance.image_display = Image.new("RGB", (instance.width, instance.height))
+
+    assert instance.refresh_display() == RefreshConst.FULL.value
+    assert os.path.exists(output_path)
+    assert instance.refresh_display() == RefreshConst.SKIP.value
+
+    instance.image_display.putpixel((0, 0), (255, 255, 255))
+    assert instance.refresh_display() == RefreshConst.PARTIAL.value
+    assert boxes == [(0, 0, 8, 1)]
+    assert Pycasso.load_last_frame(last_frame_file)[1] == 1
+
+    # Cleanup files after
+    for path in [last_frame_file, output_path]:
+        os.remove(path)
+
+
+def test_run_status():
+    here = os.path.dirname(__file__)
+    config_path = os.path.join(here, UnitTestConst.PYCASSO_FOLDER.value, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    base_frame_file = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.BASE_FRAME_FILE.value)
+    output_path = "mock_output.png"
+
+    # Cleanup files before
+    for path in [base_frame_file, output_path]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.config.base_frame_file = base_frame_file
+    assert instance.run_status() is False
+    assert not os.path.exists(output_path)
+
+    # Normal run keeps the plain frame and its text
+    instance.config.save_base_frame = True
+    instance.run()
+    assert os.path.exists(base_frame_file)
+    title_text = instance.title_text
+    os.remove(output_path)
+
+    # Status refresh shows it again with the battery icon, without fetching an image
+    instance.reset_run_state()
+    instance.fetch_image = None
+    instance.charge_level = 5
+    assert instance.run_status() is True
+    assert instance.title_text == title_text
+    assert os.path.exists(output_path)
+
+    # Cleanup files after
+    for path in [base_frame_file, output_path]:
+        os.remove(path)
+
+
+def test_run_stored_frame():
+    here = os.path.dirname(__file__)
+    config_path = os.path.join(here, UnitTestConst.PYCASSO_FOLDER.value, UnitTestConst.PYCASSO_CONFIG_RUN.value)
+    store_location = os.path.join(here, UnitTestConst.TEMP_FOLDER.value, UnitTestConst.STORE_FOLDER.value)
+    output_path = "mock_output.png"
+
+    # Cleanup before
+    if os.path.exists(store_location):
+        shutil.rmtree(store_location)
+
+    instance = Pycasso(config_path, file_path=here)
+    instance.load_display()
+    instance.config.frame_store_location = store_location
+    instance.config.frame_store_size = 2
+    instance.image_display = Image.new("RGB", (instance.width, instance.height), (0, 255, 0))
+    assert instance.store_frame() is True
+
+    # Test image is only shown when there is no stored frame
+    instance.run()
+    output = Image.open(output_path)
+    assert output.getpixel((0, 0)) == (0, 255, 0)
+
+    # Cleanup after
+    shutil.rmtree(store_location)
+    os.remove(output_path)
+
+
 def test_set_rotate_normal():
     width = 467
     height = 212
@@ -510,6 +984,7 @@ def test_major_complete_config():
     assert instance.config.prompts_file == file.get_full_path("test_pycasso_content/test_prompts.txt")
     assert instance.config.resize_external is False
     assert instance.config.file_name_max_length == 95
+    assert instance.config.cache_location == file.get_full_path("test_cache")
 
     # Text Settings
     assert instance.config.add_text is False
@@ -524,6 +999,8 @@ def test_major_complete_config():
     assert instance.config.block_brackets == "[]"
     assert instance.config.block_seperator == ":"
     assert instance.config.subject_brackets == "[]"
+    assert instance.config.block_workers == 2
+    assert instance.config.block_timeout == 5.5
     assert instance.config.box_to_floor is False
     assert instance.config.box_to_edge is False
     assert instance.config.wrap_text is False
@@ -577,6 +1054,14 @@ def test_major_complete_config():
     assert config_dict.getint("Image Enhancements", "contrast") == 2
     assert config_dict.getint("Image Enhancements", "brightness") == 2
     assert config_dict.getint("Image Enhancements", "sharpness") == 2
+    assert instance.config.palette_filter == [[0, 0, 0], [255, 255, 255], [0, 255, 0], [0, 0, 255], [255, 0, 0],
+                                              [255, 255, 0], [255, 128, 0]]
+    assert instance.config.quantize_mode == "ordered"
+    assert instance.config.partial_refresh is True
+    assert instance.config.partial_max == 40
+    assert instance.config.full_refresh_every == 3
+    assert instance.config.save_base_frame is False
+    assert instance.config.frame_store_size == 2
 
     # Provider Settings
     assert instance.config.external_amount == 12
@@ -589,9 +1074,16 @@ def test_major_complete_config():
     assert instance.config.test_enabled is False
     assert instance.config.stable_host == "https://api.stability.ai/v1/generation/stable-diffusion-v1-5/text-to-image"
     assert instance.config.aspect_ratio == "1:1"
+    assert instance.config.stability_format == "jpeg"
     assert instance.config.automatic_host == "1.1.1.1"
     assert instance.config.automatic_port == 1337
     assert instance.config.provider_fallback is False
+    assert instance.config.race_providers is True
+    assert instance.config.hedge_delay == 2.5
+    assert instance.config.race_spend_cap == 2
+    assert instance.config.circuit_failures == 5
+    assert instance.config.circuit_cool_down == 30
+    assert instance.config.health_file == os.path.join(file.get_full_path("test_cache"), "provider_health.json")
     assert instance.config.llm_model == "cool model"
     assert instance.config.llm_temperature == 1.0
     assert instance.config.llm_max_tokens == 40
@@ -600,6 +1092,7 @@ def test_major_complete_config():
     # Logging Settings
     assert instance.config.log_file == "pycasso_test.log"
     assert instance.config.log_level == 50
+    assert instance.config.trace_file == file.get_full_path("test_trace.jsonl")
 
     # Generation Settings
     assert instance.config.image_rotate == 90
@@ -621,6 +1114,36 @@ def test_major_complete_config():
     assert instance.config.mastodon_client_cred_path == file.get_full_path("test1.secret")
     assert instance.config.mastodon_user_cred_path == file.get_full_path("test2.secret")
 
+    # Network Settings
+    assert instance.config.connect_timeout == 3.5
+    assert instance.config.read_timeout == 45.0
+    assert instance.config.network_retries == 4
+    assert instance.config.retry_backoff == 0.5
+    assert instance.config.retry_backoff_max == 12.0
+
+    # Daemon Settings
+    assert instance.config.daemon_interval == 15
+    assert instance.config.daemon_schedule == "*/30 9-17 * * 1-5"
+
+    # Queue Settings
+    assert instance.config.queue_size == 3
+    assert instance.config.fill_queue_in_daemon is True
+    assert instance.config.queue_location == os.path.join(file.get_full_path("test_cache"), "queue")
+
+    # Cache Settings
+    assert instance.config.response_cache_size == 25
+    assert instance.config.external_cache_size == 10
+    assert instance.config.use_catalog is False
+    assert instance.config.catalog_file == os.path.join(file.get_full_path("test_cache"), "catalog.db")
+    assert instance.config.use_line_index is True
+    assert instance.config.line_index_location == os.path.join(file.get_full_path("test_cache"), "line_index")
+    assert instance.config.block_cache_ttl == 90
+    assert instance.config.block_pool_size == 3
+    assert instance.config.block_cache_file == os.path.join(file.get_full_path("test_cache"), "block_cache.json")
+    assert instance.config.use_feed_cache is False
+    assert instance.config.feed_cache_location == os.path.join(file.get_full_path("test_cache"), "feeds")
+    assert instance.config.response_cache_location == os.path.join(file.get_full_path("test_cache"), "responses")
+
     # Debug Settings
     assert instance.config.test_epd_width == 900
     assert instance.config.test_epd_height == 500
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for run_trace.py
+
+import json
+import os
+import time
+
+from piblo.constants import UnitTestConst, TraceConst
+from piblo.run_trace import RunTrace
+
+
+def get_trace_path():
+    path = os.path.join(os.path.dirname(__file__), UnitTestConst.TEMP_FOLDER.value, UnitTestConst.TRACE_FILE.value)
+
+    # Cleanup file before
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def test_phase():
+    trace = RunTrace()
+    with trace.phase("sleep"):
+        time.sleep(0.05)
+
+    assert len(trace.phases) == 1
+    phase = trace.phases[0]
+    assert phase[TraceConst.NAME.value] == "sleep"
+    assert phase[TraceConst.WALL.value] >= 0.05
+    assert phase[TraceConst.CPU.value] < phase[TraceConst.WALL.value]
+    assert TraceConst.PEAK_RSS.value not in phase
+    assert phase[TraceConst.PEAK_RSS_RISE.value] is None or phase[TraceConst.PEAK_RSS_RISE.value] >= 0
+
+
+def test_phase_exception():
+    trace = RunTrace()
+    try:
+        with trace.phase("fail"):
+            raise ValueError("test")
+    except ValueError:
+        pass
+
+    assert trace.phases[0][TraceConst.NAME.value] == "fail"
+
+
+def test_write_and_read():
+    path = get_trace_path()
+    for i in range(3):
+        trace = RunTrace(path)
+        with trace.phase("phase"):
+            pass
+        assert trace.write() is True
+
+    traces = RunTrace.read_traces(path)
+    assert len(traces) == 3
+    assert traces[0][TraceConst.PHASES.value][0][TraceConst.NAME.value] == "phase"
+
+    # Cleanup file after
+    os.remove(path)
+
+
+def test_write_disabled():
+    trace = RunTrace("")
+    assert trace.write() is False
+
+
+def test_read_skips_invalid():
+    path = get_trace_path()
+    with open(path, "w") as file:
+        file.write(json.dumps({TraceConst.WALL.value: 1.0}) + "\n")
+        file.write("not json\n")
+
+    traces = RunTrace.read_traces(path)
+    assert len(traces) == 1
+
+    # Cleanup file after
+    os.remove(path)
+
+
+def test_summarise():
+    traces = []
+    for i in range(1, 11):
+        traces.append({
+            TraceConst.WALL.value: float(i),
+            TraceConst.CPU.value: 0.5,
+            TraceConst.BYTES.value: None,
+            TraceConst.PEAK_RSS.value: 1000,
+            TraceConst.PHASES.value: [{TraceConst.NAME.value: "fetch", TraceConst.WALL.value: float(i * 2),
+                                       TraceConst.CPU.value: 0.1, TraceConst.BYTES.value: 100,
+                                       TraceConst.PEAK_RSS_RISE.value: 0}]
+        })
+
+    summary = RunTrace.summarise(traces, [50, 100])
+    assert summary[TraceConst.TOTAL.value][TraceConst.COUNT.value] == 10
+    assert summary[TraceConst.TOTAL.value][TraceConst.WALL.value] == [5.5, 10.0]
+    assert summary[TraceConst.TOTAL.value][TraceConst.BYTES.value] is None
+    assert summary["fetch"][TraceConst.WALL.value] == [11.0, 20.0]
+    assert summary["fetch"][TraceConst.BYTES.value] == [100.0, 100.0]
+    # Peak memory is for the run, phases only have their rise
+    assert summary[TraceConst.TOTAL.value][TraceConst.PEAK_RSS.value] == [1000.0, 1000.0]
+    assert summary["fetch"][TraceConst.PEAK_RSS.value] is None
+    assert summary["fetch"][TraceConst.PEAK_RSS_RISE.value] == [0.0, 0.0]
+
+
+def test_write_moves_large_file():
+    path = get_trace_path()
+    old_path = f"{path}{TraceConst.OLD_SUFFIX.value}"
+    with open(path, "w") as file:
+        file.write(" " * (TraceConst.MAX_SIZE.value * 1024 + 1))
+
+    trace = RunTrace(path)
+    assert trace.write() is True
+    assert len(RunTrace.read_traces(path)) == 1
+    assert os.path.getsize(old_path) > TraceConst.MAX_SIZE.value * 1024
+
+    # Cleanup files after
+    os.remove(path)
+    os.remove(old_path)
+
+
+def test_read_includes_old():
+    path = get_trace_path()
+    old_path = f"{path}{TraceConst.OLD_SUFFIX.value}"
+    with open(old_path, "w") as file:
+        file.write(json.dumps({TraceConst.WALL.value: 1.0}) + "\n")
+    with open(path, "w") as file:
+        file.write(json.dumps({TraceConst.WALL.value: 2.0}) + "\n")
+
+    # Oldest runs come first
+    traces = RunTrace.read_traces(path)
+    assert [trace[TraceConst.WALL.value] for trace in traces] == [1.0, 2.0]
+    assert len(RunTrace.read_traces(path, include_old=False)) == 1
+
+    # Cleanup files after
+    os.remove(path)
+    os.remove(old_path)
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+# -*- coding:utf-8 -*-
+# Unit tests for scheduler.py
+from datetime import datetime
+
+from piblo.scheduler import Scheduler
+
+
+def test_next_run_interval():
+    scheduler = Scheduler(interval=30)
+    after = datetime(2024, 5, 1, 10, 15, 20)
+    result = scheduler.next_run(after)
+    expected = datetime(2024, 5, 1, 10, 45, 20)
+    assert result == expected
+
+
+def test_next_run_hourly():
+    scheduler = Scheduler(schedule="0 * * * *")
+    after = datetime(2024, 5, 1, 10, 15, 20)
+    result = scheduler.next_run(after)
+    expected = datetime(2024, 5, 1, 11, 0)
+    assert result == expected
+
+
+def test_next_run_step_and_range():
+    scheduler = Scheduler(schedule="*/20 9-17 * * *")
+    after = datetime(2024, 5, 1, 17, 45)
+    result = scheduler.next_run(after)
+    expected = datetime(2024, 5, 2, 9, 0)
+    assert result == expected
+
+
+def test_next_run_weekday():
+    # 2024-05-04 is a Saturday, next weekday run is Monday morning
+    scheduler = Scheduler(schedule="30 7 * * 1-5")
+    after = datetime(2024, 5, 4, 12, 0)
+    result = scheduler.next_run(after)
+    expected = datetime(2024, 5, 6, 7, 30)
+    assert result == expected
+
+
+def test_next_run_day_of_month():
+    scheduler = Scheduler(schedule="0 0 1 * *")
+    after = datetime(2024, 12, 15, 8, 0)
+    result = scheduler.next_run(after)
+    expected = datetime(2025, 1, 1, 0, 0)
+    assert result == expected
+
+
+def test_invalid_schedule_uses_interval():
+    scheduler = Scheduler(interval=10, schedule="61 * * * *")
+    after = datetime(2024, 5, 1, 10, 0)
+    result = scheduler.next_run(after)
+    expected = datetime(2024, 5, 1, 10, 10)
+    assert scheduler.fields is None
+    assert result == expected
+
+
+def test_parse_field():
+    result = Scheduler.parse_field("1,5-7,*/30", 0, 59)
+    expected = {0, 1, 5, 6, 7, 30}
+    assert result == expected